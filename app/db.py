@@ -1,23 +1,191 @@
+import asyncio
+import threading
 from motor.motor_asyncio import AsyncIOMotorClient
-from app.utils.env_variables import CONNECTION_STRING
+from pymongo import monitoring
+from app.utils.env_variables import (
+    CONNECTION_STRING,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    DATA_BACKEND,
+    SNAPSHOT_PATH,
+)
+from app.snapshot import Snapshot
 
-def get_protein_structures_collection():
-    client = AsyncIOMotorClient(CONNECTION_STRING)
+DATABASE_NAME = "viro3d"
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener that keeps running totals of connections, checkouts and checkout wait times.
+    Motor runs pymongo operations on executor threads, so every update is guarded by a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.checkouts_started = 0
+            self.checkouts_succeeded = 0
+            self.checkouts_failed = 0
+            self.checked_in = 0
+            self.pools_cleared = 0
+            self.total_wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "connections_open": self.connections_created - self.connections_closed,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "checked_out": self.checkouts_succeeded - self.checked_in,
+                "checkouts_started": self.checkouts_started,
+                "checkouts_succeeded": self.checkouts_succeeded,
+                "checkouts_failed": self.checkouts_failed,
+                "pools_cleared": self.pools_cleared,
+                "avg_wait_ms": 1000 * self.total_wait_seconds / self.checkouts_succeeded if self.checkouts_succeeded else 0.0,
+                "max_wait_ms": 1000 * self.max_wait_seconds,
+            }
+
+    def _record_wait(self, duration):
+        if duration is not None:
+            self.total_wait_seconds += duration
+            self.max_wait_seconds = max(self.max_wait_seconds, duration)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.checkouts_started += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkouts_failed += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts_succeeded += 1
+            self._record_wait(getattr(event, "duration", None))
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_in += 1
+
+pool_stats = PoolStats()
+
+_client = None
+_snapshot = None
+_collections = {}
+
+def get_client() -> AsyncIOMotorClient:
+    """
+    Return the process-wide client, creating it on first use.
+    The client owns the connection pool, so it is created once and shared by every request.
+    """
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(
+            CONNECTION_STRING,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            event_listeners=[pool_stats],
+        )
+    return _client
+
+def get_snapshot() -> Snapshot:
+    """
+    Return the in-memory snapshot served when DATA_BACKEND is 'snapshot', creating it on first use
+    """
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = Snapshot(SNAPSHOT_PATH)
+    return _snapshot
+
+def get_collection(name: str):
+    if name not in _collections:
+        if DATA_BACKEND == "snapshot":
+            _collections[name] = get_snapshot().get_collection(name)
+        else:
+            _collections[name] = get_client()[DATABASE_NAME].get_collection(name)
+    return _collections[name]
+
+async def connect():
+    """
+    Create the shared client and warm it up: the ping runs server discovery and opens the first pooled connection,
+    and the driver then fills the pool up to MONGO_MIN_POOL_SIZE in the background.
+    With the snapshot backend, load the JSON exports instead.
+    """
+    if DATA_BACKEND == "snapshot":
+        await asyncio.to_thread(get_snapshot().load_all)
+        print(f"Loaded data snapshot from {SNAPSHOT_PATH}")
+        return
+    client = get_client()
     try:
-        yield client.viro3d.get_collection("proteinstructures")
-    finally:
-        client.close()
+        await client.admin.command("ping")
+    except Exception as e:
+        print(f"MongoDB warm-up failed: {e}")
+
+async def reload_snapshot() -> list[str]:
+    """
+    Re-read the snapshot's JSON exports, if the snapshot backend is in use
+    """
+    if DATA_BACKEND != "snapshot":
+        return []
+    return await asyncio.to_thread(get_snapshot().reload)
+
+def close():
+    global _client, _snapshot
+    if _client is not None:
+        _client.close()
+    _client = None
+    _snapshot = None
+    _collections.clear()
+
+def get_pool_stats() -> dict:
+    return {
+        "max_pool_size": MONGO_MAX_POOL_SIZE,
+        "min_pool_size": MONGO_MIN_POOL_SIZE,
+        **pool_stats.snapshot(),
+    }
+
+def get_protein_structures_collection():
+    return get_collection("proteinstructures")
 
 def get_genome_coordinates_collection():
-    client = AsyncIOMotorClient(CONNECTION_STRING)
-    try:
-        yield client.viro3d.get_collection("genome_coordinates")
-    finally:
-        client.close()
+    return get_collection("genome_coordinates")
 
 def get_clusters_collection():
-    client = AsyncIOMotorClient(CONNECTION_STRING)
-    try:
-        yield client.viro3d.get_collection("clusters")
-    finally:
-        client.close()
\ No newline at end of file
+    return get_collection("clusters")
@@ -1,26 +1,55 @@
 from __future__ import annotations
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from app.routes import (
+admin,
 genome_coordinates,
 health_check,
 proteins,
 viruses,
 zip,
-clusters
+clusters,
+structures
 )
 from app.utils.env_variables import *
+from app import db
+from app.utils.indexes import warm_up
+from app.utils.mongo_indexes import provision
+from app.utils.structure_files import StructureFiles, structure_sidecar_cache
+from app.utils.response_cache import ResponseCacheMiddleware, response_cache, response_flights
+from app.utils.sequence_index import sequence_index
+from app.utils.name_index import name_index
+from app.utils.virus_catalogue import virus_catalogue
+from app.utils.cluster_index import cluster_index
+from app.utils.plddt_store import plddt_store
 from app.routes.limiter import limiter
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await db.connect()
+    if DATA_BACKEND == "mongo":
+        await provision(db.get_collection)
+    await warm_up([
+        (sequence_index, db.get_protein_structures_collection()),
+        (name_index, db.get_protein_structures_collection()),
+        (virus_catalogue, db.get_protein_structures_collection()),
+        (cluster_index, db.get_clusters_collection()),
+    ])
+    plddt_store.reload()
+    yield
+    db.close()
+
 app = FastAPI(
+    lifespan=lifespan,
     root_path="/api",
     version='1.0',
     title='Viro3D',
-    description='Viro3D is an API for retrieving metatadata and structural models of AI-enabled predicted protein structures. If you experience any browser slow-down, please use the <page_size> and <page_num> fields when making requests to limit the number of responses.',
+    description='Viro3D is an API for retrieving metatadata and structural models of AI-enabled predicted protein structures. If you experience any browser slow-down, please use the <page_size> and <page_num> fields when making requests to limit the number of responses. To page through large result sets, pass an empty <cursor> with <page_size>, then the <next_cursor> of each response. Use <fields> to return only some fields of each protein structure, by name or with the presets summary, taxonomy and structure.',
 )
 
 app.include_router(health_check.router)
@@ -29,9 +58,14 @@ app.include_router(viruses.router)
 app.include_router(genome_coordinates.router)
 app.include_router(clusters.router)
 app.include_router(zip.router)
-app.mount("/pdb", StaticFiles(directory=Path(STRUCTURAL_MODELS_PATH)))
+app.include_router(structures.router)
+app.include_router(admin.router)
+app.mount("/pdb", StructureFiles(directory=Path(STRUCTURAL_MODELS_PATH), sidecar_cache=structure_sidecar_cache))
 app.mount("/graph_data", StaticFiles(directory=Path(GRAPH_DATA_PATH)))
 
+# Added before CORSMiddleware so it runs inside it: cached responses get the CORS headers of each request
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache, flights=response_flights)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from typing import List, Optional
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, create_model
 
 class ProteinStructure(BaseModel):
 
@@ -62,24 +62,37 @@ class ProteinStructure(BaseModel):
     structure_seq: str = Field(..., json_schema_extra={"example": "GALQAAPKATAQKQIQAPTPRARQPQRPQAEQTPLQKLLMRTMEEES"})
     genome_length_bp: float = Field(..., json_schema_extra={"example": 800.0})
 
+#A ProteinStructure with every field optional, for documents fetched with a projection when a response is limited to some fields (fields=)
+PartialProteinStructure = create_model(
+    "PartialProteinStructure",
+    __base__=ProteinStructure,
+    **{name: (Optional[field.annotation], Field(None, alias=field.alias)) for name, field in ProteinStructure.model_fields.items()}
+)
+
 class RecordIDEntry(BaseModel):
     record_id: str = Field(..., json_schema_extra={"example": "AHV82114.1.1.6_10921"})
     protein_structure: ProteinStructure = None
     
 class ProteinNameEntry(BaseModel):
     proteinname: str = Field(..., json_schema_extra={"example": "Product: polymerase 1"})
-    count: int = Field(..., json_schema_extra={"example": 100})
+    count: Optional[int] = Field(None, json_schema_extra={"example": 100})
+    count_is_estimate: bool = Field(False, json_schema_extra={"example": False})
     protein_structures: Optional[List[ProteinStructure]] = None
+    next_cursor: Optional[str] = Field(None, json_schema_extra={"example": "WyJDQUk3NDk4MS4xLjRfMTE1MDUiXQ=="})
 
 class GenbankEntry(BaseModel):
     genbank_id: str = Field(..., json_schema_extra={"example": "CAX33877.1"})
-    count: int = Field(..., json_schema_extra={"example": 100})
+    count: Optional[int] = Field(None, json_schema_extra={"example": 100})
+    count_is_estimate: bool = Field(False, json_schema_extra={"example": False})
     protein_structures: Optional[List[ProteinStructure]] = None
+    next_cursor: Optional[str] = Field(None, json_schema_extra={"example": "WyJDQUk3NDk4MS4xLjRfMTE1MDUiXQ=="})
 
 class VirusEntry(BaseModel):
     virus_name: str = Field(..., json_schema_extra={"example": "influenza A virus"})
-    count: int = Field(..., json_schema_extra={"example": 100})
+    count: Optional[int] = Field(None, json_schema_extra={"example": 100})
+    count_is_estimate: bool = Field(False, json_schema_extra={"example": False})
     protein_structures: Optional[List[ProteinStructure]] = None
+    next_cursor: Optional[str] = Field(None, json_schema_extra={"example": "WyJDQUk3NDk4MS4xLjRfMTE1MDUiXQ=="})
 
 class BlastMatch(BaseModel):
     structure_id: str = Field(..., json_schema_extra={"example": "CAX33877.1.6_11504"})
@@ -92,4 +105,5 @@ class BlastMatch(BaseModel):
 
 class BlastEntry(BaseModel):
     sequence: str = Field(..., json_schema_extra={"example": "MRMRLLA"})
-    matches: List[BlastMatch] = None
\ No newline at end of file
+    matches: List[BlastMatch] = None
+    next_cursor: Optional[str] = Field(None, json_schema_extra={"example": "WyJDQUk3NDk4MS4xLjRfMTE1MDUiXQ=="})
@@ -0,0 +1,31 @@
+import hmac
+from fastapi import APIRouter, Header, HTTPException
+from app import db
+from app.utils.env_variables import ADMIN_TOKEN
+from app.utils.count_cache import count_cache
+from app.utils.indexes import reload_all
+from app.utils.plddt_store import plddt_store
+from app.utils.response_cache import response_cache
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    responses={404: {"description": "Not Found"}},
+)
+
+def check_admin_token(token: str):
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@router.post('/reload_indexes', include_in_schema=False, response_model=dict)
+async def reload_indexes(x_admin_token: str = Header(default="")):
+    """
+    Rebuild the in-memory search indexes from the database, after its data has been reloaded.
+    With the snapshot backend, the JSON exports are re-read first. The pLDDT store's latest build is mapped too.
+    """
+    check_admin_token(x_admin_token)
+    snapshot = await db.reload_snapshot()
+    count_cache.clear()
+    if response_cache:
+        response_cache.clear()
+    return {"reloaded": await reload_all(), "snapshot": snapshot, "plddt_store": plddt_store.reload()}
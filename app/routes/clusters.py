@@ -1,8 +1,11 @@
+from typing import Literal
 from natsort import natsorted
 from fastapi import APIRouter, Depends, HTTPException
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db import get_clusters_collection
 from app.models.clusters import *
+from app.utils.cluster_index import cluster_index
+from app.utils.helpers import find_by_ids
 
 router = APIRouter(
     prefix="/clusters",
@@ -11,17 +14,26 @@ router = APIRouter(
 )
 
 @router.get('/genbank_id/', include_in_schema=True, response_model=dict)
-async def get_cluster_by_genbank_id(qualifier: str, db: AsyncIOMotorDatabase = Depends(get_clusters_collection)):
+async def get_cluster_by_genbank_id(qualifier: str, match: Literal["exact", "prefix", "substring"] = "prefix", db: AsyncIOMotorDatabase = Depends(get_clusters_collection)):
     """
-    Get Cluster of Similar Protein Structures by Genbank ID
+    Get Cluster of Similar Protein Structures by Genbank ID. By default, clusters with a member whose record ID starts
+    with the qualifier are returned; use match=exact for a member with exactly this Genbank or record ID, or
+    match=substring to match the qualifier (a regex) anywhere in a member's record ID, which is much slower.
     """
 
     results = []
 
-    similar_structs = db.find({"cluster_members.member_record_id": { '$regex' : qualifier }})
+    if match == "substring":
+        similar_structs = db.find({"cluster_members.member_record_id": { '$regex' : qualifier }})
 
-    async for row in similar_structs:
-        results.append(row)
+        async for row in similar_structs:
+            results.append(row)
+
+    else:
+        index = await cluster_index.load(db)
+        cluster_ids = index.exact(qualifier) if match == "exact" else index.prefix(qualifier)
+        clusters = await find_by_ids(db, cluster_ids)
+        results = [clusters[cluster_id] for cluster_id in cluster_ids if cluster_id in clusters]
 
     if len(results) == 0:
         raise HTTPException(status_code=404, detail="No Similar Structures Found")
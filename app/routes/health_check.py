@@ -1,6 +1,13 @@
 from starlette.responses import HTMLResponse
 from starlette import status
 from fastapi import APIRouter
+from app.db import get_pool_stats
+from app.utils.blast import blast_runner
+from app.utils.blast_cache import blast_cache
+from app.utils.zip_cache import zip_cache
+from app.utils.response_cache import response_cache, response_flights
+from app.utils.structure_files import structure_sidecar_cache
+from app.utils.plddt_store import plddt_store
 
 
 router = APIRouter(
@@ -11,4 +18,60 @@ router = APIRouter(
 
 @router.get("/", include_in_schema=False)
 def health_check():
-    return HTMLResponse("success", status_code=status.HTTP_200_OK)
\ No newline at end of file
+    return HTMLResponse("success", status_code=status.HTTP_200_OK)
+
+@router.get("/pool", include_in_schema=False, response_model=dict)
+def pool_stats():
+    """
+    MongoDB connection pool usage: open and checked-out connections, checkout counts and wait times
+    """
+    return get_pool_stats()
+
+@router.get("/blast", include_in_schema=False, response_model=dict)
+def blast_stats():
+    """
+    blastp worker usage: running and queued searches, totals of completed, rejected, timed-out and cancelled runs, and result cache hits
+    """
+    return {
+        **blast_runner.stats(),
+        "cache": blast_cache.stats(),
+    }
+
+@router.get("/zip_cache", include_in_schema=False, response_model=dict)
+def zip_cache_stats():
+    """
+    Zip archive cache usage: cache hits, archives built and requests that shared another request's build
+    """
+    return zip_cache.stats() if zip_cache else {"enabled": False}
+
+@router.get("/response_cache", include_in_schema=False, response_model=dict)
+def response_cache_stats():
+    """
+    Response cache usage: cached responses and their size, hits, misses and 304 Not Modified answers
+    """
+    return response_cache.stats() if response_cache else {"enabled": False}
+
+@router.get("/single_flight", include_in_schema=False, response_model=dict)
+def single_flight_stats():
+    """
+    Request coalescing: computations in flight, run, and shared by identical concurrent requests (coalesced), for
+    read route responses and blastp runs
+    """
+    return {
+        "responses": response_flights.stats(),
+        "blast": blast_runner.flights.stats(),
+    }
+
+@router.get("/structure_files", include_in_schema=False, response_model=dict)
+def structure_files_stats():
+    """
+    Compressed and binary structure file copies: served from the cache, generated, and generations shared by concurrent requests
+    """
+    return structure_sidecar_cache.stats() if structure_sidecar_cache else {"enabled": False}
+
+@router.get("/plddt_store", include_in_schema=False, response_model=dict)
+def plddt_store_stats():
+    """
+    pLDDT store: whether a build is loaded, when it was built, and the models and residues it holds
+    """
+    return plddt_store.stats()
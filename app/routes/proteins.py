@@ -1,13 +1,20 @@
+import re
+from typing import Literal
 from natsort import natsorted
-from app.utils.env_variables import BLAST_DB_PATH
-from app.utils.helpers import calculate_match_score, validate_regex
-from fastapi import APIRouter, Depends, HTTPException
+from app.utils.blast import blast_runner, parse_blast_hits, BlastError, BlastQueueFull, BlastTimeout, BlastCancelled
+from app.utils.blast_cache import blast_cache
+from app.utils.sequence_index import sequence_index
+from app.utils.cluster_index import normalize_accession
+from app.utils.name_index import literal_term, name_index
+from app.utils.pagination import find_page, keyset_page, page_after
+from app.utils.count_cache import count_matches, report_count
+from app.utils.fields import mongo_projection, protein_fields
+from app.utils.serialization import render
+from app.utils.helpers import MatchScorer, find_by_ids, rank_page, validate_regex
+from fastapi import APIRouter, Depends, HTTPException, Request
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db import get_protein_structures_collection
 from app.models.proteins import *
-from Bio.Blast.Applications import NcbiblastpCommandline
-from io import StringIO
-from Bio.Blast import NCBIXML
 
 router = APIRouter(
     prefix="/proteins",
@@ -28,17 +35,17 @@ async def get_protein_structures_by_record_id(qualifier: str, db: AsyncIOMotorDa
     
     else:
         
-        result = RecordIDEntry(
+        return render(
+            RecordIDEntry,
             record_id = qualifier,
-            protein_structure = structure).model_dump(by_alias=False
+            protein_structure = structure
         )
 
-        return result
-
 @router.get('/protein_name/', response_model=dict)
-async def get_protein_structures_by_protein_name(qualifier: str, filter: str = None, page_size: int = None, page_num: int = None, db: AsyncIOMotorDatabase = Depends(get_protein_structures_collection)):
+async def get_protein_structures_by_protein_name(qualifier: str, filter: str = None, page_size: int = None, page_num: int = None, include_count: bool = True, estimate_count: bool = False, after: list = Depends(page_after), fields: list = Depends(protein_fields), db: AsyncIOMotorDatabase = Depends(get_protein_structures_collection)):
     """
-    List Protein Structures by Protein Name
+    List Protein Structures by Protein Name. To page with a cursor instead of page_num, pass an empty cursor for the
+    first page, then each response's next_cursor
     """
 
     skips = 0
@@ -46,61 +53,110 @@ async def get_protein_structures_by_protein_name(qualifier: str, filter: str = N
         skips = page_size * (page_num - 1)
 
     qualifier = validate_regex(qualifier)
-    
-    query = { "genbank_name_curated": { '$regex' : qualifier, '$options' : 'i' } } if filter == None else { "$and": [ { "genbank_name_curated": { '$regex' : qualifier, '$options' : 'i' } }, { "$or": [ { "Virus name(s)": { "$regex": filter, "$options": "i" } }, { "Virus name abbreviation(s)": { "$regex": filter, "$options": "i" } }] } ] }
 
-    cursor = db.find(query)
+    term = literal_term(qualifier)
+    filter_term = literal_term(filter) if filter != None else ""
 
-    results = await cursor.to_list(length=None)
-  
-    sorted_results = sorted(
-        results, 
-        key=lambda x: calculate_match_score(x['genbank_name_curated'], qualifier),
-        reverse=True
-    )
+    # Plain substring searches are answered by the in-memory name index; patterns using regex syntax still go to Mongo
+    if term != None and filter_term != None:
+        index = await name_index.load(db)
+        criteria = [(["genbank_name_curated"], term)] if filter == None else [(["genbank_name_curated"], term), (["Virus name(s)", "Virus name abbreviation(s)"], filter_term)]
+        ordinals = index.search(*criteria)
+        candidates = list(zip(index.record_ids(ordinals), (index.value("genbank_name_curated", ordinal) for ordinal in ordinals)))
+
+    else:
+        query = { "genbank_name_curated": { '$regex' : qualifier, '$options' : 'i' } } if filter == None else { "$and": [ { "genbank_name_curated": { '$regex' : qualifier, '$options' : 'i' } }, { "$or": [ { "Virus name(s)": { "$regex": filter, "$options": "i" } }, { "Virus name abbreviation(s)": { "$regex": filter, "$options": "i" } }] } ] }
+
+        cursor = db.find(query, { "genbank_name_curated": 1 })
+
+        candidates = [(row["_id"], row["genbank_name_curated"]) async for row in cursor]
+
+    # Matches are ranked on their names alone, and only the documents of the requested page are fetched
+    match_score = MatchScorer(qualifier)
+    next_cursor = None
+    if after is None:
+        page = rank_page(
+            candidates,
+            key=lambda candidate: match_score(candidate[1]),
+            skips=skips,
+            page_size=page_size
+        )
+    else:
+        page, next_cursor = keyset_page(
+            candidates,
+            key=lambda candidate: (-match_score(candidate[1]), candidate[0]),
+            after=after,
+            page_size=page_size
+        )
+
+    structures = await find_by_ids(db, [record_id for record_id, _ in page], projection=mongo_projection(fields))
 
-    paginated_results = sorted_results[skips:skips + page_size] if page_size else sorted_results
+    paginated_results = [structures[record_id] for record_id, _ in page if record_id in structures]
     
     if not paginated_results:
         raise HTTPException(status_code=404, detail="No Structures Found")
 
-    return ProteinNameEntry(
+    count, count_is_estimate = report_count(len(candidates), include_count, estimate_count)
+
+    return render(
+        ProteinNameEntry,
+        fields,
         proteinname = qualifier,
-        count = len(results),
-        protein_structures = paginated_results).model_dump(by_alias=False
+        count = count,
+        count_is_estimate = count_is_estimate,
+        protein_structures = paginated_results,
+        next_cursor = next_cursor
     )
 
 @router.get('/genbank_id/', response_model=dict)
-async def get_protein_structures_by_genbank_id(qualifier: str, page_size: int = None, page_num: int = None, db: AsyncIOMotorDatabase = Depends(get_protein_structures_collection)):
+async def get_protein_structures_by_genbank_id(qualifier: str, match: Literal["exact", "prefix", "substring"] = "prefix", page_size: int = None, page_num: int = None, include_count: bool = True, estimate_count: bool = False, after: list = Depends(page_after), fields: list = Depends(protein_fields), db: AsyncIOMotorDatabase = Depends(get_protein_structures_collection)):
     """
-    List Protein Structures by Genbank ID
+    List Protein Structures by Genbank ID. By default, structures whose Genbank ID starts with the qualifier are
+    returned; use match=exact for exactly this Genbank ID, or match=substring to match the qualifier (a regex, ignoring
+    case) anywhere in the Genbank ID, which is much slower. To page with a cursor instead of page_num, pass an empty
+    cursor for the first page, then each response's next_cursor
     """
 
     skips = 0
     if page_size and page_num:
         skips = page_size * (page_num - 1)
     
-    query = { "protein_id": {'$regex': qualifier, '$options' : 'i'} }
-    cursor = db.find(query).skip(skips).limit(page_size) if page_size else db.find(query)
+    if match == "substring":
+        query = { "protein_id": {'$regex': qualifier, '$options' : 'i'} }
+    elif match == "exact":
+        query = { "protein_id": normalize_accession(qualifier) }
+    else:
+        # an anchored, case-sensitive regex is read from the protein_id index as a range of keys
+        query = { "protein_id": {'$regex': '^' + re.escape(normalize_accession(qualifier))} }
+    next_cursor = None
+    if after is None:
+        cursor = db.find(query, mongo_projection(fields)).skip(skips).limit(page_size) if page_size else db.find(query, mongo_projection(fields))
 
-    results = await cursor.to_list(length=page_size)
+        results = await cursor.to_list(length=page_size)
+    else:
+        results, next_cursor = await find_page(db, query, after, page_size, mongo_projection(fields))
 
     if not results:
         raise HTTPException(status_code=404, detail="No Structures Found")
     
-    count = await db.count_documents(query)
+    count, count_is_estimate = await count_matches(db, query, include_count, estimate_count)
 
-    return GenbankEntry(
+    return render(
+        GenbankEntry,
+        fields,
         genbank_id = qualifier,
         count = count,
-        protein_structures = results).model_dump(by_alias=False
-)
+        count_is_estimate = count_is_estimate,
+        protein_structures = results,
+        next_cursor = next_cursor
+    )
         
 @router.get('/virus_name/', response_model=dict)
-async def get_protein_structures_by_virus_name(qualifier: str, filter: str = None, page_size: int = None, page_num: int = None, db: AsyncIOMotorDatabase = Depends(get_protein_structures_collection)):
+async def get_protein_structures_by_virus_name(qualifier: str, filter: str = None, page_size: int = None, page_num: int = None, include_count: bool = True, estimate_count: bool = False, after: list = Depends(page_after), fields: list = Depends(protein_fields), db: AsyncIOMotorDatabase = Depends(get_protein_structures_collection)):
 
     """
-    List Protein Structures by Virus Name
+    List Protein Structures by Virus Name. To page with a cursor instead of page_num, pass an empty cursor for the
+    first page, then each response's next_cursor
     """
 
     skips = 0
@@ -108,27 +164,53 @@ async def get_protein_structures_by_virus_name(qualifier: str, filter: str = Non
         skips = page_size * (page_num - 1)
     
     qualifier = validate_regex(qualifier)
-    
-    query = { "$or": [ { "Virus name(s)": { "$regex": qualifier, "$options": "i" } }, { "Virus name abbreviation(s)": { "$regex": qualifier, "$options": "i" } }] } if filter == None else { "$and": [ { "genbank_name_curated": { '$regex' : filter, '$options' : 'i' } }, { "$or": [ { "Virus name(s)": { "$regex": qualifier, "$options": "i" } }, { "Virus name abbreviation(s)": { "$regex": qualifier, "$options": "i" } }] } ] }
-    
-    cursor = db.find(query).skip(skips).limit(page_size) if page_size else db.find(query)
 
-    results = await cursor.to_list(length=page_size)
+    term = literal_term(qualifier)
+    filter_term = literal_term(filter) if filter != None else ""
+
+    # Plain substring searches are answered by the in-memory name index; only the requested page is fetched from Mongo
+    if term != None and filter_term != None:
+        index = await name_index.load(db)
+        criteria = [(["Virus name(s)", "Virus name abbreviation(s)"], term)] if filter == None else [(["Virus name(s)", "Virus name abbreviation(s)"], term), (["genbank_name_curated"], filter_term)]
+        record_ids = index.record_ids(index.search(*criteria))
+        next_cursor = None
+        if after is None:
+            page_ids = record_ids[skips:skips + page_size] if page_size else record_ids
+        else:
+            page_ids, next_cursor = keyset_page(record_ids, key=lambda record_id: (record_id,), after=after, page_size=page_size)
+        structures = await find_by_ids(db, page_ids, projection=mongo_projection(fields))
+        results = [structures[record_id] for record_id in page_ids if record_id in structures]
+        count, count_is_estimate = report_count(len(record_ids), include_count, estimate_count)
+
+    else:
+        query = { "$or": [ { "Virus name(s)": { "$regex": qualifier, "$options": "i" } }, { "Virus name abbreviation(s)": { "$regex": qualifier, "$options": "i" } }] } if filter == None else { "$and": [ { "genbank_name_curated": { '$regex' : filter, '$options' : 'i' } }, { "$or": [ { "Virus name(s)": { "$regex": qualifier, "$options": "i" } }, { "Virus name abbreviation(s)": { "$regex": qualifier, "$options": "i" } }] } ] }
+
+        next_cursor = None
+        if after is None:
+            cursor = db.find(query, mongo_projection(fields)).skip(skips).limit(page_size) if page_size else db.find(query, mongo_projection(fields))
+
+            results = await cursor.to_list(length=page_size)
+        else:
+            results, next_cursor = await find_page(db, query, after, page_size, mongo_projection(fields))
+
+        count, count_is_estimate = await count_matches(db, query, include_count, estimate_count) if results else (0, False)
 
     if not results:
         raise HTTPException(status_code=404, detail="No Structures Found")
-    
-    count = await db.count_documents(query)
 
-    return VirusEntry(
+    return render(
+        VirusEntry,
+        fields,
         virus_name = qualifier,
         count = count,
-        protein_structures = results).model_dump(by_alias=False
+        count_is_estimate = count_is_estimate,
+        protein_structures = results,
+        next_cursor = next_cursor
     )
 
 #This route is used when the user clicks a suggestion in the autocomplete menu when searching by virus name - it is hidden in the API spec
 @router.get('/virus_name_exact/', include_in_schema=False, response_model=dict)
-async def get_protein_structures_by_exact_virus_name(qualifier: str, filter:str = None, page_size: int = None, page_num: int = None, db: AsyncIOMotorDatabase = Depends(get_protein_structures_collection)):
+async def get_protein_structures_by_exact_virus_name(qualifier: str, filter:str = None, page_size: int = None, page_num: int = None, include_count: bool = True, estimate_count: bool = False, after: list = Depends(page_after), fields: list = Depends(protein_fields), db: AsyncIOMotorDatabase = Depends(get_protein_structures_collection)):
 
     """
     List Protein Structures by querying with the exact Virus Name
@@ -140,25 +222,35 @@ async def get_protein_structures_by_exact_virus_name(qualifier: str, filter:str
     
     query = { "Virus name(s)":  qualifier } if filter == None else { "$and": [ { "genbank_name_curated": { '$regex' : filter, '$options' : 'i' } }, { "Virus name(s)":  qualifier } ] } 
     
-    cursor = db.find(query).skip(skips).limit(page_size) if page_size else db.find(query)
+    next_cursor = None
+    if after is None:
+        cursor = db.find(query, mongo_projection(fields)).skip(skips).limit(page_size) if page_size else db.find(query, mongo_projection(fields))
 
-    results = await cursor.to_list(length=page_size)
+        results = await cursor.to_list(length=page_size)
+    else:
+        results, next_cursor = await find_page(db, query, after, page_size, mongo_projection(fields))
 
     if not results:
         raise HTTPException(status_code=404, detail="No Structures Found")
     
-    count = await db.count_documents(query)
+    count, count_is_estimate = await count_matches(db, query, include_count, estimate_count)
 
-    return VirusEntry(
+    return render(
+        VirusEntry,
+        fields,
         virus_name = qualifier,
         count = count,
-        protein_structures = results).model_dump(by_alias=False
+        count_is_estimate = count_is_estimate,
+        protein_structures = results,
+        next_cursor = next_cursor
     )
 
 @router.get('/sequence_match/', response_model=dict)
-async def get_protein_structures_by_sequence(qualifier: str, page_size: int = None, page_num: int = None, db: AsyncIOMotorDatabase = Depends(get_protein_structures_collection)):
+async def get_protein_structures_by_sequence(request: Request, qualifier: str, exact_only: bool = False, page_size: int = None, page_num: int = None, after: list = Depends(page_after), fields: list = Depends(protein_fields), db: AsyncIOMotorDatabase = Depends(get_protein_structures_collection)):
     """
-    List Protein Structures by blastp sequence match
+    List Protein Structures by blastp sequence match, including every stored identical sequence. Set exact_only to
+    return only identical sequences, from the digest index without running blastp.
+    To page with a cursor instead of page_num, pass an empty cursor for the first page, then each response's next_cursor
     """
     
     skips = 0
@@ -168,49 +260,60 @@ async def get_protein_structures_by_sequence(qualifier: str, page_size: int = No
     if not (qualifier.isalpha() and ' ' not in qualifier):
         raise HTTPException(status_code=400, detail="Search term contains non-alphabetic characters and/or spaces. Please re-enter your sequence")
     
-    blastp_cline = NcbiblastpCommandline(db=BLAST_DB_PATH, outfmt=5, num_threads=4) 
-    
-    stdout, stderr = blastp_cline(stdin=qualifier.upper(), stdout=True, stderr=True)
-    
-    if stderr:
-        print(f"Error occurred: {stderr}")
-    
-    result_handle = StringIO(stdout)
-    blast_records = NCBIXML.parse(result_handle)
+    # Exact copies of a stored sequence are found in the digest index, in microseconds
+    exact_hits = (await sequence_index.load(db)).exact_match_hits(qualifier)
 
-    results = []
-        
-    for record in blast_records:
-        for alignment in record.alignments:
-            for hsp in alignment.hsps:
-                structure = await db.find_one({ "_id": alignment.hit_def })
-                match = BlastMatch(
-                    structure_id = alignment.hit_def,
-                    score = hsp.score,
-                    evalue = hsp.expect,
-                    hit_length = alignment.length,
-                    positives = hsp.positives,
-                    gaps = hsp.gaps,
-                    protein_structure = structure
-                )
-
-                results.append(match)
-
-    if len(results) == 0:
-        raise HTTPException(status_code=404, detail="No Matches Found")
-    
+    if exact_only:
+        hits = exact_hits
     else:
-        
-        results = sorted(
-            results,
-            key=lambda match: match.evalue,
+        # Paging through results and repeated searches reuse the cached hit list instead of re-running blastp
+        hits = await blast_cache.get(qualifier)
+
+        if hits is None:
+            # blastp runs in a subprocess, queued behind a concurrency cap, so it doesn't block other requests
+            try:
+                stdout = await blast_runner.run(qualifier.upper(), request=request)
+            except BlastQueueFull as e:
+                raise HTTPException(status_code=503, detail=str(e))
+            except BlastTimeout as e:
+                raise HTTPException(status_code=504, detail=str(e))
+            except BlastCancelled as e:
+                raise HTTPException(status_code=499, detail=str(e))
+            except BlastError as e:
+                raise HTTPException(status_code=500, detail=str(e))
+
+            hits = parse_blast_hits(stdout)
+            await blast_cache.set(qualifier, hits)
+
+        # blastp can leave out exact copies (short queries, or beyond its target limit): add any it missed
+        found = {hit["structure_id"] for hit in hits}
+        hits = hits + [hit for hit in exact_hits if hit["structure_id"] not in found]
+
+    if len(hits) == 0:
+        raise HTTPException(status_code=404, detail="No Matches Found")
+
+    next_cursor = None
+    if after is None:
+        hits = sorted(
+            hits,
+            key=lambda hit: hit["evalue"],
             )
-        
-        paginated_results = results[skips:skips + page_size] if page_size else results
-        
-        result = BlastEntry(
-            sequence = qualifier.upper(),
-            matches = paginated_results).model_dump(by_alias=False
-        )
 
-        return result
\ No newline at end of file
+        paginated_hits = hits[skips:skips + page_size] if page_size else hits
+    else:
+        paginated_hits, next_cursor = keyset_page(hits, key=lambda hit: (hit["evalue"], hit["structure_id"]), after=after, page_size=page_size)
+
+    # Only the requested page is hydrated, with one $in query for all of its distinct hits
+    structures = await find_by_ids(db, [hit["structure_id"] for hit in paginated_hits], projection=mongo_projection(fields))
+
+    matches = [
+        {**hit, "protein_structure": structures.get(hit["structure_id"])} for hit in paginated_hits
+    ]
+
+    return render(
+        BlastEntry,
+        fields,
+        sequence = qualifier.upper(),
+        matches = matches,
+        next_cursor = next_cursor
+    )
\ No newline at end of file
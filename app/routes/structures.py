@@ -0,0 +1,109 @@
+import asyncio
+import os
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse
+from app.utils.binary_structure import BINARY_SUFFIX, encode_structure_file
+from app.utils.env_variables import STRUCTURAL_MODELS_PATH
+from app.utils.plddt_store import plddt_store
+from app.utils.structure_files import LargeChunkFileResponse, derived_validators, structure_sidecar_cache
+
+router = APIRouter(
+    prefix="/structures",
+    tags=["Structures"],
+    responses={404: {"description": "Not Found"}},
+)
+
+# Record IDs one pLDDT request may ask for
+PLDDT_BATCH_MAX = 500
+
+# Model name prefix of each predictor
+PREDICTORS = {"colabfold": "CF-", "esmfold": "EF-"}
+
+def _convert(path: str, format: str) -> bytes:
+    with open(path, "rb") as f:
+        return encode_structure_file(f.read(), format)
+
+def _not_modified(etag: str, request_headers: Headers) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    return bool(if_none_match) and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")])
+
+@router.get("/binary/{qualifier}")
+async def get_binary_structure(request: Request, qualifier: str, source: Literal[".cif", "_relaxed.pdb"] = ".cif"):
+    """
+    A structural model (qualifier: an EF- or CF- model name, such as CF-AAA12345.1_1) in a compact columnar binary
+    format: coordinates, atom and residue names, chains and per-residue pLDDT, converted from its source file on first
+    request. See app/utils/binary_structure.py for the layout.
+    """
+    if not qualifier.startswith(("EF-", "CF-")) or os.path.basename(qualifier) != qualifier:
+        raise HTTPException(status_code=404, detail="No Model Found")
+    path = f"{STRUCTURAL_MODELS_PATH}{qualifier}{source}"
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="No Model Found")
+
+    headers = {
+        **derived_validators(stat_result, source.lstrip("._") + "-v3db"),
+        "content-disposition": f"inline; filename={qualifier}{BINARY_SUFFIX}",
+    }
+    if _not_modified(headers["etag"], Headers(scope=request.scope)):
+        return NotModifiedResponse(Headers(headers))
+    try:
+        if structure_sidecar_cache:
+            binary_path = await structure_sidecar_cache.get(path, stat_result, source + BINARY_SUFFIX, lambda data: encode_structure_file(data, source))
+            return LargeChunkFileResponse(binary_path, headers=headers, media_type="application/octet-stream")
+        return Response(await asyncio.to_thread(_convert, path, source), headers=headers, media_type="application/octet-stream")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"The model could not be converted: {e}")
+
+def plddt_summary(record_id: str, per_residue: bool) -> dict:
+    """
+    Residue count, mean pLDDT and (if per_residue) the pLDDT of each residue of the record's ColabFold and ESMFold
+    models, from the pLDDT store; None for a model it doesn't hold
+    """
+    summary = {"record_id": record_id}
+    for predictor, prefix in PREDICTORS.items():
+        plddt = plddt_store.get(prefix + record_id)
+        if plddt is None:
+            summary[predictor] = None
+            continue
+        summary[predictor] = {
+            "residues": len(plddt),
+            "mean_plddt": round(float(plddt.mean()), 2) if len(plddt) else None,
+        }
+        if per_residue:
+            summary[predictor]["plddt"] = plddt.tolist()
+    return summary
+
+def check_plddt_store():
+    if not plddt_store.available:
+        raise HTTPException(status_code=503, detail="The pLDDT store has not been built")
+
+@router.get("/plddt/{record_id}", response_model=dict)
+async def get_plddt(record_id: str, per_residue: bool = True):
+    """
+    Per-residue pLDDT, residue count and mean pLDDT of a protein structure's models (by record_id), without
+    downloading the model files
+    """
+    check_plddt_store()
+    summary = plddt_summary(record_id, per_residue)
+    if summary["colabfold"] is None and summary["esmfold"] is None:
+        raise HTTPException(status_code=404, detail="No Models Found")
+    return ORJSONResponse(summary)
+
+@router.get("/plddt/", response_model=dict)
+async def get_plddt_batch(record_ids: str, per_residue: bool = False):
+    """
+    pLDDT summaries of many protein structures: record_ids is a comma-separated list of up to 500 record IDs. Set
+    per_residue to include each residue's pLDDT.
+    """
+    check_plddt_store()
+    ids = list(dict.fromkeys(record_id.strip() for record_id in record_ids.split(",") if record_id.strip()))
+    if not ids:
+        raise HTTPException(status_code=400, detail="No record IDs given")
+    if len(ids) > PLDDT_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {PLDDT_BATCH_MAX} record IDs may be requested at once")
+    return ORJSONResponse({"results": [plddt_summary(record_id, per_residue) for record_id in ids]})
@@ -2,7 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db import get_protein_structures_collection
 from app.models.viruses import *
-from app.utils.helpers import validate_regex, calculate_match_score
+from app.utils.helpers import MatchScorer, rank_page, validate_regex
+from app.utils.name_index import literal_term
+from app.utils.virus_catalogue import virus_catalogue
 
 router = APIRouter(
     prefix="/viruses",
@@ -20,35 +22,43 @@ async def get_viruses(qualifier: str, page_size: int = None, page_num: int = Non
     
     qualifier = validate_regex(qualifier)
 
-    virus_query = { 
-        "$or": [
-            {"Virus name(s)": {"$regex": qualifier, "$options": "i"}},
-            {"Virus name abbreviation(s)": {"$regex": qualifier, "$options": "i"}},
-            {"Species": {"$regex": qualifier, "$options": "i"}}
-        ]
-    }
-    
-    virus_cursor = db.aggregate([
-        {"$match": virus_query},
-        {"$group": {"_id": "$Virus name(s)"}},
-    ])
-    
-    virus_name_results = await virus_cursor.to_list(length=None) 
+    term = literal_term(qualifier)
+
+    # Plain substring searches are answered by the in-memory virus catalogue; patterns using regex syntax still go to Mongo
+    if term != None:
+        catalogue = await virus_catalogue.load(db)
+        virus_name_results = [{"_id": virus["name"]} for virus in catalogue.search(term)]
+
+    else:
+        virus_query = { 
+            "$or": [
+                {"Virus name(s)": {"$regex": qualifier, "$options": "i"}},
+                {"Virus name abbreviation(s)": {"$regex": qualifier, "$options": "i"}},
+                {"Species": {"$regex": qualifier, "$options": "i"}}
+            ]
+        }
+        
+        virus_cursor = db.aggregate([
+            {"$match": virus_query},
+            {"$group": {"_id": "$Virus name(s)"}},
+        ])
+        
+        virus_name_results = await virus_cursor.to_list(length=None) 
     
-    # Sort results by relevance based on the calculated score
-    sorted_results = sorted(
+    # Rank results by relevance based on the calculated score, keeping only the requested page
+    match_score = MatchScorer(qualifier)
+    paginated_results = rank_page(
         virus_name_results, 
-        key=lambda x: calculate_match_score(x['_id'], qualifier),
-        reverse=True
+        key=lambda x: match_score(x['_id']),
+        skips=skips,
+        page_size=page_size
     )
-    
-    paginated_results = sorted_results[skips:skips + page_size] if page_size else sorted_results
 
     if not paginated_results:
         raise HTTPException(status_code=404, detail="No Matches Found")
     
     return VirusName(
         search_term=qualifier,
-        count = len(sorted_results),
+        count = len(virus_name_results),
         viruses=paginated_results).model_dump(by_alias=False
     )
\ No newline at end of file
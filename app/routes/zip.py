@@ -1,12 +1,15 @@
-from app.utils.env_variables import STRUCTURAL_MODELS_PATH
+from app.utils.env_variables import STRUCTURAL_MODELS_PATH, ZIP_COMPRESSION, ZIP_COMPRESSION_WORKERS, ZIP_COMPRESSION_WINDOW
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db import get_clusters_collection, get_protein_structures_collection
+from app.utils.zipstream import ZIP_DEFLATED, ZipStream, coalesce, compress_file, ordered_parallel, read_predeflated
+from app.utils.predeflate import is_fresh, predeflated_path
+from app.utils.zip_cache import zip_cache
+from concurrent.futures import ThreadPoolExecutor
 import csv
-from io import BytesIO, StringIO
+from io import StringIO
 import os
-import zipfile
 from .limiter import limiter
 
 router = APIRouter(
@@ -15,21 +18,74 @@ router = APIRouter(
     responses={404: {"description": "Not Found"}},
 )
 
-@router.get('/virus/{qualifier}/{format}', include_in_schema=False)
-@limiter.limit("3/minute")
-async def get_structural_models_Zip_by_strucure_IDs(request: Request, qualifier: str, format: str, db: AsyncIOMotorDatabase = Depends(get_protein_structures_collection)):
-    
-    if format not in [".cif", "_relaxed.pdb"]:
-        raise HTTPException(status_code=400, detail="The file extension provided is not available")
+# Deflate level per ZIP_COMPRESSION mode. 'predeflated' copies sidecar files, and compresses with this level when one is missing.
+COMPRESSION_LEVELS = {"stored": 0, "fast": 1, "max": 9, "predeflated": 9}
 
-    query = {"Virus name(s)": qualifier}
-    cursor = db.find(query)
+if ZIP_COMPRESSION not in COMPRESSION_LEVELS:
+    raise ValueError(f"ZIP_COMPRESSION must be one of {list(COMPRESSION_LEVELS)}")
 
-    json = await cursor.to_list(length=None)
+# zlib releases the GIL, so members compress in parallel on these threads. The pool is shared, which caps the CPU all downloads can use together.
+compression_executor = ThreadPoolExecutor(max_workers=ZIP_COMPRESSION_WORKERS, thread_name_prefix="zip")
 
-    if not json:
-        raise HTTPException(status_code=404, detail="No Models Found")
+def load_model(filename: str, compression: str) -> tuple[str, int, int, int, bytes]:
+    """
+    Read one structural model and compress it according to compression, returning (filename, method, crc, size, data)
+    """
+    path = f'{STRUCTURAL_MODELS_PATH}{filename}'
+    if compression == "predeflated":
+        sidecar = predeflated_path(filename)
+        if is_fresh(path, sidecar):
+            crc, size, data = read_predeflated(sidecar)
+            return filename, ZIP_DEFLATED, crc, size, data
+    return (filename, *compress_file(path, COMPRESSION_LEVELS[compression]))
+
+def stream_zip(qualifier: str, format: str, csv_content: str, record_ids: list, compression: str = ZIP_COMPRESSION):
+    """
+    Generate the archive chunk by chunk: the metadata CSV, then whichever of the EF- and CF- models exist for each record.
+    StreamingResponse iterates this sync generator in a worker thread, so file reads stay off the event loop.
+    Models are compressed ZIP_COMPRESSION_WINDOW at a time on the shared pool and written in order, so wall time
+    scales with cores while memory stays bounded however many models there are.
+    """
+    zip_stream = ZipStream()
+
+    filenames = [
+        f'{prefix}{id}{format}'
+        for id in record_ids
+        for prefix in ['EF-', 'CF-']
+        if os.path.exists(f'{STRUCTURAL_MODELS_PATH}{prefix}{id}{format}')
+    ]
+
+    def members():
+        yield from zip_stream.add_file(f'{qualifier}_metadata.csv', [csv_content.encode()], compress_level=COMPRESSION_LEVELS[compression])
+
+        models = ordered_parallel(compression_executor, lambda filename: load_model(filename, compression), filenames, ZIP_COMPRESSION_WINDOW)
+        for filename, method, crc, size, data in models:
+            yield from zip_stream.add_compressed(filename, data, method, crc, size)
+
+        yield from zip_stream.finish()
+
+    yield from coalesce(members())
+
+def metadata_csv(csvfile: list) -> str:
+
+    # Create CSV object
+    csv_buffer = StringIO()
+    csv_writer = csv.writer(csv_buffer)
     
+    # Write CSV header and rows
+    header_written = False
+    for record in csvfile:
+        if not header_written:
+            csv_writer.writerow(record.keys())  # Write headers
+            header_written = True
+        csv_writer.writerow(record.values())  # Write each row
+
+    return csv_buffer.getvalue()
+
+def virus_archive_contents(json: list) -> tuple[str, list]:
+    """
+    Metadata CSV and record IDs for the archive of a virus, from its protein structure documents
+    """
     results = []
     csvfile = []
     
@@ -49,59 +105,12 @@ async def get_structural_models_Zip_by_strucure_IDs(request: Request, qualifier:
         })
         results.append(row['_id'])
 
-    # Create CSV object
-    csv_buffer = StringIO()
-    csv_writer = csv.writer(csv_buffer)
-    
-    # Write CSV header and rows
-    header_written = False
-    for record in csvfile:
-        if not header_written:
-            csv_writer.writerow(record.keys())  # Write headers
-            header_written = True
-        csv_writer.writerow(record.values())  # Write each row
-    
-    # Reset buffer position to start
-    csv_buffer.seek(0)
-    
-    # Create the zip file in memory
-    zip_buffer = BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
-        
-        # Add the CSV file to the zip
-        zf.writestr(f'{qualifier}_metadata.csv', csv_buffer.getvalue())
-        
-        # Add each PDB file to the zip
-        for id in results:
-            path = f'{STRUCTURAL_MODELS_PATH}EF-{id}{format}'
-            if os.path.exists(path):
-                zf.write(f'{STRUCTURAL_MODELS_PATH}EF-{id}{format}', arcname=f'EF-{id}{format}')
-            zf.write(f'{STRUCTURAL_MODELS_PATH}CF-{id}{format}', arcname=f'CF-{id}{format}')
-         
-    # Prepare zip for streaming response
-    zip_buffer.seek(0)
-    
-    return StreamingResponse(
-        zip_buffer,
-        media_type="application/zip",
-        headers={"Content-Disposition": f"attachment; filename={qualifier}_{format}.zip"},
-    )
-
-@router.get('/cluster/{qualifier}/{format}', include_in_schema=False)
-@limiter.limit("3/minute")
-async def get_structural_models_Zip_by_cluster_ID(request: Request, qualifier: str, format: str, db: AsyncIOMotorDatabase = Depends(get_clusters_collection)):
-    
-    if format not in [".cif", "_relaxed.pdb"]:
-        raise HTTPException(status_code=400, detail="The file extension provided is not available")
+    return metadata_csv(csvfile), results
 
-    json = await db.find_one({ "_id": qualifier })
-    
-    print(json)
-
-    if not json:
-        raise HTTPException(status_code=404, detail="No Models Found")
-    
+def cluster_archive_contents(json: dict) -> tuple[str, list]:
+    """
+    Metadata CSV and record IDs for the archive of a cluster, from its cluster document
+    """
     results = []
     csvfile = []
     
@@ -122,41 +131,65 @@ async def get_structural_models_Zip_by_cluster_ID(request: Request, qualifier: s
         
         results.append(row['member_record_id'])
 
-    # Create CSV object
-    csv_buffer = StringIO()
-    csv_writer = csv.writer(csv_buffer)
-    
-    # Write CSV header and rows
-    header_written = False
-    for record in csvfile:
-        if not header_written:
-            csv_writer.writerow(record.keys())  # Write headers
-            header_written = True
-        csv_writer.writerow(record.values())  # Write each row
+    return metadata_csv(csvfile), results
+
+def archive_file_response(path: str, qualifier: str, format: str) -> FileResponse:
+    return FileResponse(
+        path,
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={qualifier}_{format}.zip"},
+    )
+
+async def archive_response(kind: str, qualifier: str, format: str, csv_content: str, results: list):
+    """
+    Stream the archive as it is built, writing it into the zip cache at the same time if the cache is enabled
+    """
+    build = lambda: stream_zip(qualifier, format, csv_content, results)
+    return StreamingResponse(
+        zip_cache.stream(kind, qualifier, format, build) if zip_cache else build(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={qualifier}_{format}.zip"},
+    )
+
+@router.get('/virus/{qualifier}/{format}', include_in_schema=False)
+@limiter.limit("3/minute")
+async def get_structural_models_Zip_by_strucure_IDs(request: Request, qualifier: str, format: str, db: AsyncIOMotorDatabase = Depends(get_protein_structures_collection)):
     
-    # Reset buffer position to start
-    csv_buffer.seek(0)
+    if format not in [".cif", "_relaxed.pdb"]:
+        raise HTTPException(status_code=400, detail="The file extension provided is not available")
+
+    cached = zip_cache.lookup("virus", qualifier, format) if zip_cache else None
+    if cached:
+        return archive_file_response(cached, qualifier, format)
+
+    query = {"Virus name(s)": qualifier}
+    cursor = db.find(query)
+
+    json = await cursor.to_list(length=None)
+
+    if not json:
+        raise HTTPException(status_code=404, detail="No Models Found")
     
-    # Create the zip file in memory
-    zip_buffer = BytesIO()
+    csv_content, results = virus_archive_contents(json)
+
+    return await archive_response("virus", qualifier, format, csv_content, results)
+
+@router.get('/cluster/{qualifier}/{format}', include_in_schema=False)
+@limiter.limit("3/minute")
+async def get_structural_models_Zip_by_cluster_ID(request: Request, qualifier: str, format: str, db: AsyncIOMotorDatabase = Depends(get_clusters_collection)):
     
-    with zipfile.ZipFile(zip_buffer, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
-        
-        # Add the CSV file to the zip
-        zf.writestr(f'{qualifier}_metadata.csv', csv_buffer.getvalue())
-        
-        # Add each PDB file to the zip
-        for member_record_id in results:
-            path = f'{STRUCTURAL_MODELS_PATH}EF-{member_record_id}{format}'
-            if os.path.exists(path):
-                zf.write(f'{STRUCTURAL_MODELS_PATH}EF-{member_record_id}{format}', arcname=f'EF-{member_record_id}{format}')
-            zf.write(f'{STRUCTURAL_MODELS_PATH}CF-{member_record_id}{format}', arcname=f'CF-{member_record_id}{format}')
-         
-    # Prepare zip for streaming response
-    zip_buffer.seek(0)
+    if format not in [".cif", "_relaxed.pdb"]:
+        raise HTTPException(status_code=400, detail="The file extension provided is not available")
+
+    cached = zip_cache.lookup("cluster", qualifier, format) if zip_cache else None
+    if cached:
+        return archive_file_response(cached, qualifier, format)
+
+    json = await db.find_one({ "_id": qualifier })
+
+    if not json:
+        raise HTTPException(status_code=404, detail="No Models Found")
     
-    return StreamingResponse(
-        zip_buffer,
-        media_type="application/zip",
-        headers={"Content-Disposition": f"attachment; filename={qualifier}_{format}.zip"},
-    )
\ No newline at end of file
+    csv_content, results = cluster_archive_contents(json)
+
+    return await archive_response("cluster", qualifier, format, csv_content, results)
\ No newline at end of file
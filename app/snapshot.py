@@ -0,0 +1,383 @@
+import asyncio
+import heapq
+import json
+import os
+import re
+import sys
+import threading
+from functools import lru_cache
+
+# Read-only, in-memory stand-in for the Mongo collections, loaded from the JSON exports that import_json.sh imports.
+# It implements the part of the Motor collection API the app uses (find, find_one, count_documents and a few aggregate
+# stages) with equality indexes on the fields the routes look up, so every route can be served without a database.
+# Queries run in a worker thread, so a scan (e.g. an unindexed $regex over every document) doesn't stall the event loop.
+
+SNAPSHOT_FILES = {
+    "proteinstructures": "protein_structures.json",
+    "genome_coordinates": "genome_coordinates.json",
+    "clusters": "clusters.json",
+}
+
+INDEXED_FIELDS = {
+    "proteinstructures": ["protein_id", "Virus name(s)"],
+    "genome_coordinates": ["coordinates.virus_name"],
+    "clusters": ["cluster_members.member_record_id"],
+}
+
+@lru_cache(maxsize=1024)
+def _compile(pattern: str, options: str):
+    flags = 0
+    for option, flag in [("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL), ("x", re.VERBOSE)]:
+        if option in options:
+            flags |= flag
+    return re.compile(pattern, flags)
+
+def _values(document, path: str) -> list:
+    """
+    Values at a dotted path, descending into arrays as Mongo does. Arrays are returned along with their elements,
+    so a condition can match either the whole array or any element.
+    """
+    if "." not in path:
+        if path not in document:
+            return []
+        value = document[path]
+        return [value, *value] if isinstance(value, list) else [value]
+    values = [document]
+    for key in path.split("."):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                if key in value:
+                    found.append(value[key])
+            elif isinstance(value, list):
+                found.extend(item[key] for item in value if isinstance(item, dict) and key in item)
+        values = found
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+def _comparable(a, b) -> bool:
+    return isinstance(a, (int, float)) == isinstance(b, (int, float)) and (isinstance(a, (int, float)) or type(a) is type(b))
+
+def _condition_matches(values: list, condition) -> bool:
+    if not (isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition)):
+        return condition in values if values else condition is None
+
+    for operator, argument in condition.items():
+        if operator == "$regex":
+            regex = _compile(argument, condition.get("$options", ""))
+            if not any(isinstance(value, str) and regex.search(value) for value in values):
+                return False
+        elif operator == "$options":
+            continue
+        elif operator == "$eq":
+            if not _condition_matches(values, argument):
+                return False
+        elif operator == "$ne":
+            if _condition_matches(values, argument):
+                return False
+        elif operator == "$in":
+            if not any(_condition_matches(values, item) for item in argument):
+                return False
+        elif operator == "$nin":
+            if any(_condition_matches(values, item) for item in argument):
+                return False
+        elif operator == "$exists":
+            if bool(values) != bool(argument):
+                return False
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            compare = {
+                "$gt": lambda a, b: a > b,
+                "$gte": lambda a, b: a >= b,
+                "$lt": lambda a, b: a < b,
+                "$lte": lambda a, b: a <= b,
+            }[operator]
+            if not any(_comparable(value, argument) and compare(value, argument) for value in values):
+                return False
+        elif operator == "$elemMatch":
+            arrays = [value for value in values if isinstance(value, list)]
+            if not any(isinstance(item, dict) and matches(item, argument) for array in arrays for item in array):
+                return False
+        else:
+            raise NotImplementedError(f"Query operator {operator} is not supported by the snapshot backend")
+    return True
+
+def matches(document: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise NotImplementedError(f"Query operator {key} is not supported by the snapshot backend")
+        elif not _condition_matches(_values(document, key), condition):
+            return False
+    return True
+
+def _project(document: dict, projection) -> dict:
+    if not projection:
+        return dict(document)
+    if all(not value for key, value in projection.items() if key != "_id"):
+        projected = {key: value for key, value in document.items() if key not in projection}
+        if projection.get("_id", 1):
+            projected["_id"] = document["_id"]
+        return projected
+    projected = {key: document[key] for key in projection if projection[key] and key in document and "." not in key}
+    if projection.get("_id", 1) and "_id" in document:
+        projected = {"_id": document["_id"], **projected}
+    return projected
+
+def _sort_key(value):
+    # Mongo orders missing/null first, then numbers, then strings
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, str(value))
+
+def _sort(documents: list, keys) -> list:
+    if isinstance(keys, str):
+        keys = [(keys, 1)]
+    for key, direction in reversed(keys):
+        documents = sorted(documents, key=lambda document: _sort_key(document.get(key)), reverse=direction < 0)
+    return documents
+
+class SnapshotCursor:
+    """
+    Lazily evaluated result of find() or aggregate(), supporting sort/skip/limit, to_list and async iteration
+    """
+
+    def __init__(self, produce, projection=None):
+        self._produce = produce
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction: int = 1):
+        self._sort = key if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _results(self) -> list:
+        documents = self._produce()
+        if self._sort and self._limit and len(self._sort) == 1:
+            # only the first skip + limit documents are needed, e.g. a page in _id order
+            key, direction = self._sort[0]
+            select = heapq.nsmallest if direction > 0 else heapq.nlargest
+            documents = select(self._skip + self._limit, documents, key=lambda document: _sort_key(document.get(key)))
+        elif self._sort:
+            documents = _sort(documents, self._sort)
+        documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        return [_project(document, self._projection) for document in documents]
+
+    async def to_list(self, length=None) -> list:
+        results = await asyncio.to_thread(self._results)
+        return results[:length] if length else results
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in await asyncio.to_thread(self._results):
+            yield document
+
+class SnapshotCollection:
+    """
+    A collection's documents in natural (file) order, with a dict by _id and equality indexes on indexed_fields
+    """
+
+    def __init__(self, name: str, documents: list, indexed_fields: list = ()):
+        self.name = name
+        self.indexed_fields = list(indexed_fields)
+        self.replace(documents)
+
+    def replace(self, documents: list):
+        """
+        Swap in a new set of documents, keeping this object (which routes and search indexes hold on to)
+        """
+        by_id = {document["_id"]: position for position, document in enumerate(documents)}
+        indexes = {}
+        for field in self.indexed_fields:
+            index = {}
+            for position, document in enumerate(documents):
+                for value in _values(document, field):
+                    if isinstance(value, (str, int, float)):
+                        positions = index.setdefault(value, [])
+                        if not positions or positions[-1] != position:
+                            positions.append(position)
+            indexes[field] = index
+        # one attribute, so a query running in a worker thread sees either the old or the new documents and indexes
+        self._state = (documents, by_id, indexes)
+
+    @property
+    def _documents(self) -> list:
+        return self._state[0]
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _candidates(self, query: dict, by_id: dict, indexes: dict):
+        """
+        Positions of the documents that can match query, from an index when a clause allows it, else None (scan)
+        """
+        for key, condition in query.items():
+            if key == "$and":
+                for clause in condition:
+                    candidates = self._candidates(clause, by_id, indexes)
+                    if candidates is not None:
+                        return candidates
+            elif key == "_id" or key in indexes:
+                lookup = (lambda value: [by_id[value]] if value in by_id else []) if key == "_id" else (lambda value: indexes[key].get(value, []))
+                if isinstance(condition, dict) and set(condition) == {"$in"}:
+                    return sorted({position for value in condition["$in"] if isinstance(value, (str, int, float)) for position in lookup(value)})
+                if isinstance(condition, (str, int, float)):
+                    return lookup(condition)
+            elif isinstance(condition, dict) and set(condition) == {"$elemMatch"}:
+                for sub_key, sub_condition in condition["$elemMatch"].items():
+                    path = f"{key}.{sub_key}"
+                    if path in indexes and isinstance(sub_condition, (str, int, float)):
+                        return indexes[path].get(sub_condition, [])
+        return None
+
+    def _matching(self, query: dict) -> list:
+        query = query or {}
+        documents, by_id, indexes = self._state
+        candidates = self._candidates(query, by_id, indexes)
+        documents = documents if candidates is None else [documents[position] for position in candidates]
+        return [document for document in documents if matches(document, query)]
+
+    def find(self, query: dict = None, projection=None) -> SnapshotCursor:
+        return SnapshotCursor(lambda: self._matching(query), projection)
+
+    async def find_one(self, query: dict = None, projection=None):
+        results = await self.find(query, projection).limit(1).to_list(length=1)
+        return results[0] if results else None
+
+    async def count_documents(self, query: dict, limit: int = 0, **kwargs) -> int:
+        count = len(await asyncio.to_thread(self._matching, query))
+        return min(count, limit) if limit else count
+
+    async def estimated_document_count(self) -> int:
+        return len(self._documents)
+
+    def aggregate(self, pipeline: list) -> SnapshotCursor:
+        return SnapshotCursor(lambda: _aggregate(self, pipeline))
+
+def _expression(document: dict, expression):
+    if isinstance(expression, str) and expression.startswith("$"):
+        values = _values(document, expression[1:])
+        return values[0] if values else None
+    if isinstance(expression, dict) and set(expression) == {"$size"}:
+        value = _expression(document, expression["$size"])
+        return len(value) if isinstance(value, list) else 0
+    return expression
+
+def _aggregate(collection: SnapshotCollection, pipeline: list) -> list:
+    documents = None
+    for stage in pipeline:
+        (operator, argument), = stage.items()
+        if operator == "$match":
+            documents = collection._matching(argument) if documents is None else [document for document in documents if matches(document, argument)]
+            continue
+        if documents is None:
+            documents = collection._documents
+        if operator == "$group":
+            groups = {}
+            for document in documents:
+                key = _expression(document, argument["_id"])
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = {"_id": key, **{name: 0 for name in argument if name != "_id"}}
+                for name, accumulator in argument.items():
+                    if name == "_id":
+                        continue
+                    (accumulator_operator, value), = accumulator.items()
+                    if accumulator_operator != "$sum":
+                        raise NotImplementedError(f"Accumulator {accumulator_operator} is not supported by the snapshot backend")
+                    group[name] += _expression(document, value) or 0
+            documents = list(groups.values())
+        elif operator == "$project":
+            documents = [
+                {"_id": document["_id"], **{name: (document.get(name) if value in (1, True) else _expression(document, value)) for name, value in argument.items() if name != "_id"}}
+                for document in documents
+            ]
+        elif operator == "$sort":
+            documents = _sort(documents, list(argument.items()))
+        elif operator == "$skip":
+            documents = documents[argument:]
+        elif operator == "$limit":
+            documents = documents[:argument]
+        else:
+            raise NotImplementedError(f"Aggregation stage {operator} is not supported by the snapshot backend")
+    return collection._documents if documents is None else documents
+
+def _intern(value):
+    # Taxonomy, host and virus names repeat across thousands of documents; interning stores each string once
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {sys.intern(key): _intern(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_intern(item) for item in value]
+    return value
+
+def load_documents(path: str, name: str) -> list:
+    with open(os.path.join(path, SNAPSHOT_FILES[name])) as f:
+        return [_intern(document) for document in json.load(f)]
+
+def load_collection(path: str, name: str) -> SnapshotCollection:
+    return SnapshotCollection(name, load_documents(path, name), INDEXED_FIELDS.get(name, []))
+
+class Snapshot:
+    """
+    The collections loaded from a directory of JSON exports, each loaded once on first use
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def get_collection(self, name: str) -> SnapshotCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            with self._lock:
+                collection = self._collections.get(name)
+                if collection is None:
+                    collection = self._collections[name] = load_collection(self.path, name)
+        return collection
+
+    def load_all(self):
+        for name in SNAPSHOT_FILES:
+            self.get_collection(name)
+
+    def reload(self) -> list[str]:
+        """
+        Re-read the exports of the collections already loaded, e.g. after new data is exported. Each collection is
+        swapped in place once its new documents are parsed, so requests keep being served from the old data meanwhile.
+        """
+        with self._lock:
+            collections = list(self._collections.items())
+        for name, collection in collections:
+            collection.replace(load_documents(self.path, name))
+        return [name for name, _ in collections]
@@ -0,0 +1,208 @@
+import json
+import shlex
+import struct
+import numpy as np
+
+# Compact columnar encoding of a structural model, holding what the viewer draws: atom coordinates, names and elements,
+# residue names, numbers and chains, and per-residue pLDDT. Like BinaryCIF, each column is stored as a typed array with
+# a list of encodings to undo, in order, when reading it:
+#
+#   b"V3DB" | header length (uint32, little-endian) | JSON header, padded to 4 bytes | column data
+#
+# The header gives the atom and residue counts and, for each column, its dtype, byte offset and length in the data,
+# and encodings: {"kind": "fixed_point", "factor": f} (divide by f), {"kind": "delta"} (cumulative sum) or
+# {"kind": "dictionary", "values": [...]} (index into values). Every column starts at a multiple of 4 bytes, so a
+# browser can view it as a typed array without copying.
+
+MAGIC = b"V3DB"
+VERSION = 1
+BINARY_SUFFIX = ".v3db"
+
+def _smallest_int(values: np.ndarray, dtypes=(np.int8, np.int16, np.int32)) -> np.ndarray:
+    for dtype in dtypes:
+        info = np.iinfo(dtype)
+        if values.size == 0 or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(dtype)
+    return values.astype(np.int64)
+
+def _fixed_point_delta(values: np.ndarray, factor: int) -> tuple:
+    integers = np.round(values * factor).astype(np.int64)
+    deltas = np.diff(integers, prepend=0)
+    return _smallest_int(deltas), [{"kind": "fixed_point", "factor": factor}, {"kind": "delta"}]
+
+def _dictionary(values: np.ndarray) -> tuple:
+    keys, indices = np.unique(values, return_inverse=True)
+    return _smallest_int(indices, (np.uint8, np.uint16, np.uint32)), [{"kind": "dictionary", "values": [key.decode() for key in keys]}]
+
+def _residue_starts(chains: np.ndarray, numbers: np.ndarray, insertion_codes: np.ndarray) -> np.ndarray:
+    changed = (chains[1:] != chains[:-1]) | (numbers[1:] != numbers[:-1]) | (insertion_codes[1:] != insertion_codes[:-1])
+    return np.concatenate([[0], np.flatnonzero(changed) + 1])
+
+def residues(atoms: dict) -> tuple:
+    """
+    (first atom, end, pLDDT atom) index arrays of the residues in atom columns, the pLDDT atom being each residue's
+    first CA atom, or its first atom if it has none
+    """
+    starts = _residue_starts(atoms["chain"], atoms["residue_number"], atoms["insertion_code"])
+    ends = np.append(starts[1:], len(atoms["x"]))
+    plddt_atoms = starts.copy()
+    ca = np.flatnonzero(atoms["atom_name"] == b"CA")
+    residue_of_ca = np.searchsorted(starts, ca, side="right") - 1
+    plddt_atoms[residue_of_ca[::-1]] = ca[::-1] # the first CA of each residue wins
+    return starts, ends, plddt_atoms
+
+def encode(atoms: dict) -> bytes:
+    """
+    Encode atom columns - x, y, z, b_factor (float arrays), atom_name, element, residue_name, chain, insertion_code
+    (bytes arrays) and residue_number (int array) - as described above. Residue columns take the values of each
+    residue's first atom, except pLDDT, which is taken from its CA atom (or first atom).
+    """
+    count = len(atoms["x"])
+    if count == 0:
+        raise ValueError("The structure has no atoms")
+    starts, ends, plddt_atoms = residues(atoms)
+
+    columns = {
+        "x": _fixed_point_delta(atoms["x"], 1000),
+        "y": _fixed_point_delta(atoms["y"], 1000),
+        "z": _fixed_point_delta(atoms["z"], 1000),
+        "atom_name": _dictionary(atoms["atom_name"]),
+        "element": _dictionary(atoms["element"]),
+        "residue_atom_count": (_smallest_int(ends - starts, (np.uint8, np.uint16, np.uint32)), []),
+        "residue_name": _dictionary(atoms["residue_name"][starts]),
+        "residue_number": (_smallest_int(np.diff(atoms["residue_number"][starts].astype(np.int64), prepend=0)), [{"kind": "delta"}]),
+        "chain": _dictionary(atoms["chain"][starts]),
+        "plddt": (np.round(atoms["b_factor"][plddt_atoms] * 100).clip(0, 65535).astype(np.uint16), [{"kind": "fixed_point", "factor": 100}]),
+    }
+
+    header = {"version": VERSION, "atoms": count, "residues": len(starts), "columns": []}
+    data = bytearray()
+    for name, (values, encodings) in columns.items():
+        data += b"\0" * (-len(data) % 4)
+        raw = values.astype(values.dtype.newbyteorder("<")).tobytes()
+        header["columns"].append({"name": name, "dtype": values.dtype.newbyteorder("<").str, "offset": len(data), "length": len(raw), "encodings": encodings})
+        data += raw
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    header_bytes += b" " * (-(len(MAGIC) + 4 + len(header_bytes)) % 4)
+    return MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes + bytes(data)
+
+def decode(data: bytes) -> dict:
+    """
+    The columns of an encoded structure, with their encodings undone: numpy arrays, and lists of strings for the
+    dictionary-encoded columns
+    """
+    if data[:4] != MAGIC:
+        raise ValueError("Not an encoded structure")
+    (header_length,) = struct.unpack_from("<I", data, 4)
+    header = json.loads(data[8:8 + header_length])
+    body = memoryview(data)[8 + header_length:]
+    columns = {}
+    for column in header["columns"]:
+        values = np.frombuffer(body[column["offset"]:column["offset"] + column["length"]], dtype=column["dtype"])
+        for encoding in reversed(column["encodings"]):
+            if encoding["kind"] == "delta":
+                values = np.cumsum(values, dtype=np.int64)
+            elif encoding["kind"] == "fixed_point":
+                values = values / encoding["factor"]
+            elif encoding["kind"] == "dictionary":
+                values = [encoding["values"][index] for index in values]
+        columns[column["name"]] = values
+    return columns
+
+def parse_pdb(text: bytes) -> dict:
+    """
+    Atom columns of the ATOM/HETATM records of the first model of a PDB file, sliced from its fixed-width columns
+    """
+    lines = []
+    for line in text.splitlines():
+        if line.startswith((b"ATOM  ", b"HETATM")):
+            lines.append(line[:80].ljust(80))
+        elif line.startswith(b"ENDMDL"):
+            break
+    records = np.frombuffer(b"".join(lines), dtype="S1").reshape(len(lines), 80)
+
+    def column(start: int, end: int) -> np.ndarray:
+        return np.char.strip(np.ascontiguousarray(records[:, start:end]).view(f"S{end - start}").ravel())
+
+    atom_names = column(12, 16)
+    elements = column(76, 78)
+    # old files leave the element out: take it from the atom name's first letter
+    elements = np.where(elements == b"", np.char.lstrip(atom_names, b"0123456789").astype("S1"), elements)
+    return {
+        "atom_name": atom_names,
+        "residue_name": column(17, 20),
+        "chain": column(21, 22),
+        "residue_number": column(22, 26).astype(np.int64),
+        "insertion_code": column(26, 27),
+        "x": column(30, 38).astype(np.float64),
+        "y": column(38, 46).astype(np.float64),
+        "z": column(46, 54).astype(np.float64),
+        "b_factor": column(60, 66).astype(np.float64),
+        "element": elements,
+    }
+
+# mmCIF _atom_site items for each atom column, preferring the author's numbering and chain names as PDB files do
+_CIF_ITEMS = {
+    "atom_name": ["label_atom_id", "auth_atom_id"],
+    "residue_name": ["label_comp_id", "auth_comp_id"],
+    "chain": ["auth_asym_id", "label_asym_id"],
+    "residue_number": ["auth_seq_id", "label_seq_id"],
+    "insertion_code": ["pdbx_PDB_ins_code"],
+    "x": ["Cartn_x"],
+    "y": ["Cartn_y"],
+    "z": ["Cartn_z"],
+    "b_factor": ["B_iso_or_equiv"],
+    "element": ["type_symbol"],
+}
+
+def parse_cif(text: bytes) -> dict:
+    """
+    Atom columns of the _atom_site loop of the first model of an mmCIF file
+    """
+    items = []
+    rows = []
+    in_loop = False
+    for line in text.decode().splitlines():
+        if line.startswith("_atom_site."):
+            items.append(line.split()[0][len("_atom_site."):])
+            in_loop = True
+        elif in_loop:
+            if not line.strip():
+                continue
+            if line.startswith(("loop_", "_", "#")):
+                if rows:
+                    break
+                continue
+            rows.append(shlex.split(line) if '"' in line or "'" in line else line.split())
+    if not items or not rows:
+        raise ValueError("No _atom_site loop")
+    table = np.array(rows, dtype=object)
+    if "pdbx_PDB_model_num" in items:
+        model = table[:, items.index("pdbx_PDB_model_num")]
+        table = table[model == model[0]]
+
+    atoms = {}
+    for name, candidates in _CIF_ITEMS.items():
+        item = next((item for item in candidates if item in items), None)
+        values = table[:, items.index(item)] if item else np.full(len(table), "?", dtype=object)
+        values = np.where((values == "?") | (values == "."), "", values).astype(str)
+        if name in ("x", "y", "z", "b_factor"):
+            atoms[name] = values.astype(np.float64)
+        elif name == "residue_number":
+            atoms[name] = np.where(values == "", "0", values).astype(np.int64)
+        else:
+            atoms[name] = np.char.encode(values, "ascii")
+    return atoms
+
+def parse_structure_file(text: bytes, format: str) -> dict:
+    """
+    Atom columns of a structural model in format '.cif' or '_relaxed.pdb'
+    """
+    return parse_cif(text) if format == ".cif" else parse_pdb(text)
+
+def encode_structure_file(text: bytes, format: str) -> bytes:
+    """
+    Encoded form of a structural model in format '.cif' or '_relaxed.pdb'
+    """
+    return encode(parse_structure_file(text, format))
@@ -0,0 +1,193 @@
+import asyncio
+from io import StringIO
+from Bio.Blast import NCBIXML
+from app.utils.single_flight import SingleFlight
+from app.utils.env_variables import (
+    BLAST_DB_PATH,
+    BLASTP_BINARY,
+    BLAST_NUM_THREADS,
+    BLAST_MAX_CONCURRENCY,
+    BLAST_MAX_QUEUE,
+    BLAST_TIMEOUT_SECONDS,
+)
+
+class BlastError(Exception):
+    pass
+
+class BlastQueueFull(BlastError):
+    pass
+
+class BlastTimeout(BlastError):
+    pass
+
+class BlastCancelled(BlastError):
+    pass
+
+class BlastRunner:
+    """
+    Runs blastp as an asyncio subprocess so a search never blocks the event loop.
+    At most max_concurrency searches run at once, at most max_queue wait for a slot (further requests are rejected),
+    each run is killed after timeout seconds, and a run is abandoned as soon as its client disconnects.
+    Concurrent searches for the same sequence share one blastp run, abandoned only once all of their clients have gone.
+    """
+
+    def __init__(self, command: list[str], max_concurrency: int, max_queue: int, timeout: float, poll_interval: float = 0.5):
+        self.command = command
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._semaphore = None
+        self._loop = None
+        self.waiting = 0
+        self.running = 0
+        # sequence -> reservation of the searches admitted by run() whose blastp hasn't started yet
+        self._queued = {}
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.flights = SingleFlight()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled,
+            "coalesced": self.flights.coalesced,
+        }
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives are bound to the loop they first wait on, so make a new one if the loop changes
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def run(self, sequence: str, request=None) -> str:
+        """
+        Run a search and return blastp's stdout. If a starlette Request is given, the run is cancelled
+        (and the subprocess killed) when that client disconnects.
+        """
+        reservation = self._queued.get(sequence)
+        if reservation is None and not self.flights.in_flight(sequence):
+            # admitted searches first run once this call yields, so their slot is reserved here: a burst arriving
+            # before any of them starts must still see the ones ahead of it
+            if self.waiting + self.running >= self.max_concurrency + self.max_queue:
+                self.rejected += 1
+                raise BlastQueueFull("Too many sequence searches are queued, please try again later")
+            reservation = self._queued[sequence] = object()
+            self.waiting += 1
+
+        job = asyncio.ensure_future(self.flights.do(sequence, lambda: self._run(sequence, reservation)))
+        try:
+            if request is None:
+                return await job
+
+            watcher = asyncio.ensure_future(self._wait_for_disconnect(request))
+            try:
+                await asyncio.wait({job, watcher}, return_when=asyncio.FIRST_COMPLETED)
+                if job.done():
+                    return job.result()
+                self.cancelled += 1
+                raise BlastCancelled("Client disconnected")
+            finally:
+                watcher.cancel()
+                if not job.done():
+                    # wait for the job to unwind so its subprocess is killed before we return
+                    job.cancel()
+                    await asyncio.gather(job, return_exceptions=True)
+        finally:
+            # a job cancelled before its first step never reaches _run, so its slot is given back here
+            if reservation is not None and not self.flights.in_flight(sequence):
+                self._release(sequence, reservation)
+
+    def _release(self, sequence: str, reservation: object):
+        if self._queued.get(sequence) is reservation:
+            del self._queued[sequence]
+            self.waiting -= 1
+
+    async def _wait_for_disconnect(self, request):
+        while not await request.is_disconnected():
+            await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, sequence: str, reservation: object) -> str:
+        semaphore = self._get_semaphore()
+        try:
+            await semaphore.acquire()
+        finally:
+            # release the slot run() reserved
+            self._release(sequence, reservation)
+
+        self.running += 1
+        try:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *self.command,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+            except OSError as e:
+                self.failed += 1
+                raise BlastError(f"Could not start blastp: {e}")
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(sequence.encode()), self.timeout)
+            except asyncio.TimeoutError:
+                await _kill(process)
+                self.timed_out += 1
+                raise BlastTimeout(f"Sequence search exceeded {self.timeout} seconds")
+            except asyncio.CancelledError:
+                await _kill(process)
+                raise
+
+            if stderr:
+                print(f"Error occurred: {stderr.decode(errors='replace')}")
+
+            if process.returncode != 0:
+                self.failed += 1
+                raise BlastError(f"blastp exited with status {process.returncode}")
+
+            self.completed += 1
+            return stdout.decode()
+        finally:
+            self.running -= 1
+            semaphore.release()
+
+def parse_blast_hits(xml: str) -> list[dict]:
+    """
+    Flatten blastp XML output into one dict per HSP, in the order blastp reported them
+    """
+    hits = []
+    for record in NCBIXML.parse(StringIO(xml)):
+        for alignment in record.alignments:
+            for hsp in alignment.hsps:
+                hits.append({
+                    "structure_id": alignment.hit_def,
+                    "score": hsp.score,
+                    "evalue": hsp.expect,
+                    "hit_length": alignment.length,
+                    "positives": hsp.positives,
+                    "gaps": hsp.gaps,
+                })
+    return hits
+
+async def _kill(process):
+    if process.returncode is None:
+        process.kill()
+        await process.wait()
+
+blast_runner = BlastRunner(
+    command=[BLASTP_BINARY, "-db", BLAST_DB_PATH, "-outfmt", "5", "-num_threads", str(BLAST_NUM_THREADS)],
+    max_concurrency=BLAST_MAX_CONCURRENCY,
+    max_queue=BLAST_MAX_QUEUE,
+    timeout=BLAST_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,193 @@
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from app.utils.env_variables import (
+    BLAST_DB_PATH,
+    BLASTP_BINARY,
+    BLAST_CACHE_MAX_ENTRIES,
+    BLAST_CACHE_TTL_SECONDS,
+    BLAST_CACHE_DIR,
+    BLAST_CACHE_DISK_MAX_BYTES,
+)
+
+class BlastCache:
+    """
+    Cache of parsed blastp hit lists, keyed on a hash of the normalized sequence, the search parameters and the
+    BLAST database files (name, size and mtime of every db_path.* file). Rebuilding the database changes the key,
+    so stale results are never served.
+
+    Entries live in an in-memory LRU and, if a directory is given, in an on-disk tier shared by every worker process.
+    The disk tier is read and written in worker threads, so it never blocks the event loop.
+    """
+
+    def __init__(self, db_path: str, params: dict, max_entries: int, ttl: float, directory: str = None, disk_max_bytes: int = 0, fingerprint_interval: float = 10):
+        self.db_path = db_path
+        self.params = params
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self.fingerprint_interval = fingerprint_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._fingerprint_checked_at = 0.0
+        # size of the disk tier at its last scan plus what this process has written since; None until the first scan
+        self._disk_bytes = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk_enabled": bool(self.directory),
+        }
+
+    def fingerprint(self) -> str:
+        """
+        Identity of the BLAST database files, re-read at most every fingerprint_interval seconds.
+        The memory tier is dropped whenever it changes.
+        """
+        now = time.monotonic()
+        if self._fingerprint is None or now - self._fingerprint_checked_at >= self.fingerprint_interval:
+            files = []
+            for path in sorted(glob.glob(f"{self.db_path}.*")):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+            fingerprint = hashlib.sha256(json.dumps(files).encode()).hexdigest()
+            if fingerprint != self._fingerprint:
+                with self._lock:
+                    self._entries.clear()
+                self._fingerprint = fingerprint
+            self._fingerprint_checked_at = now
+        return self._fingerprint
+
+    def key(self, sequence: str) -> str:
+        payload = {
+            "sequence": "".join(sequence.split()).upper(),
+            "params": self.params,
+            "db": self.fingerprint(),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    async def get(self, sequence: str):
+        key = self.key(sequence)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, hits = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return hits
+                del self._entries[key]
+
+        hits = await asyncio.to_thread(self._read_disk, key) if self.directory else None
+        if hits is not None:
+            self.disk_hits += 1
+            self._remember(key, hits)
+            return hits
+
+        self.misses += 1
+        return None
+
+    async def set(self, sequence: str, hits: list):
+        key = self.key(sequence)
+        self._remember(key, hits)
+        if self.directory:
+            await asyncio.to_thread(self._write_disk, key, hits)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, hits: list):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, hits)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key: str):
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path) as f:
+                hits = json.load(f)
+            os.utime(path) # bump mtime so disk eviction is least-recently-used
+            return hits
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, hits: list):
+        # Write to a temporary file and rename it into place, so other workers never read a partial entry
+        data = json.dumps(hits)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        # the directory is only scanned once the entries written since its last scan may have filled it
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+            over_budget = self._disk_bytes is None or self._disk_bytes > self.disk_max_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+blast_cache = BlastCache(
+    db_path=BLAST_DB_PATH,
+    params={"program": BLASTP_BINARY, "outfmt": 5},
+    max_entries=BLAST_CACHE_MAX_ENTRIES,
+    ttl=BLAST_CACHE_TTL_SECONDS,
+    directory=BLAST_CACHE_DIR,
+    disk_max_bytes=BLAST_CACHE_DISK_MAX_BYTES,
+)
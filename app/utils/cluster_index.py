@@ -0,0 +1,69 @@
+from bisect import bisect_left
+from app.utils.indexes import CollectionIndex
+
+def normalize_accession(accession: str) -> str:
+    return accession.strip().upper()
+
+class ClusterIndex(CollectionIndex):
+    """
+    Cluster member accessions -> the clusters holding them, so a cluster is found from any member without scanning
+    every cluster's member list.
+
+    Exact lookups match a member's record ID or GenBank ID. Prefix lookups match the start of a member's record ID
+    (e.g. a GenBank ID like AFU07689.1 finds member AFU07689.1_4668), with a binary search over the sorted record IDs.
+    Accessions are compared ignoring case. Clusters are returned in the order they appear in the collection.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._cluster_ids = []
+        self._exact = {}
+        self._record_ids = []
+        self._record_clusters = []
+
+    async def build(self, collection):
+        cluster_ids = []
+        exact = {}
+        record_clusters = {}
+        async for row in collection.find({}, {"cluster_members": 1}):
+            ordinal = len(cluster_ids)
+            cluster_ids.append(row["_id"])
+            for member in row.get("cluster_members") or []:
+                record_id = member.get("member_record_id")
+                if not isinstance(record_id, str):
+                    continue
+                accessions = {normalize_accession(record_id)}
+                if isinstance(member.get("genbank_id"), str):
+                    accessions.add(normalize_accession(member["genbank_id"]))
+                for accession in accessions:
+                    exact.setdefault(accession, set()).add(ordinal)
+                record_clusters.setdefault(normalize_accession(record_id), set()).add(ordinal)
+
+        record_ids = sorted(record_clusters)
+        self._cluster_ids = cluster_ids
+        self._exact = exact
+        self._record_ids = record_ids
+        self._record_clusters = [record_clusters[record_id] for record_id in record_ids]
+
+    def __len__(self) -> int:
+        return len(self._cluster_ids)
+
+    def exact(self, accession: str) -> list[str]:
+        """
+        IDs of the clusters with a member whose record ID or GenBank ID is accession
+        """
+        return [self._cluster_ids[ordinal] for ordinal in sorted(self._exact.get(normalize_accession(accession), ()))]
+
+    def prefix(self, prefix: str) -> list[str]:
+        """
+        IDs of the clusters with a member whose record ID starts with prefix
+        """
+        prefix = normalize_accession(prefix)
+        ordinals = set()
+        position = bisect_left(self._record_ids, prefix)
+        while position < len(self._record_ids) and self._record_ids[position].startswith(prefix):
+            ordinals.update(self._record_clusters[position])
+            position += 1
+        return [self._cluster_ids[ordinal] for ordinal in sorted(ordinals)]
+
+cluster_index = ClusterIndex()
@@ -0,0 +1,88 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Optional
+from app.utils.env_variables import COUNT_CACHE_MAX_ENTRIES, COUNT_CACHE_TTL_SECONDS, COUNT_ESTIMATE_LIMIT
+
+def normalize_query(query) -> str:
+    """
+    Canonical form of a Mongo filter: keys sorted, and case-insensitive regexes lowercased when that can't change
+    what they match (no escapes), so 'Gyrovirus' and 'gyrovirus' share a count
+    """
+    def normalize(value):
+        if isinstance(value, dict):
+            value = {key: normalize(item) for key, item in value.items()}
+            if isinstance(value.get("$regex"), str) and "i" in value.get("$options", "") and "\\" not in value["$regex"]:
+                value["$regex"] = value["$regex"].lower()
+            return value
+        if isinstance(value, list):
+            return [normalize(item) for item in value]
+        return value
+    return json.dumps(normalize(query), sort_keys=True, default=str)
+
+class CountCache:
+    """
+    In-memory LRU of count_documents results, keyed on the collection, the normalized query and the count limit,
+    so paging through a result set counts it once per TTL instead of once per page
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    async def count(self, db, query: dict, limit: int = 0) -> int:
+        key = (db, normalize_query(query), limit)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, count = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return count
+            del self._entries[key]
+
+        self.misses += 1
+        count = await db.count_documents(query, limit=limit) if limit else await db.count_documents(query)
+        self._entries[key] = (time.monotonic() + self.ttl, count)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return count
+
+    def clear(self):
+        self._entries.clear()
+
+count_cache = CountCache(COUNT_CACHE_MAX_ENTRIES, COUNT_CACHE_TTL_SECONDS)
+
+async def count_matches(db, query: dict, include_count: bool = True, estimate_count: bool = False) -> tuple[Optional[int], bool]:
+    """
+    (count, count_is_estimate) for a paginated response. The count is None if it wasn't asked for. Estimated counts
+    stop at COUNT_ESTIMATE_LIMIT matches, so when count_is_estimate is true there are at least that many.
+    """
+    if not include_count:
+        return None, False
+    if estimate_count:
+        count = await count_cache.count(db, query, limit=COUNT_ESTIMATE_LIMIT)
+        return count, count >= COUNT_ESTIMATE_LIMIT
+    return await count_cache.count(db, query), False
+
+def report_count(count: int, include_count: bool = True, estimate_count: bool = False) -> tuple[Optional[int], bool]:
+    """
+    (count, count_is_estimate) as count_matches reports them, for a result set that has already been counted
+    """
+    if not include_count:
+        return None, False
+    if estimate_count and count >= COUNT_ESTIMATE_LIMIT:
+        return COUNT_ESTIMATE_LIMIT, True
+    return count, False
@@ -28,3 +28,78 @@ else:
     GRAPH_DATA_PATH = os.environ['DEV_GRAPH_DATA_PATH']
     PDFS_PATH = os.environ['DEV_PDFS_PATH']
     BLAST_DB_PATH = os.environ['DEV_BLAST_DB_PATH']
+
+# MongoDB connection pool settings - shared by every request through the client created in app.db
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 100))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 10))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 300000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 10000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+
+# blastp execution - runs are dispatched to subprocesses by app.utils.blast
+BLASTP_BINARY = os.environ.get('BLASTP_BINARY', 'blastp')
+BLAST_NUM_THREADS = int(os.environ.get('BLAST_NUM_THREADS', 4))
+BLAST_MAX_CONCURRENCY = int(os.environ.get('BLAST_MAX_CONCURRENCY', 2))
+BLAST_MAX_QUEUE = int(os.environ.get('BLAST_MAX_QUEUE', 16))
+BLAST_TIMEOUT_SECONDS = float(os.environ.get('BLAST_TIMEOUT_SECONDS', 120))
+
+# blastp result cache - parsed hit lists keyed on the sequence and the BLAST database files
+BLAST_CACHE_MAX_ENTRIES = int(os.environ.get('BLAST_CACHE_MAX_ENTRIES', 256))
+BLAST_CACHE_TTL_SECONDS = float(os.environ.get('BLAST_CACHE_TTL_SECONDS', 86400))
+BLAST_CACHE_DIR = os.environ.get('BLAST_CACHE_DIR') # optional on-disk tier shared by all workers
+BLAST_CACHE_DISK_MAX_BYTES = int(os.environ.get('BLAST_CACHE_DISK_MAX_BYTES', 256 * 1024 * 1024))
+
+# Identifies the loaded data release - bump it after importing new data so derived caches are rebuilt
+DATA_VERSION = os.environ.get('DATA_VERSION', '1')
+
+# Finished zip archives are cached on disk when ZIP_CACHE_DIR is set
+ZIP_CACHE_DIR = os.environ.get('ZIP_CACHE_DIR')
+ZIP_CACHE_MAX_BYTES = int(os.environ.get('ZIP_CACHE_MAX_BYTES', 10 * 1024 * 1024 * 1024))
+
+# Zip compression: 'stored' (none), 'fast' (deflate level 1), 'max' (deflate level 9) or 'predeflated'
+# (copy the sidecars written by 'python -m app.utils.predeflate' into ZIP_PREDEFLATED_PATH, falling back to 'max')
+ZIP_COMPRESSION = os.environ.get('ZIP_COMPRESSION', 'fast')
+ZIP_PREDEFLATED_PATH = os.environ.get('ZIP_PREDEFLATED_PATH') or STRUCTURAL_MODELS_PATH
+
+# Threads compressing zip members in parallel (shared by all downloads), and how many members each download may have in flight
+ZIP_COMPRESSION_WORKERS = int(os.environ.get('ZIP_COMPRESSION_WORKERS') or os.cpu_count() or 1)
+ZIP_COMPRESSION_WINDOW = int(os.environ.get('ZIP_COMPRESSION_WINDOW') or 2 * ZIP_COMPRESSION_WORKERS)
+
+# Token required by the admin routes (e.g. rebuilding the search indexes after a data reload); they are disabled when unset
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+# Cache of total counts for paginated queries, and where estimated counts (estimate_count=true) stop counting
+COUNT_CACHE_MAX_ENTRIES = int(os.environ.get('COUNT_CACHE_MAX_ENTRIES', 1024))
+COUNT_CACHE_TTL_SECONDS = float(os.environ.get('COUNT_CACHE_TTL_SECONDS', 600))
+COUNT_ESTIMATE_LIMIT = int(os.environ.get('COUNT_ESTIMATE_LIMIT', 1000))
+
+# Validate every protein structure through the Pydantic models when building responses. Off by default: stored data is
+# validated once after import with 'python -m app.utils.serialization', and responses are built directly from it
+VALIDATE_RESPONSES = os.environ.get('VALIDATE_RESPONSES', '').lower() in ('1', 'true', 'yes')
+
+# Where the routes' data comes from: 'mongo', or 'snapshot' to serve everything from memory, loaded from the JSON
+# exports that import_json.sh imports (protein_structures.json, genome_coordinates.json and clusters.json in SNAPSHOT_PATH)
+DATA_BACKEND = os.environ.get('DATA_BACKEND', 'mongo').lower()
+SNAPSHOT_PATH = os.environ.get('SNAPSHOT_PATH', '/data/import')
+
+# At startup, the MongoDB indexes the routes rely on are created if missing (unless MONGO_CREATE_INDEXES is false),
+# then each hot path's query plan is checked: 'warn' reports full collection or index scans, 'fail' refuses to start, 'off' skips it
+MONGO_CREATE_INDEXES = os.environ.get('MONGO_CREATE_INDEXES', 'true').lower() in ('1', 'true', 'yes')
+MONGO_QUERY_PLAN_CHECK = os.environ.get('MONGO_QUERY_PLAN_CHECK', 'warn').lower()
+
+# Serialized responses of the read routes are cached in memory, up to RESPONSE_CACHE_MAX_BYTES (0 disables the cache),
+# with ETags tied to DATA_VERSION; clients and proxies may reuse them for RESPONSE_CACHE_MAX_AGE seconds. Bodies over
+# RESPONSE_CACHE_MAX_ENTRY_BYTES are sent as they are, neither cached nor gzipped
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES') or 64 * 1024 * 1024)
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRY_BYTES') or 8 * 1024 * 1024)
+RESPONSE_CACHE_MAX_AGE = int(os.environ.get('RESPONSE_CACHE_MAX_AGE') or 3600)
+
+# Structure files under /pdb are sent compressed to clients that accept it: from .gz/.br sidecars next to the models,
+# or from copies made on first request into STRUCTURE_CACHE_DIR, kept under STRUCTURE_CACHE_MAX_BYTES (0 disables them)
+STRUCTURE_CACHE_DIR = os.environ.get('STRUCTURE_CACHE_DIR') or '/tmp/viro3d-structure-cache'
+STRUCTURE_CACHE_MAX_BYTES = int(os.environ.get('STRUCTURE_CACHE_MAX_BYTES') or 1024 * 1024 * 1024)
+STRUCTURE_COMPRESS_MIN_BYTES = int(os.environ.get('STRUCTURE_COMPRESS_MIN_BYTES') or 1024)
+
+# Per-residue pLDDT of every structural model, extracted by 'python -m app.utils.plddt_store' and memory-mapped by the app
+PLDDT_STORE_PATH = os.environ.get('PLDDT_STORE_PATH') or '/data/plddt'
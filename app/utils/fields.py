@@ -0,0 +1,73 @@
+from typing import Optional
+from fastapi import HTTPException
+from app.models.proteins import BlastMatch, PartialProteinStructure, ProteinStructure
+
+# Named sets of protein structure fields, usable in fields= alongside individual field names
+PROTEIN_FIELD_PRESETS = {
+    "summary": [
+        "record_id", "uniprot_id", "genbank_id", "genbank_name_curated", "protlen", "Virus_name_s_",
+        "Virus_name_abbreviation_s_", "Species", "Family", "host", "esmfold_log_pLDDT", "colabfold_json_pLDDT",
+    ],
+    "taxonomy": [
+        "record_id", "taxid", "Realm", "Subrealm", "Kingdom", "Subkingdom", "Phylum", "Subphylum", "Class", "Subclass",
+        "Order", "Suborder", "Family", "Subfamily", "Genus", "Subgenus", "Species", "Virus_name_s_",
+    ],
+    "structure": [
+        "record_id", "protlen", "esmfold_log_pLDDT", "esmfold_log_pTM", "colabfold_json_pLDDT", "colabfold_json_pTM",
+        "PC1", "PC2", "PC3", "structure_seq",
+    ],
+}
+
+def protein_fields(fields: str = None) -> Optional[list[str]]:
+    """
+    Dependency parsing the fields query parameter: a comma-separated list of protein structure fields and/or presets
+    (summary, taxonomy, structure). None when it isn't given, meaning every field.
+    """
+    if fields is None:
+        return None
+    selected = {}
+    for name in (name.strip() for name in fields.split(",")):
+        if name in PROTEIN_FIELD_PRESETS:
+            selected.update(dict.fromkeys(PROTEIN_FIELD_PRESETS[name]))
+        elif name in ProteinStructure.model_fields:
+            selected[name] = None
+        elif name:
+            raise HTTPException(status_code=400, detail=f"Unknown field: {name}. Use any of {', '.join(PROTEIN_FIELD_PRESETS)} or {', '.join(ProteinStructure.model_fields)}")
+    if not selected:
+        raise HTTPException(status_code=400, detail="No fields selected")
+    return list(selected)
+
+def mongo_projection(fields: Optional[list[str]]) -> Optional[dict]:
+    """
+    Projection fetching only the document keys behind fields: the alias, and the name which populate_by_name also accepts
+    """
+    if fields is None:
+        return None
+    projection = {}
+    for name in fields:
+        projection[ProteinStructure.model_fields[name].alias or name] = 1
+        projection[name] = 1
+    return projection
+
+def partial_structure(document: dict, fields: Optional[list[str]]):
+    """
+    A document fetched with mongo_projection(fields), validated against the partial model so missing keys are allowed
+    """
+    return document if fields is None or document is None else PartialProteinStructure(**document)
+
+def response_fields(model, fields: Optional[list[str]]) -> Optional[dict]:
+    """
+    model_dump(include=...) keeping every field of a response model, but only fields of the protein structures it holds
+    """
+    if fields is None:
+        return None
+    selected = set(fields)
+    include = {}
+    for name in model.model_fields:
+        if name == "protein_structures":
+            include[name] = {"__all__": selected}
+        elif name == "matches":
+            include[name] = {"__all__": {**dict.fromkeys(BlastMatch.model_fields, True), "protein_structure": selected}}
+        else:
+            include[name] = True
+    return include
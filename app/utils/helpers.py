@@ -1,5 +1,9 @@
+import heapq
 from difflib import SequenceMatcher
 
+# Upper bound on the number of ids sent in a single $in query
+FIND_BY_IDS_CHUNK_SIZE = 1000
+
 def calculate_match_score(name: str, query: str) -> float:
         match = SequenceMatcher(None, name.lower(), query.lower())
         # Combine metrics: ratio score from SequenceMatcher, exact substring position, length closeness
@@ -10,10 +14,62 @@ def calculate_match_score(name: str, query: str) -> float:
             score += len(query) / len(name)  # Boost if query length is close to name length
         return score
 
+def rank_page(items, key, skips: int = 0, page_size: int = None) -> list:
+    """
+    The page of items, best first by key, that sorting them all and slicing would give. With a page_size only the
+    top skips + page_size items are kept, on a heap, instead of sorting every item.
+    """
+    if page_size:
+        return heapq.nlargest(skips + page_size, items, key=key)[skips:]
+    return sorted(items, key=key, reverse=True)[skips:]
+
+class MatchScorer:
+    """
+    calculate_match_score for many names against one query. The query is lowercased and analysed by SequenceMatcher
+    once rather than per name, and each distinct name is only scored once; the scores are identical.
+    """
+
+    def __init__(self, query: str):
+        self.query = query.lower()
+        self._matcher = SequenceMatcher(None, "", self.query)
+        self._scores = {}
+
+    def __call__(self, name: str) -> float:
+        score = self._scores.get(name)
+        if score is None:
+            lowered = name.lower()
+            self._matcher.set_seq1(lowered)
+            score = self._matcher.ratio()
+            position = lowered.find(self.query)
+            if position >= 0:
+                score += 1 - (position / len(name))
+                score += len(self.query) / len(name)
+            self._scores[name] = score
+        return score
+
+def calculate_match_scores(names, query: str) -> list[float]:
+    """
+    calculate_match_score(name, query) for each of names
+    """
+    return list(map(MatchScorer(query), names))
+
 #if a query contains square brackets, regular brackets or '+'s they need to be escaped with the validate_regex function as regex search in mongodb wont recoginse them otherwise
 def validate_regex(str: str) -> str:
     new_str = str
     for c in ['+', '[', ']', '(', ')']:
         if c in str:
             new_str = new_str.replace(c, "\\" + c) 
-    return new_str
\ No newline at end of file
+    return new_str
+
+async def find_by_ids(db, ids, chunk_size: int = FIND_BY_IDS_CHUNK_SIZE, projection: dict = None) -> dict:
+    """
+    Fetch documents by _id with as few round-trips as possible: ids are de-duplicated and looked up with chunked $in queries.
+    Returns a dict of _id -> document; ids with no document are absent.
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    documents = {}
+    for i in range(0, len(unique_ids), chunk_size):
+        cursor = db.find({"_id": {"$in": unique_ids[i:i + chunk_size]}}, projection)
+        async for document in cursor:
+            documents[document["_id"]] = document
+    return documents
@@ -0,0 +1,67 @@
+import asyncio
+from abc import ABC, abstractmethod
+
+REGISTERED_INDEXES = []
+
+class CollectionIndex(ABC):
+    """
+    In-memory structure derived from a collection. It is built on first use (or warmed at startup), shared by every
+    request, and rebuilt if invalidated or asked to serve a different collection.
+    Subclasses implement build(), which must replace the index's state wholesale.
+    """
+
+    def __init__(self):
+        self._source = None
+        self._building = None
+        REGISTERED_INDEXES.append(self)
+
+    @property
+    def name(self) -> str:
+        return type(self).__name__
+
+    @abstractmethod
+    async def build(self, collection):
+        ...
+
+    async def load(self, collection):
+        """
+        Return the index for collection, building it if needed. Concurrent callers share a single build.
+        """
+        if self._source is collection:
+            return self
+        if self._building is None or self._building[0] is not collection:
+            self._building = (collection, asyncio.ensure_future(self.build(collection)))
+        building_for, task = self._building
+        try:
+            await asyncio.shield(task)
+            self._source = building_for
+        finally:
+            if self._building is not None and self._building[1] is task and task.done():
+                self._building = None
+        return self
+
+    def invalidate(self):
+        self._source = None
+
+def invalidate_all():
+    for index in REGISTERED_INDEXES:
+        index.invalidate()
+
+async def warm_up(indexes_and_collections):
+    """
+    Build indexes ahead of the first request. Failures are reported and left for the first request to retry.
+    """
+    for index, collection in indexes_and_collections:
+        try:
+            await index.load(collection)
+        except Exception as e:
+            print(f"Failed to build {index.name}: {e}")
+
+async def reload_all() -> list[str]:
+    """
+    Rebuild every index that has been built, from the collection it was serving, e.g. after the data is re-imported
+    """
+    sources = [(index, index._source) for index in REGISTERED_INDEXES if index._source is not None]
+    invalidate_all()
+    await warm_up(sources)
+    return [index.name for index, _ in sources]
@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import PyMongoError
+from app.utils.env_variables import MONGO_CREATE_INDEXES, MONGO_QUERY_PLAN_CHECK
+
+# MongoDB indexes the routes rely on, by collection. import_json.sh only imports the data, so they are created at
+# startup (or with 'python -m app.utils.mongo_indexes'); creating an index that already exists is a no-op.
+REQUIRED_INDEXES = {
+    "proteinstructures": [
+        IndexModel([("protein_id", ASCENDING)], name="protein_id"),
+        IndexModel([("Virus name(s)", ASCENDING)], name="virus_name"),
+    ],
+    "genome_coordinates": [
+        IndexModel([("coordinates.virus_name", ASCENDING)], name="coordinates_virus_name"),
+    ],
+    "clusters": [
+        IndexModel([("cluster_members.member_record_id", ASCENDING)], name="cluster_member_record_id"),
+    ],
+}
+
+# (route, collection, query shaped like the route's) for the hot paths that must be answered from an index. The opt-in
+# match=substring searches of /proteins/genbank_id/ and /clusters/genbank_id/ are unanchored $regex queries, which
+# read every key of an index however it is built, so only the default prefix and exact matches are checked.
+CANONICAL_QUERIES = [
+    ("/proteins/genbank_id/", "proteinstructures", {"protein_id": {"$regex": "^AFO67214\\.1"}}),
+    ("/proteins/genbank_id/?match=exact", "proteinstructures", {"protein_id": "AFO67214.1"}),
+    ("/proteins/virus_name_exact/", "proteinstructures", {"Virus name(s)": "Tellina virus 1"}),
+    ("/zip/virus/", "proteinstructures", {"Virus name(s)": "Tellina virus 1"}),
+    ("/genome_coordinates/virus_name/", "genome_coordinates", {"coordinates": {"$elemMatch": {"virus_name": "ovine adenovirus 3"}}}),
+]
+
+# Index bounds covering every key of an index: all values, or all strings (as an unanchored $regex gets)
+UNBOUNDED_INTERVALS = {"[MinKey, MaxKey]", "[MaxKey, MinKey]", '["", {})', '[{}, ""]'}
+
+def _key_pattern(index: IndexModel) -> list:
+    return list(index.document["key"].items())
+
+async def ensure_indexes(get_collection) -> list[str]:
+    """
+    Create the required indexes missing from each collection, returning their names. An index is present if one with
+    the same keys exists, whatever its name.
+    """
+    created = []
+    for name, indexes in REQUIRED_INDEXES.items():
+        collection = get_collection(name)
+        existing = [list(info["key"]) for info in (await collection.index_information()).values()]
+        missing = [index for index in indexes if _key_pattern(index) not in existing]
+        if missing:
+            await collection.create_indexes(missing)
+            created.extend(f"{name}.{index.document['name']}" for index in missing)
+    return created
+
+def plan_nodes(plan) -> list[dict]:
+    """
+    Every stage of an explain() plan, including the nested input stages and the query plan of the slot-based engine
+    """
+    nodes = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            nodes.append(plan)
+        for value in plan.values():
+            nodes.extend(plan_nodes(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            nodes.extend(plan_nodes(value))
+    return nodes
+
+def plan_stages(plan) -> list[str]:
+    return [node["stage"] for node in plan_nodes(plan)]
+
+def scans_whole_index(node: dict) -> bool:
+    """
+    True if node is an index scan whose bounds on the index's leading key take in every key
+    """
+    bounds = node.get("indexBounds")
+    if node.get("stage") != "IXSCAN" or not bounds:
+        return False
+    leading = next(iter(node.get("keyPattern") or bounds))
+    return any(interval in UNBOUNDED_INTERVALS for interval in bounds.get(leading, []))
+
+def is_full_scan(plan) -> bool:
+    return any(node["stage"] == "COLLSCAN" or scans_whole_index(node) for node in plan_nodes(plan))
+
+async def full_scans(get_collection) -> list[str]:
+    """
+    Routes whose canonical query is planned as a collection scan or a scan of a whole index
+    """
+    scans = []
+    for route, name, query in CANONICAL_QUERIES:
+        explanation = await get_collection(name).find(query).explain()
+        if is_full_scan(explanation["queryPlanner"]["winningPlan"]):
+            scans.append(f"{route} ({name}: {query})")
+    return scans
+
+async def provision(get_collection, create: bool = MONGO_CREATE_INDEXES, check: str = MONGO_QUERY_PLAN_CHECK):
+    """
+    Create the missing indexes, then check the query plan of each hot path: 'warn' reports full scans, 'fail'
+    raises on them, so the app refuses to start, and 'off' skips the check. Database errors are reported, as for the
+    connection warm-up, rather than stopping the app.
+    """
+    try:
+        created = await ensure_indexes(get_collection) if create else []
+        scans = await full_scans(get_collection) if check != "off" else []
+    except PyMongoError as e:
+        print(f"MongoDB index provisioning failed: {e}")
+        return
+    if created:
+        print(f"Created MongoDB indexes: {', '.join(created)}")
+    for scan in scans:
+        print(f"WARNING: query planned as a full collection or index scan: {scan}")
+    if scans and check == "fail":
+        raise RuntimeError(f"{len(scans)} route(s) would scan a whole collection or index: {'; '.join(scans)}")
+
+async def main(check: bool) -> int:
+    from app import db
+
+    try:
+        created = await ensure_indexes(db.get_collection)
+        print(f"Created MongoDB indexes: {', '.join(created) or 'none missing'}")
+        scans = await full_scans(db.get_collection) if check else []
+    finally:
+        db.close()
+    for scan in scans:
+        print(f"Full scan: {scan}")
+    if check:
+        print(f"Checked {len(CANONICAL_QUERIES)} queries, {len(scans)} full scan(s)")
+    return len(scans)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the MongoDB indexes the routes rely on and check their query plans")
+    parser.add_argument("--no-check", action="store_true", help="only create the indexes")
+    args = parser.parse_args()
+    raise SystemExit(1 if asyncio.run(main(not args.no_check)) else 0)
@@ -0,0 +1,129 @@
+from app.utils.indexes import CollectionIndex
+
+# Fields searched by the name routes, with an unanchored case-insensitive $regex
+NAME_FIELDS = ["genbank_name_curated", "Virus name(s)", "Virus name abbreviation(s)"]
+
+_REGEX_METACHARACTERS = set(".^$*+?{}[]|()\\")
+_EMPTY = frozenset()
+
+def literal_term(pattern: str):
+    """
+    The plain string a regex pattern matches, or None if the pattern uses any regex syntax besides escaped characters.
+    Patterns that come back as None must still be answered by Mongo.
+    """
+    term = []
+    escaped = False
+    for c in pattern:
+        if escaped:
+            if c.isalnum():
+                return None # \d, \w, \b... are character classes or anchors, not literals
+            term.append(c)
+            escaped = False
+        elif c == "\\":
+            escaped = True
+        elif c in _REGEX_METACHARACTERS:
+            return None
+        else:
+            term.append(c)
+    if escaped:
+        return None
+    return "".join(term)
+
+def trigrams(value: str) -> set:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+class TrigramIndex:
+    """
+    Case-insensitive substring search over labelled strings. Several strings may share a label, and a search returns
+    the labels of every string containing the term.
+
+    Distinct lowercased strings are indexed by trigram; a search intersects the postings of the term's trigrams and
+    confirms each candidate with a substring test. Terms shorter than three characters are checked against every
+    distinct string.
+    """
+
+    def __init__(self, labelled_values):
+        positions = {}
+        labels = []
+        for label, value in labelled_values:
+            position = positions.setdefault(value.lower(), len(positions))
+            if position == len(labels):
+                labels.append([])
+            labels[position].append(label)
+        postings = {}
+        for value, position in positions.items():
+            for gram in trigrams(value):
+                postings.setdefault(gram, set()).add(position)
+        self._values = list(positions)
+        self._labels = labels
+        self._postings = postings
+
+    def _matching_values(self, term: str):
+        if len(term) < 3:
+            return [position for position, value in enumerate(self._values) if term in value]
+        candidates = sorted((self._postings.get(gram, _EMPTY) for gram in trigrams(term)), key=len)
+        return [position for position in set(candidates[0]).intersection(*candidates[1:]) if term in self._values[position]]
+
+    def search(self, term: str) -> set:
+        matches = set()
+        for position in self._matching_values(term.lower()):
+            matches.update(self._labels[position])
+        return matches
+
+class NameIndex(CollectionIndex):
+    """
+    Trigram index over the name fields, answering the same case-insensitive substring searches as
+    {'$regex': term, '$options': 'i'} without scanning the collection.
+
+    Documents are numbered in the order the collection returns them, and searches return those ordinals in order,
+    so results come back in the same order as an unsorted find().
+    """
+
+    def __init__(self, fields: list[str] = NAME_FIELDS):
+        super().__init__()
+        self.fields = fields
+        self._ids = []
+        self._values = {}
+        self._trigrams = {}
+
+    async def build(self, collection):
+        ids = []
+        values = {field: [] for field in self.fields}
+        async for row in collection.find({}, {field: 1 for field in self.fields}):
+            ids.append(row["_id"])
+            for field in self.fields:
+                value = row.get(field)
+                values[field].append(value if isinstance(value, str) else None)
+
+        indexes = {
+            field: TrigramIndex((ordinal, value) for ordinal, value in enumerate(values[field]) if value is not None)
+            for field in self.fields
+        }
+        self._ids, self._values, self._trigrams = ids, values, indexes
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _search(self, fields: list[str], term: str) -> set:
+        matches = set()
+        for field in fields:
+            matches |= self._trigrams[field].search(term)
+        return matches
+
+    def search(self, *criteria: tuple[list[str], str]) -> list[int]:
+        """
+        Ordinals, in collection order, of documents matching every (fields, term) criterion, where a document
+        matches if any of fields contains term (ignoring case)
+        """
+        matches = self._search(*criteria[0])
+        for fields, term in criteria[1:]:
+            matches &= self._search(fields, term)
+        return sorted(matches)
+
+    def record_ids(self, ordinals: list[int]) -> list:
+        return [self._ids[ordinal] for ordinal in ordinals]
+
+    def value(self, field: str, ordinal: int):
+        return self._values[field][ordinal]
+
+name_index = NameIndex()
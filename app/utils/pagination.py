@@ -0,0 +1,65 @@
+import base64
+import binascii
+import heapq
+import json
+from typing import Optional
+from fastapi import HTTPException
+
+# Keyset pagination: instead of a page number, the client sends back an opaque cursor holding the sort key of the last
+# result it received, and the next page is the page_size results that sort after it, so page N costs the same as page 1.
+
+def encode_cursor(key: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode()
+
+def page_after(cursor: str = None) -> Optional[list]:
+    """
+    Dependency decoding the cursor query parameter: None when it isn't given (page_num paging), [] when it is empty
+    (the first page of keyset paging), otherwise the sort key of the last result of the previous page
+    """
+    if cursor is None:
+        return None
+    if not cursor:
+        return []
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(key, list) or not key:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+def keyset_page(items, key, after: list, page_size: int = None) -> tuple[list, Optional[str]]:
+    """
+    The page_size items that follow after in key order (smallest key first), and the cursor of the page after them.
+    Only page_size + 1 items are kept, on a heap, whatever the page depth.
+    """
+    if after:
+        after = tuple(after)
+        items = (item for item in items if key(item) > after)
+    try:
+        if not page_size:
+            return sorted(items, key=key), None
+        page = heapq.nsmallest(page_size + 1, items, key=key)
+    except TypeError:
+        # the cursor's key doesn't compare with this route's sort key
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if len(page) > page_size:
+        page = page[:page_size]
+        return page, encode_cursor(list(key(page[-1])))
+    return page, None
+
+async def find_page(db, query: dict, after: list, page_size: int = None, projection: dict = None) -> tuple[list, Optional[str]]:
+    """
+    The page_size documents matching query that follow after in _id order, using the _id index rather than skip(),
+    and the cursor of the page after them
+    """
+    if after:
+        query = { "$and": [ query, { "_id": { "$gt": after[0] } } ] }
+    cursor = db.find(query, projection).sort("_id", 1)
+    if not page_size:
+        return await cursor.to_list(length=None), None
+    results = await cursor.limit(page_size + 1).to_list(length=page_size + 1)
+    if len(results) > page_size:
+        results = results[:page_size]
+        return results, encode_cursor([results[-1]["_id"]])
+    return results, None
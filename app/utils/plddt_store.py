@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import numpy as np
+from app.utils.binary_structure import parse_structure_file, residues
+from app.utils.env_variables import PLDDT_STORE_PATH, STRUCTURAL_MODELS_PATH
+from app.utils.predeflate import MODEL_PREFIXES
+
+# Per-residue pLDDT of every structural model, extracted once by 'python -m app.utils.plddt_store' into PLDDT_STORE_PATH:
+#
+#   plddt-<build>.npy    pLDDT x 100 as uint16, the residues of every model one after another
+#   offsets-<build>.npy  int64, model i's residues are plddt[offsets[i]:offsets[i + 1]]
+#   manifest.json        {"build": ..., "built": ..., "models": [model names, in the order of offsets]}
+#
+# The arrays are memory-mapped, so serving a model's pLDDT reads only its slice. A rebuild writes new arrays and then
+# replaces the manifest, so a running app keeps reading consistent files until it reloads.
+
+MANIFEST = "manifest.json"
+
+# Model files to read pLDDT from, in order of preference: fixed-width PDB parses fastest
+SOURCE_FORMATS = ("_relaxed.pdb", ".cif")
+
+def extract(path: str, format: str) -> Optional[np.ndarray]:
+    """
+    pLDDT x 100 of each residue of a model file (its CA atom's B-factor, or its first atom's), or None if it can't be read
+    """
+    try:
+        with open(path, "rb") as f:
+            atoms = parse_structure_file(f.read(), format)
+        _, _, plddt_atoms = residues(atoms)
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Skipping {path}: {e}")
+        return None
+    return np.round(atoms["b_factor"][plddt_atoms] * 100).clip(0, 65535).astype(np.uint16)
+
+def model_sources(directory: str) -> dict:
+    """
+    Model name (e.g. CF-AAA12345.1_1) -> (path, format) of the file to read its pLDDT from
+    """
+    sources = {}
+    for entry in os.scandir(directory):
+        if not entry.name.startswith(MODEL_PREFIXES):
+            continue
+        for format in SOURCE_FORMATS:
+            if entry.name.endswith(format):
+                name = entry.name[:-len(format)]
+                if name not in sources or SOURCE_FORMATS.index(format) < SOURCE_FORMATS.index(sources[name][1]):
+                    sources[name] = (entry.path, format)
+    return sources
+
+def build(models_path: str, store_path: str, workers: int) -> int:
+    """
+    Extract the pLDDT of every model in models_path into a new build of the store at store_path, removing the
+    previous build. Returns the number of models stored.
+    """
+    sources = model_sources(models_path)
+    names = sorted(sources)
+    # parsing holds the GIL, so models are parsed in processes
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        extracted = list(executor.map(extract, *zip(*[sources[name] for name in names]), chunksize=64)) if names else []
+    stored = [(name, plddt) for name, plddt in zip(names, extracted) if plddt is not None]
+
+    os.makedirs(store_path, exist_ok=True)
+    build_id = uuid.uuid4().hex[:12]
+    offsets = np.zeros(len(stored) + 1, dtype=np.int64)
+    np.cumsum([len(plddt) for _, plddt in stored], out=offsets[1:])
+    np.save(os.path.join(store_path, f"plddt-{build_id}.npy"), np.concatenate([plddt for _, plddt in stored] or [np.zeros(0, np.uint16)]))
+    np.save(os.path.join(store_path, f"offsets-{build_id}.npy"), offsets)
+
+    tmp_manifest = os.path.join(store_path, MANIFEST + ".tmp")
+    with open(tmp_manifest, "w") as f:
+        json.dump({"build": build_id, "built": time.time(), "models": [name for name, _ in stored]}, f)
+    os.replace(tmp_manifest, os.path.join(store_path, MANIFEST))
+
+    # earlier builds stay readable by apps that haven't reloaded until they do: mapped files survive being unlinked
+    for entry in os.scandir(store_path):
+        if entry.name.endswith(".npy") and build_id not in entry.name:
+            os.remove(entry.path)
+    return len(stored)
+
+class PlddtStore:
+    """
+    Read side of the store: the memory-mapped arrays of its current build, loaded on first use and on reload()
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._build = None
+        self._loaded = False
+
+    def reload(self) -> bool:
+        """
+        Map the store's current build, returning whether there is one
+        """
+        self._loaded = True
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as f:
+                manifest = json.load(f)
+            plddt = np.load(os.path.join(self.path, f"plddt-{manifest['build']}.npy"), mmap_mode="r")
+            offsets = np.load(os.path.join(self.path, f"offsets-{manifest['build']}.npy"), mmap_mode="r")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"No pLDDT store loaded from {self.path}: {e}")
+            self._build = None
+            return False
+        positions = {name: i for i, name in enumerate(manifest["models"])}
+        self._build = (manifest, positions, plddt, offsets)
+        return True
+
+    @property
+    def available(self) -> bool:
+        if not self._loaded:
+            self.reload()
+        return self._build is not None
+
+    def get(self, model: str) -> Optional[np.ndarray]:
+        """
+        pLDDT of each residue of a model (e.g. CF-AAA12345.1_1), or None if the store doesn't hold it
+        """
+        if not self.available:
+            return None
+        _, positions, plddt, offsets = self._build
+        i = positions.get(model)
+        if i is None:
+            return None
+        return plddt[offsets[i]:offsets[i + 1]] / 100
+
+    def stats(self) -> dict:
+        if not self.available:
+            return {"loaded": False}
+        manifest, _, plddt, _ = self._build
+        return {"loaded": True, "build": manifest["build"], "built": manifest["built"], "models": len(manifest["models"]), "residues": len(plddt)}
+
+plddt_store = PlddtStore(PLDDT_STORE_PATH)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract the per-residue pLDDT of every structural model into the memory-mapped pLDDT store")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of parsing processes")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    stored = build(STRUCTURAL_MODELS_PATH, PLDDT_STORE_PATH, args.workers)
+    print(f"Stored the pLDDT of {stored} structural models in {PLDDT_STORE_PATH} ({time.perf_counter() - started:.1f}s)")
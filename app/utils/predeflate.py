@@ -0,0 +1,47 @@
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.env_variables import STRUCTURAL_MODELS_PATH, ZIP_PREDEFLATED_PATH
+from app.utils.zipstream import PREDEFLATED_SUFFIX, write_predeflated
+
+MODEL_PREFIXES = ("CF-", "EF-")
+MODEL_FORMATS = (".cif", "_relaxed.pdb")
+
+def predeflated_path(filename: str) -> str:
+    return os.path.join(ZIP_PREDEFLATED_PATH, filename + PREDEFLATED_SUFFIX)
+
+def is_fresh(source: str, sidecar: str) -> bool:
+    """
+    True if sidecar exists and is at least as new as source
+    """
+    try:
+        return os.path.getmtime(sidecar) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+def predeflate_all(workers: int, force: bool = False) -> int:
+    """
+    Write a pre-deflated sidecar for every structural model that doesn't have an up-to-date one. Returns the number written.
+    """
+    os.makedirs(ZIP_PREDEFLATED_PATH, exist_ok=True)
+    jobs = []
+    for entry in os.scandir(STRUCTURAL_MODELS_PATH):
+        if entry.name.startswith(MODEL_PREFIXES) and entry.name.endswith(MODEL_FORMATS):
+            sidecar = predeflated_path(entry.name)
+            if force or not is_fresh(entry.path, sidecar):
+                jobs.append((entry.path, sidecar))
+
+    # zlib releases the GIL while compressing, so threads use every core
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in executor.map(lambda job: write_predeflated(*job), jobs):
+            pass
+    return len(jobs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-deflate structural models so zip downloads copy compressed bytes instead of recompressing")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of compression threads")
+    parser.add_argument("--force", action="store_true", help="rewrite sidecars that are already up to date")
+    args = parser.parse_args()
+
+    written = predeflate_all(args.workers, args.force)
+    print(f"Pre-deflated {written} structural models into {ZIP_PREDEFLATED_PATH}")
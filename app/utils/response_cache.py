@@ -0,0 +1,215 @@
+import asyncio
+import gzip
+import hashlib
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode
+from app.utils.env_variables import DATA_VERSION, RESPONSE_CACHE_MAX_AGE, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_ENTRY_BYTES
+from app.utils.single_flight import SingleFlight
+
+# Read routes whose responses depend only on the request and the loaded data release
+CACHED_PREFIXES = ("/proteins/", "/viruses/", "/genome_coordinates/", "/clusters/")
+
+# Routes whose concurrent identical requests aren't coalesced: sequence searches share blastp runs in BlastRunner,
+# which also cancels a run once every client waiting for it has disconnected
+UNCOALESCED_PREFIXES = ("/proteins/sequence_match/",)
+
+# Bodies smaller than this aren't worth a gzipped copy
+GZIP_MIN_BYTES = 1024
+
+class CachedResponse:
+    def __init__(self, body: bytes, content_type: bytes, data_version: str):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        if self.gzipped is not None and len(self.gzipped) >= len(body):
+            self.gzipped = None
+        self.content_type = content_type
+        self.etag = f'"{data_version}-{hashlib.blake2b(body, digest_size=16).hexdigest()}"'.encode()
+        self.last_modified = int(time.time())
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzipped or b"")
+
+class ResponseCache:
+    """
+    Serialized (and gzipped) bodies of successful GET responses, keyed on the path, the query parameters in a canonical
+    order and the data version, kept under max_bytes by evicting the least recently used. Bodies over max_entry_bytes
+    aren't cached, and the others are gzipped and hashed in a worker thread, off the event loop.
+
+    Entries carry a strong ETag derived from the data version and the body, so clients and proxies can revalidate with
+    If-None-Match and get a 304 without the body.
+    """
+
+    def __init__(self, max_bytes: int, data_version: str, max_entry_bytes: int = None):
+        self.max_bytes = max_bytes
+        self.data_version = data_version
+        self.max_entry_bytes = max_entry_bytes or max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.too_large = 0
+
+    def key(self, path: str, query_string: bytes) -> tuple:
+        return (*request_key(path, query_string), self.data_version)
+
+    def get(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def put(self, key: tuple, body: bytes, content_type: bytes):
+        """
+        Cache a response body, returning its entry, or None if it is too large to cache
+        """
+        if len(body) > self.max_entry_bytes:
+            self.too_large += 1
+            return None
+        entry = await asyncio.to_thread(CachedResponse, body, content_type, self.data_version)
+        if entry.size > self.max_bytes:
+            return entry
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_entry_bytes": self.max_entry_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "too_large": self.too_large,
+        }
+
+def request_key(path: str, query_string: bytes) -> tuple:
+    """
+    The path and the query parameters in a canonical order, identifying requests that get the same response
+    """
+    return (path, urlencode(sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))))
+
+def _header(scope, name: bytes) -> bytes:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return b""
+
+def _not_modified(scope, entry: CachedResponse) -> bool:
+    if_none_match = _header(scope, b"if-none-match")
+    if if_none_match:
+        return if_none_match.strip() == b"*" or entry.etag in [tag.strip() for tag in if_none_match.split(b",")]
+    if_modified_since = _header(scope, b"if-modified-since")
+    if if_modified_since:
+        try:
+            return entry.last_modified <= parsedate_to_datetime(if_modified_since.decode("latin-1")).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware answering GET requests to the cached routes from a ResponseCache: a hit is sent without running the
+    route, gzipped if the client accepts it, or as a 304 if the client's copy is current. Responses other than 200 are
+    passed through uncached.
+
+    Concurrent identical requests that miss the cache share one run of the route (see SingleFlight), whether or not
+    the cache is enabled.
+    """
+
+    def __init__(self, app, cache: ResponseCache, flights: SingleFlight, max_age: int = RESPONSE_CACHE_MAX_AGE, prefixes: tuple = CACHED_PREFIXES, uncoalesced: tuple = UNCOALESCED_PREFIXES):
+        self.app = app
+        self.cache = cache
+        self.flights = flights
+        self.max_age = max_age
+        self.prefixes = prefixes
+        self.uncoalesced = uncoalesced
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        if not path.startswith(self.prefixes):
+            return await self.app(scope, receive, send)
+
+        query_string = scope.get("query_string", b"")
+        entry = self.cache.get(self.cache.key(path, query_string)) if self.cache else None
+        if entry is not None:
+            self.cache.hits += 1
+            return await self.send_entry(scope, send, entry)
+
+        if path.startswith(self.uncoalesced):
+            status, headers, body = await self.run(scope, receive)
+        else:
+            status, headers, body = await self.flights.do(request_key(path, query_string), lambda: self.run(scope, receive))
+
+        entry = None
+        if status == 200 and self.cache:
+            key = self.cache.key(path, query_string)
+            entry = self.cache.get(key) # already stored by another request that shared the run
+            if entry is None:
+                self.cache.misses += 1
+                entry = await self.cache.put(key, body, dict(headers).get(b"content-type", b"application/json"))
+        if entry is None:
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+        await self.send_entry(scope, send, entry)
+
+    async def run(self, scope, receive) -> tuple:
+        """
+        Run the route, returning its response's status, headers and body
+        """
+        start = {}
+        body = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                body.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        return start["status"], list(start.get("headers", [])), b"".join(body)
+
+    async def send_entry(self, scope, send, entry: CachedResponse):
+        headers = [
+            (b"etag", entry.etag),
+            (b"last-modified", formatdate(entry.last_modified, usegmt=True).encode()),
+            (b"cache-control", f"public, max-age={self.max_age}".encode()),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if _not_modified(scope, entry):
+            self.cache.not_modified += 1
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = entry.body
+        if entry.gzipped is not None and b"gzip" in _header(scope, b"accept-encoding"):
+            body = entry.gzipped
+            headers.append((b"content-encoding", b"gzip"))
+        headers += [(b"content-type", entry.content_type), (b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, DATA_VERSION, RESPONSE_CACHE_MAX_ENTRY_BYTES) if RESPONSE_CACHE_MAX_BYTES else None
+response_flights = SingleFlight()
@@ -0,0 +1,60 @@
+import hashlib
+from Bio.Align import substitution_matrices
+from app.utils.indexes import CollectionIndex
+
+BLOSUM62 = substitution_matrices.load("BLOSUM62")
+
+def sequence_digest(sequence: str) -> bytes:
+    return hashlib.blake2b("".join(sequence.split()).upper().encode(), digest_size=16).digest()
+
+def self_alignment_score(sequence: str) -> int:
+    """
+    Raw BLOSUM62 score of a sequence aligned against itself. blastp's composition-based statistics can report a
+    slightly lower score for the same exact match.
+    """
+    score = 0
+    for residue in sequence:
+        try:
+            score += BLOSUM62[residue][residue]
+        except (KeyError, IndexError):
+            score += BLOSUM62["X"]["X"]
+    return int(score)
+
+class SequenceIndex(CollectionIndex):
+    """
+    Digest of every protein_seq -> record IDs, so exact sequence matches are found without running blastp
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._record_ids = {}
+
+    async def build(self, collection):
+        record_ids = {}
+        async for row in collection.find({}, {"protein_seq": 1}):
+            if row.get("protein_seq"):
+                record_ids.setdefault(sequence_digest(row["protein_seq"]), []).append(row["_id"])
+        self._record_ids = record_ids
+
+    def lookup(self, sequence: str) -> list[str]:
+        return self._record_ids.get(sequence_digest(sequence), [])
+
+    def exact_match_hits(self, sequence: str) -> list[dict]:
+        """
+        Exact matches for sequence, in the same shape as parsed blastp hits
+        """
+        sequence = "".join(sequence.split()).upper()
+        score = self_alignment_score(sequence)
+        return [
+            {
+                "structure_id": record_id,
+                "score": score,
+                "evalue": 0.0,
+                "hit_length": len(sequence),
+                "positives": len(sequence),
+                "gaps": 0,
+            }
+            for record_id in self.lookup(sequence)
+        ]
+
+sequence_index = SequenceIndex()
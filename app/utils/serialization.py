@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+from typing import Optional, Union, get_args, get_origin
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ValidationError
+from app.models.proteins import BlastMatch, ProteinStructure
+from app.utils.env_variables import VALIDATE_RESPONSES
+from app.utils.fields import partial_structure, response_fields
+
+# Protein structure documents are validated once, after each data import (python -m app.utils.serialization), so
+# responses are built straight from the stored documents rather than validating every structure of every response.
+
+def _number_type(annotation):
+    """
+    int or float if the field holds that number type (optionally), which pydantic coerces numeric strings and ints into
+    """
+    types = get_args(annotation) if get_origin(annotation) is Union else (annotation,)
+    for number_type in (float, int):
+        if number_type in types:
+            return number_type
+    return None
+
+def _output_plan(model: type[BaseModel]) -> list[tuple[str, str, Optional[type]]]:
+    """
+    (output name, document key, number type) for each field of model, in the order model_dump writes them.
+    Documents may be keyed by the field's alias or, as populate_by_name allows, its name.
+    """
+    return [(name, field.alias or name, _number_type(field.annotation)) for name, field in model.model_fields.items()]
+
+_STRUCTURE_PLAN = _output_plan(ProteinStructure)
+_MATCH_PLAN = [field for field in _output_plan(BlastMatch) if field[0] != "protein_structure"]
+
+def _output(document: dict, plan: list) -> dict:
+    output = {}
+    for name, key, number_type in plan:
+        value = document[key] if key in document else document.get(name)
+        if number_type and value is not None and type(value) is not number_type:
+            value = number_type(value) # as pydantic would have coerced it
+        output[name] = value
+    return output
+
+def structure_output(document: Optional[dict], fields: Optional[list[str]] = None) -> Optional[dict]:
+    """
+    A stored protein structure in the shape ProteinStructure(**document).model_dump(by_alias=False) gives, limited to
+    fields if given, without validating it
+    """
+    if document is None:
+        return None
+    if fields is None:
+        return _output(document, _STRUCTURE_PLAN)
+    selected = set(fields)
+    return _output(document, [field for field in _STRUCTURE_PLAN if field[0] in selected])
+
+def render(model: type[BaseModel], fields: Optional[list[str]] = None, **values) -> ORJSONResponse:
+    """
+    JSON response with the content of model(**values).model_dump(by_alias=False), limited to fields of the protein
+    structures it holds, encoded with orjson.
+
+    values hold stored documents as they came from Mongo: protein_structure, protein_structures, or matches as hits
+    with a protein_structure document. With VALIDATE_RESPONSES set, the content is built by validating through the
+    model as before.
+    """
+    if VALIDATE_RESPONSES:
+        if "protein_structure" in values:
+            values["protein_structure"] = partial_structure(values["protein_structure"], fields)
+        if values.get("protein_structures") is not None:
+            values["protein_structures"] = [partial_structure(document, fields) for document in values["protein_structures"]]
+        if values.get("matches") is not None:
+            values["matches"] = [
+                BlastMatch(**{**match, "protein_structure": partial_structure(match["protein_structure"], fields)})
+                for match in values["matches"]
+            ]
+        return ORJSONResponse(model(**values).model_dump(by_alias=False, include=response_fields(model, fields)))
+
+    content = {}
+    for name, field in model.model_fields.items():
+        value = values.get(name, field.default)
+        if name == "protein_structure":
+            value = structure_output(value, fields)
+        elif name == "protein_structures" and value is not None:
+            value = [structure_output(document, fields) for document in value]
+        elif name == "matches" and value is not None:
+            value = [
+                {**_output(match, _MATCH_PLAN), "protein_structure": structure_output(match["protein_structure"], fields)}
+                for match in value
+            ]
+        content[name] = value
+    return ORJSONResponse(content)
+
+async def validate_stored_data() -> int:
+    """
+    Validate every stored protein structure against ProteinStructure, reporting the invalid ones. Run after importing
+    data, since responses are built from the stored documents without validating them.
+    """
+    from app import db
+
+    invalid = 0
+    checked = 0
+    async for document in db.get_protein_structures_collection().find({}):
+        checked += 1
+        try:
+            ProteinStructure(**document)
+        except ValidationError as e:
+            invalid += 1
+            print(f"{document.get('_id')}: {e.error_count()} invalid field(s): {', '.join(str(error['loc'][0]) for error in e.errors())}")
+    print(f"Checked {checked} protein structures, {invalid} invalid")
+    db.close()
+    return invalid
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Validate the stored protein structures that responses are built from").parse_args()
+    raise SystemExit(1 if asyncio.run(validate_stored_data()) else 0)
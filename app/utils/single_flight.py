@@ -0,0 +1,54 @@
+import asyncio
+
+class _Flight:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one in-flight computation: the first caller starts it, and callers that
+    arrive before it finishes await the same result (or exception) instead of repeating the work.
+
+    A caller that is cancelled stops waiting without affecting the others; the computation itself is cancelled once
+    every caller waiting for it has gone.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
+
+    def in_flight(self, key) -> bool:
+        return key in self._flights
+
+    async def do(self, key, compute):
+        """
+        Result of compute() - a coroutine function - shared with concurrent calls for the same key
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(compute()))
+            flight.task.add_done_callback(lambda _: self._flights.pop(key) if self._flights.get(key) is flight else None)
+            self.executed += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # abandoned by every caller: stop the work, and let it unwind before returning
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+                await asyncio.gather(flight.task, return_exceptions=True)
@@ -0,0 +1,197 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import tempfile
+from email.utils import formatdate
+from mimetypes import guess_type
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from app.utils.env_variables import STRUCTURE_CACHE_DIR, STRUCTURE_CACHE_MAX_BYTES, STRUCTURE_COMPRESS_MIN_BYTES
+from app.utils.predeflate import is_fresh
+from app.utils.single_flight import SingleFlight
+
+try:
+    import brotli
+except ImportError: # optional: without it, .br sidecars are still served but not generated
+    brotli = None
+
+# Content encodings in order of preference, with the suffix of their sidecar files
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """
+    Content codings an Accept-Encoding header accepts (those not given q=0)
+    """
+    accepted = set()
+    for coding in accept_encoding.lower().split(","):
+        name, _, params = coding.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name.strip():
+            accepted.add(name.strip())
+    return accepted
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=9)
+
+class SidecarCache:
+    """
+    Files derived from structure files (compressed copies, binary conversions) made on first request, in a directory
+    kept under max_bytes by deleting the least recently used. Derived files are keyed on the source file's path, size
+    and modification time, so an updated file gets a new one. Concurrent requests for the same file share one conversion.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.flights = SingleFlight()
+        self.hits = 0
+        self.generated = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "generated": self.generated,
+            "coalesced": self.flights.coalesced,
+            "max_bytes": self.max_bytes,
+        }
+
+    def path(self, source: str, stat_result: os.stat_result, suffix: str) -> str:
+        key = hashlib.sha256(f"{source}\0{stat_result.st_size}\0{stat_result.st_mtime_ns}".encode()).hexdigest()
+        return os.path.join(self.directory, key + suffix)
+
+    async def get(self, source: str, stat_result: os.stat_result, suffix: str, convert) -> str:
+        """
+        Path of the file derived from source by convert(), a function of source's bytes, making it if needed
+        """
+        path = self.path(source, stat_result, suffix)
+        try:
+            os.utime(path) # bump mtime so eviction is least-recently-used
+            self.hits += 1
+            return path
+        except OSError:
+            pass
+        return await self.flights.do(path, lambda: asyncio.to_thread(self._generate, source, path, convert))
+
+    def _generate(self, source: str, path: str, convert) -> str:
+        with open(source, "rb") as f:
+            data = convert(f.read())
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.generated += 1
+        self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str):
+        copies = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".tmp"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                copies.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(copies):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+def derived_validators(stat_result: os.stat_result, label: str) -> dict:
+    """
+    ETag and Last-Modified of a file derived from a structure file, following the structure file's, since a cached
+    derived file's mtime changes whenever it is used
+    """
+    version = hashlib.md5(f"{stat_result.st_mtime}-{stat_result.st_size}".encode(), usedforsecurity=False).hexdigest()
+    return {"etag": f'"{version}-{label}"', "last-modified": formatdate(stat_result.st_mtime, usegmt=True)}
+
+class LargeChunkFileResponse(FileResponse):
+    """
+    FileResponse reading the file in 256 KiB chunks rather than 64 KiB, so sending a large model takes fewer reads
+    and sends
+    """
+
+    chunk_size = 256 * 1024
+
+class StructureFileResponse:
+    """
+    The representation of a structure file a request gets: a compressed sidecar if the client accepts its encoding,
+    otherwise the file itself. Ranges, ETags and If-None-Match apply to the representation sent.
+    """
+
+    def __init__(self, files: "StructureFiles", full_path: str, stat_result: os.stat_result):
+        self.files = files
+        self.full_path = full_path
+        self.stat_result = stat_result
+
+    async def __call__(self, scope, receive, send):
+        request_headers = Headers(scope=scope)
+        path, stat_result, encoding = await self.files.representation(self.full_path, self.stat_result, request_headers.get("accept-encoding", ""))
+
+        headers = {"vary": "Accept-Encoding"}
+        if encoding:
+            headers = {**headers, **derived_validators(self.stat_result, encoding), "content-encoding": encoding}
+        response = LargeChunkFileResponse(path, stat_result=stat_result, headers=headers, media_type=guess_type(self.full_path)[0] or "text/plain")
+        if self.files.is_not_modified(response.headers, request_headers):
+            response = NotModifiedResponse(response.headers)
+        await response(scope, receive, send)
+
+class StructureFiles(StaticFiles):
+    """
+    StaticFiles for the structural models, serving .br or .gz variants to clients that accept them: sidecar files
+    next to the model if they are up to date, otherwise copies generated on first request into sidecar_cache.
+    """
+
+    def __init__(self, *, directory: str, sidecar_cache: SidecarCache = None, min_size: int = STRUCTURE_COMPRESS_MIN_BYTES, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.sidecar_cache = sidecar_cache
+        self.min_size = min_size
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200):
+        return StructureFileResponse(self, str(full_path), stat_result)
+
+    async def representation(self, full_path: str, stat_result: os.stat_result, accept_encoding: str) -> tuple:
+        """
+        (path, stat, content encoding or None) of the file to send
+        """
+        if stat_result.st_size >= self.min_size:
+            accepted = accepted_encodings(accept_encoding)
+            for encoding, suffix in ENCODINGS:
+                if encoding not in accepted:
+                    continue
+                sidecar = full_path + suffix
+                if not is_fresh(full_path, sidecar):
+                    sidecar = None
+                    if self.sidecar_cache and (encoding != "br" or brotli is not None):
+                        sidecar = await self.sidecar_cache.get(full_path, stat_result, suffix, lambda data, encoding=encoding: compress(data, encoding))
+                if sidecar is not None:
+                    try:
+                        return sidecar, os.stat(sidecar), encoding
+                    except OSError:
+                        pass # evicted meanwhile
+        return full_path, stat_result, None
+
+structure_sidecar_cache = SidecarCache(STRUCTURE_CACHE_DIR, STRUCTURE_CACHE_MAX_BYTES) if STRUCTURE_CACHE_MAX_BYTES else None
@@ -0,0 +1,49 @@
+from app.utils.indexes import CollectionIndex
+from app.utils.name_index import TrigramIndex
+
+class VirusCatalogue(CollectionIndex):
+    """
+    The distinct viruses in the protein collection, with their abbreviations, species and number of protein structures,
+    searchable by case-insensitive substring of any of those names. Autocomplete is answered from here without a
+    query to Mongo.
+
+    Viruses are kept in the order they first appear in the collection.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._viruses = []
+        self._trigrams = TrigramIndex([])
+
+    async def build(self, collection):
+        viruses = {}
+        async for row in collection.find({}, {"Virus name(s)": 1, "Virus name abbreviation(s)": 1, "Species": 1}):
+            name = row.get("Virus name(s)")
+            virus = viruses.get(name)
+            if virus is None:
+                virus = viruses[name] = {"name": name, "abbreviations": [], "species": [], "count": 0}
+            virus["count"] += 1
+            for key, field in [("abbreviations", "Virus name abbreviation(s)"), ("species", "Species")]:
+                value = row.get(field)
+                if isinstance(value, str) and value not in virus[key]:
+                    virus[key].append(value)
+
+        viruses = list(viruses.values())
+        self._trigrams = TrigramIndex(
+            (ordinal, value)
+            for ordinal, virus in enumerate(viruses)
+            for value in [virus["name"], *virus["abbreviations"], *virus["species"]]
+            if isinstance(value, str)
+        )
+        self._viruses = viruses
+
+    def __len__(self) -> int:
+        return len(self._viruses)
+
+    def search(self, term: str) -> list[dict]:
+        """
+        Viruses whose name, an abbreviation or a species contains term (ignoring case)
+        """
+        return [self._viruses[ordinal] for ordinal in sorted(self._trigrams.search(term))]
+
+virus_catalogue = VirusCatalogue()
@@ -0,0 +1,295 @@
+import argparse
+import asyncio
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+from app.utils.env_variables import DATA_VERSION, ZIP_CACHE_DIR, ZIP_CACHE_MAX_BYTES, ZIP_COMPRESSION
+
+# Chunk size for reading an archive back to clients
+READ_CHUNK = 256 * 1024
+
+class _Build:
+    """
+    Progress of an archive being written, which clients read as it grows: tmp_path once the builder has started
+    writing, the bytes written so far, and the cached path once it is finished
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = None
+        self.size = 0
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def update(self, **changes):
+        with self.condition:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self.condition.notify_all()
+
+class ArchiveCache:
+    """
+    Disk cache of finished zip archives, keyed on (kind, qualifier, format), the data version and the compression mode.
+
+    Archives are written to a temporary file and renamed into place, so a reader never sees a partial archive in the
+    cache. Clients don't wait for a build to finish: stream() sends the archive as it is written (a tee of the build
+    into the cache file), and concurrent requests for it within a process follow the same build. Across worker
+    processes, a lock file per archive makes later builders wait and reuse the first one's result.
+    The directory is kept under max_bytes by deleting the least recently used archives.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, data_version: str, compression: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.data_version = data_version
+        self.compression = compression
+        self._building = {}
+        self.hits = 0
+        self.builds = 0
+        self.coalesced = 0
+        os.makedirs(os.path.join(directory, "locks"), exist_ok=True)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "builds": self.builds,
+            "coalesced": self.coalesced,
+            "building": len(self._building),
+            "max_bytes": self.max_bytes,
+        }
+
+    def key(self, kind: str, qualifier: str, format: str) -> str:
+        return hashlib.sha256(f"{kind}\0{qualifier}\0{format}\0{self.data_version}\0{self.compression}".encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.zip")
+
+    def lock_path(self, key: str) -> str:
+        return os.path.join(self.directory, "locks", f"{key}.lock")
+
+    def _lock(self, lock_path: str, blocking: bool = True):
+        """
+        The lock file at lock_path, open and locked, or None if it is held and blocking is False. Its holder removes
+        the file once the build is over, so a builder that waited on a file no longer at the path takes a new one.
+        """
+        while True:
+            lock = open(lock_path, "a")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                return None
+            try:
+                if os.stat(lock_path).st_ino == os.fstat(lock.fileno()).st_ino:
+                    return lock
+            except FileNotFoundError:
+                pass
+            lock.close()
+            if not blocking:
+                return None
+
+    def _unlock(self, lock):
+        # removed while still held, so no other builder can have locked the file at the path
+        try:
+            os.remove(lock.name)
+        except OSError:
+            pass
+        lock.close()
+
+    def lookup(self, kind: str, qualifier: str, format: str):
+        """
+        Path of the cached archive, or None if it hasn't been built
+        """
+        path = self.path(self.key(kind, qualifier, format))
+        try:
+            os.utime(path) # bump mtime so eviction is least-recently-used
+        except OSError:
+            return None
+        self.hits += 1
+        return path
+
+    def _start(self, kind: str, qualifier: str, format: str, build) -> tuple:
+        """
+        (task, progress) of the archive's build, starting one unless it is already running in this process
+        """
+        key = self.key(kind, qualifier, format)
+        building = self._building.get(key)
+        if building is not None:
+            self.coalesced += 1
+            return building
+        progress = _Build(self.path(key))
+        task = asyncio.ensure_future(asyncio.to_thread(self._build, key, build, progress))
+        self._building[key] = (task, progress)
+
+        def finished(task):
+            self._building.pop(key, None)
+            if not task.cancelled():
+                task.exception() # reported to the clients reading it
+        task.add_done_callback(finished)
+        return task, progress
+
+    async def get_or_build(self, kind: str, qualifier: str, format: str, build) -> str:
+        """
+        Path of the cached archive, building it from build() - an iterator of bytes - if needed
+        """
+        path = self.lookup(kind, qualifier, format)
+        if path:
+            return path
+        task, _ = self._start(kind, qualifier, format, build)
+        return await asyncio.shield(task)
+
+    def stream(self, kind: str, qualifier: str, format: str, build):
+        """
+        Iterator of the archive's bytes - read from the cache, or sent as it is built from build() - for a
+        StreamingResponse to iterate in a worker thread. Call it from the event loop.
+        """
+        path = self.lookup(kind, qualifier, format)
+        if path:
+            progress = _Build(path)
+            progress.done = True
+        else:
+            _, progress = self._start(kind, qualifier, format, build)
+        return self._follow(progress)
+
+    def _follow(self, progress: _Build):
+        with progress.condition:
+            progress.condition.wait_for(lambda: progress.tmp_path or progress.done)
+            if progress.error:
+                raise RuntimeError("Building the archive failed") from progress.error
+            # opened under the lock, before the builder can rename the file: the descriptor stays valid after
+            f = open(progress.path if progress.done else progress.tmp_path, "rb")
+        with f:
+            position = 0
+            while True:
+                with progress.condition:
+                    progress.condition.wait_for(lambda: progress.done or progress.size > position)
+                    if progress.error:
+                        raise RuntimeError("Building the archive failed") from progress.error
+                    done = progress.done
+                    size = os.fstat(f.fileno()).st_size if done else progress.size
+                while position < size:
+                    chunk = f.read(min(READ_CHUNK, size - position))
+                    if not chunk:
+                        break
+                    position += len(chunk)
+                    yield chunk
+                if done and position >= size:
+                    return
+
+    def _build(self, key: str, build, progress: _Build) -> str:
+        path = self.path(key)
+        try:
+            lock = self._lock(self.lock_path(key))
+            try:
+                if os.path.exists(path):
+                    # another worker process built it while we waited for the lock
+                    self.coalesced += 1
+                    progress.update(done=True)
+                    return path
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        progress.update(tmp_path=tmp_path)
+                        for chunk in build():
+                            f.write(chunk)
+                            f.flush() # visible to the clients reading the file
+                            progress.update(size=progress.size + len(chunk))
+                    with progress.condition:
+                        os.replace(tmp_path, path)
+                        progress.done = True
+                        progress.condition.notify_all()
+                except BaseException:
+                    os.remove(tmp_path)
+                    raise
+                self.builds += 1
+            finally:
+                self._unlock(lock)
+        except BaseException as e:
+            progress.update(error=e, done=True)
+            raise
+        self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str):
+        # lock files left behind by a worker that died mid-build are removed once nobody holds them
+        for entry in os.scandir(os.path.join(self.directory, "locks")):
+            lock = self._lock(entry.path, blocking=False)
+            if lock:
+                self._unlock(lock)
+
+        archives = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".zip"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                archives.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(archives):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+zip_cache = ArchiveCache(ZIP_CACHE_DIR, ZIP_CACHE_MAX_BYTES, DATA_VERSION, ZIP_COMPRESSION) if ZIP_CACHE_DIR else None
+
+async def warm_up(top: int, formats: list[str]):
+    """
+    Pre-build the archives of the top viruses (by number of structures, i.e. the most expensive to build) and clusters (by number of members)
+    """
+    from app import db
+    from app.routes.zip import cluster_archive_contents, stream_zip, virus_archive_contents
+
+    proteins = db.get_protein_structures_collection()
+    clusters = db.get_clusters_collection()
+
+    viruses = await proteins.aggregate([
+        {"$group": {"_id": "$Virus name(s)", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": top},
+    ]).to_list(length=None)
+
+    for virus in viruses:
+        if not virus["_id"]:
+            continue
+        rows = await proteins.find({"Virus name(s)": virus["_id"]}).to_list(length=None)
+        csv_content, record_ids = virus_archive_contents(rows)
+        for format in formats:
+            await zip_cache.get_or_build("virus", virus["_id"], format, lambda: stream_zip(virus["_id"], format, csv_content, record_ids))
+            print(f"Built virus archive: {virus['_id']} {format}")
+
+    largest_clusters = await clusters.aggregate([
+        {"$project": {"size": {"$size": "$cluster_members"}}},
+        {"$sort": {"size": -1}},
+        {"$limit": top},
+    ]).to_list(length=None)
+
+    for cluster in largest_clusters:
+        row = await clusters.find_one({"_id": cluster["_id"]})
+        csv_content, record_ids = cluster_archive_contents(row)
+        for format in formats:
+            await zip_cache.get_or_build("cluster", cluster["_id"], format, lambda: stream_zip(cluster["_id"], format, csv_content, record_ids))
+            print(f"Built cluster archive: {cluster['_id']} {format}")
+
+    db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-build cached zip archives for the largest viruses and clusters")
+    parser.add_argument("--top", type=int, default=20, help="number of viruses and of clusters to build")
+    parser.add_argument("--format", action="append", choices=[".cif", "_relaxed.pdb"], help="model format(s) to build, default both")
+    args = parser.parse_args()
+
+    if zip_cache is None:
+        raise SystemExit("ZIP_CACHE_DIR is not set")
+
+    asyncio.run(warm_up(args.top, args.format or [".cif", "_relaxed.pdb"]))
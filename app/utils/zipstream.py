@@ -0,0 +1,211 @@
+import os
+import struct
+from collections import deque
+import tempfile
+import time
+import zlib
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+CHUNK_SIZE = 64 * 1024
+
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+# Pre-deflated sidecar files: a magic number, the CRC-32 and size of the original file, then its raw deflate stream
+PREDEFLATED_SUFFIX = ".deflate"
+_PREDEFLATED_HEADER = struct.Struct("<4sII")
+_PREDEFLATED_MAGIC = b"V3DZ"
+
+def _dos_datetime(timestamp: float) -> tuple[int, int]:
+    t = time.localtime(timestamp)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+def read_chunks(path: str, chunk_size: int = CHUNK_SIZE):
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+def write_predeflated(source: str, destination: str, compress_level: int = 9):
+    """
+    Compress source once into a sidecar that ZipStream.add_compressed can copy into archives without recompressing
+    """
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+    crc = 0
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(destination) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_PREDEFLATED_HEADER.pack(_PREDEFLATED_MAGIC, 0, 0))
+            for chunk in read_chunks(source):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                f.write(compressor.compress(chunk))
+            f.write(compressor.flush())
+            f.seek(0)
+            f.write(_PREDEFLATED_HEADER.pack(_PREDEFLATED_MAGIC, crc, size))
+        os.replace(tmp_path, destination)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def read_predeflated(path: str) -> tuple[int, int, bytes]:
+    """
+    CRC-32, original size and raw deflate data of a sidecar written by write_predeflated
+    """
+    with open(path, "rb") as f:
+        magic, crc, size = _PREDEFLATED_HEADER.unpack(f.read(_PREDEFLATED_HEADER.size))
+        if magic != _PREDEFLATED_MAGIC:
+            raise ValueError(f"{path} is not a pre-deflated file")
+        return crc, size, f.read()
+
+def compress_file(path: str, compress_level: int) -> tuple[int, int, int, bytes]:
+    """
+    Read and compress a whole file, returning (method, crc, size, data) for ZipStream.add_compressed
+    """
+    with open(path, "rb") as f:
+        contents = f.read()
+    crc = zlib.crc32(contents)
+    if not compress_level:
+        return ZIP_STORED, crc, len(contents), contents
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+    return ZIP_DEFLATED, crc, len(contents), compressor.compress(contents) + compressor.flush()
+
+def ordered_parallel(executor, function, items, window: int):
+    """
+    Yield function(item) for each item, in order, computing up to window results ahead on executor.
+    Memory is bounded by window results, however many items there are.
+    """
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+def coalesce(chunks, size: int = CHUNK_SIZE):
+    """
+    Join small chunks into blocks of at least size bytes, so a consumer isn't handed every header and deflate fragment separately
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+class ZipStream:
+    """
+    Writes a ZIP archive as a sequence of byte chunks, so it can be sent while it is being built.
+    Only the central directory entries are kept in memory.
+
+    Members are either compressed as they are read (add_file) or copied from bytes that were compressed
+    elsewhere (add_compressed). Archives over 4GB get ZIP64 offsets; single members must stay under 4GB.
+    """
+
+    def __init__(self):
+        self._offset = 0
+        self._entries = []
+        self._timestamp = _dos_datetime(time.time())
+
+    def _emit(self, data: bytes) -> bytes:
+        self._offset += len(data)
+        return data
+
+    def _local_header(self, name: bytes, method: int, flags: int, crc: int, compressed_size: int, size: int) -> bytes:
+        dos_time, dos_date = self._timestamp
+        return struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 20, flags, method, dos_time, dos_date,
+            crc, compressed_size, size, len(name), 0
+        ) + name
+
+    def add_file(self, name: str, chunks, compress_level: int = 6):
+        """
+        Yield a member whose contents are read from chunks and compressed on the fly.
+        Sizes and CRC are only known at the end, so they follow the data in a data descriptor.
+        """
+        encoded_name = name.encode("utf-8")
+        method = ZIP_DEFLATED if compress_level else ZIP_STORED
+        flags = _FLAG_DATA_DESCRIPTOR | _FLAG_UTF8
+        header_offset = self._offset
+        yield self._emit(self._local_header(encoded_name, method, flags, 0, 0, 0))
+
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15) if method == ZIP_DEFLATED else None
+        crc = 0
+        size = 0
+        compressed_size = 0
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            data = compressor.compress(chunk) if compressor else chunk
+            if data:
+                compressed_size += len(data)
+                yield self._emit(data)
+        if compressor:
+            data = compressor.flush()
+            compressed_size += len(data)
+            yield self._emit(data)
+
+        if size > _ZIP64_LIMIT or compressed_size > _ZIP64_LIMIT:
+            raise ValueError(f"{name} is too large for a ZIP member")
+
+        yield self._emit(struct.pack("<IIII", 0x08074B50, crc, compressed_size, size))
+        self._entries.append((encoded_name, method, flags, crc, compressed_size, size, header_offset))
+
+    def add_compressed(self, name: str, data: bytes, method: int, crc: int, size: int):
+        """
+        Yield a member from data that is already in its final (raw deflate or stored) form.
+        """
+        if size > _ZIP64_LIMIT or len(data) > _ZIP64_LIMIT:
+            raise ValueError(f"{name} is too large for a ZIP member")
+        encoded_name = name.encode("utf-8")
+        header_offset = self._offset
+        yield self._emit(self._local_header(encoded_name, method, _FLAG_UTF8, crc, len(data), size))
+        yield self._emit(data)
+        self._entries.append((encoded_name, method, _FLAG_UTF8, crc, len(data), size, header_offset))
+
+    def finish(self):
+        """
+        Yield the central directory and end-of-archive records
+        """
+        dos_time, dos_date = self._timestamp
+        central_directory_offset = self._offset
+        for name, method, flags, crc, compressed_size, size, header_offset in self._entries:
+            extra = b""
+            version = 20
+            if header_offset >= _ZIP64_LIMIT:
+                extra = struct.pack("<HHQ", 0x0001, 8, header_offset)
+                header_offset = _ZIP64_LIMIT
+                version = 45
+            yield self._emit(struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | version, version, flags, method, dos_time, dos_date,
+                crc, compressed_size, size, len(name), len(extra), 0, 0, 0, 0o644 << 16, header_offset
+            ) + name + extra)
+        central_directory_size = self._offset - central_directory_offset
+
+        entries = len(self._entries)
+        if entries >= 0xFFFF or central_directory_offset >= _ZIP64_LIMIT or central_directory_size >= _ZIP64_LIMIT:
+            zip64_end_offset = self._offset
+            yield self._emit(struct.pack(
+                "<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0,
+                entries, entries, central_directory_size, central_directory_offset
+            ))
+            yield self._emit(struct.pack("<IIQI", 0x07064B50, 0, zip64_end_offset, 1))
+            entries = min(entries, 0xFFFF)
+            central_directory_size = min(central_directory_size, _ZIP64_LIMIT)
+            central_directory_offset = min(central_directory_offset, _ZIP64_LIMIT)
+
+        yield self._emit(struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, entries, entries, central_directory_size, central_directory_offset, 0
+        ))
@@ -0,0 +1,86 @@
+"""
+Compare the binary structure format with the text formats it is converted from: size as served (plain and gzipped)
+and the time a client takes to read each - Biopython's parsers for the text, decode() for the binary - plus the
+one-off conversion time.
+
+    python benchmarks/binary_structure.py --models-dir <STRUCTURAL_MODELS_PATH> --limit 50
+
+Without --models-dir, synthetic relaxed PDB models are generated.
+"""
+import argparse
+import gzip
+import io
+import os
+import random
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from Bio.PDB import MMCIFParser, PDBParser
+from app.utils.binary_structure import decode, encode_structure_file
+
+RESIDUES = ["ALA", "ARG", "ASN", "ASP", "CYS", "GLN", "GLU", "GLY", "HIS", "ILE", "LEU", "LYS", "MET", "PHE", "PRO", "SER", "THR", "TRP", "TYR", "VAL"]
+ATOMS = [("N", "N"), ("CA", "C"), ("C", "C"), ("O", "O"), ("CB", "C"), ("CG", "C"), ("CD", "C"), ("NE", "N")]
+
+def synthetic_model(residues: int) -> bytes:
+    lines = []
+    x = y = z = 0.0
+    serial = 1
+    for number in range(1, residues + 1):
+        name = random.choice(RESIDUES)
+        plddt = random.uniform(30, 98)
+        for atom, element in ATOMS:
+            x, y, z = x + random.uniform(-1.5, 1.5), y + random.uniform(-1.5, 1.5), z + random.uniform(-1.5, 1.5)
+            lines.append(f"ATOM  {serial:>5} {atom:<4} {name} A{number:>4}    {x:8.3f}{y:8.3f}{z:8.3f}  1.00{plddt:6.2f}           {element}\n")
+            serial += 1
+    return "".join(lines).encode()
+
+def best(function, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models-dir", help="directory of CF-/EF- model files")
+    parser.add_argument("--limit", type=int, default=20, help="number of model files to measure")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the best is reported")
+    args = parser.parse_args()
+
+    if args.models_dir:
+        names = sorted(name for name in os.listdir(args.models_dir) if name.endswith((".cif", "_relaxed.pdb")))[:args.limit]
+        models = []
+        for name in names:
+            with open(os.path.join(args.models_dir, name), "rb") as f:
+                models.append((".cif" if name.endswith(".cif") else "_relaxed.pdb", f.read()))
+    else:
+        models = [("_relaxed.pdb", synthetic_model(random.randint(200, 1200))) for _ in range(args.limit)]
+
+    parsers = {".cif": MMCIFParser(QUIET=True), "_relaxed.pdb": PDBParser(QUIET=True)}
+    totals = dict.fromkeys(["text", "text_gz", "binary", "binary_gz", "text_parse", "binary_decode", "convert"], 0.0)
+    warnings.simplefilter("ignore")
+    for format, text in models:
+        binary = encode_structure_file(text, format)
+        totals["text"] += len(text)
+        totals["text_gz"] += len(gzip.compress(text, compresslevel=9, mtime=0))
+        totals["binary"] += len(binary)
+        totals["binary_gz"] += len(gzip.compress(binary, compresslevel=9, mtime=0))
+        totals["text_parse"] += best(lambda: parsers[format].get_structure("model", io.StringIO(text.decode())), args.repeat)
+        totals["binary_decode"] += best(lambda: decode(binary), args.repeat)
+        totals["convert"] += best(lambda: encode_structure_file(text, format), args.repeat)
+
+    print(f"{len(models)} models")
+    print(f"{'':<16}{'bytes':>14}{'vs text':>10}")
+    for name in ["text", "text_gz", "binary", "binary_gz"]:
+        print(f"{name:<16}{int(totals[name]):>14}{totals[name] / totals['text']:>10.2f}")
+    print(f"{'':<16}{'ms/model':>14}")
+    for name in ["text_parse", "binary_decode", "convert"]:
+        print(f"{name:<16}{1000 * totals[name] / len(models):>14.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare scoring search results one SequenceMatcher at a time (calculate_match_score) with the batch scorer
+(calculate_match_scores), and check both rank the names identically.
+
+    python benchmarks/match_score.py --names names.txt
+
+names.txt holds one name per line, e.g. exported with
+    mongoexport -d viro3d -c protein_structures -f genbank_name_curated --type=csv --noHeaderLine
+Without --names, a synthetic corpus the size of the protein collection is generated.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.utils.helpers import calculate_match_score, calculate_match_scores
+
+def synthetic_names(count: int) -> list[str]:
+    proteins = ["VP1", "VP2", "VP3", "VP4", "capsid protein", "polyprotein", "RNA-dependent RNA polymerase", "hexon", "penton",
+                "fiber", "DNA polymerase", "helicase", "nonstructural protein", "envelope glycoprotein", "matrix protein", "hypothetical protein"]
+    prefixes = ["Product: ", "Gene: ", ""]
+    vocabulary = [f"{random.choice(prefixes)}{random.choice(proteins)}{random.choice(['', f' {random.randint(1, 300)}'])}" for _ in range(count // 6)]
+    return [random.choice(vocabulary) for _ in range(count)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--names", help="file of names to score, one per line")
+    parser.add_argument("--count", type=int, default=85000, help="size of the synthetic corpus")
+    parser.add_argument("--query", action="append", help="search term(s), default a few typical ones")
+    args = parser.parse_args()
+
+    if args.names:
+        with open(args.names) as f:
+            names = [line.strip().strip('"') for line in f if line.strip()]
+    else:
+        random.seed(0)
+        names = synthetic_names(args.count)
+
+    print(f"{len(names)} names, {len(set(names))} distinct\n")
+    print(f"{'query':<16} {'per-name s':>11} {'batch s':>8} {'speedup':>8}")
+    for query in args.query or ["protein", "vp", "polymerase", "capsid protein 1"]:
+        start = time.perf_counter()
+        expected = [calculate_match_score(name, query) for name in names]
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scores = calculate_match_scores(names, query)
+        batch = time.perf_counter() - start
+
+        assert scores == expected
+        assert sorted(range(len(names)), key=scores.__getitem__) == sorted(range(len(names)), key=expected.__getitem__)
+        print(f"{query:<16} {single:>11.3f} {batch:>8.3f} {single / batch:>7.1f}x")
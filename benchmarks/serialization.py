@@ -0,0 +1,58 @@
+"""
+CPU time to build one protein listing response, comparing validating every structure through the Pydantic models
+(plus FastAPI's jsonable_encoder and stdlib JSON, as for a route returning a dict) with render(), which builds the
+content from the stored documents and encodes it with orjson.
+
+    python benchmarks/serialization.py --records 1000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.models.proteins import ProteinNameEntry
+from app.utils.fields import PROTEIN_FIELD_PRESETS
+from app.utils.serialization import render
+
+def documents(count: int) -> list[dict]:
+    with open(os.path.join(os.path.dirname(__file__), "..", "tests", "mock_data", "test_protein_structures.json")) as f:
+        samples = json.load(f)
+    return [{**samples[i % len(samples)], "_id": f"{samples[i % len(samples)]['_id']}-{i}"} for i in range(count)]
+
+def validated(page: list[dict], fields=None) -> bytes:
+    content = ProteinNameEntry(proteinname="protein", count=len(page), protein_structures=page).model_dump(by_alias=False)
+    return JSONResponse(jsonable_encoder(content)).body
+
+def fast(page: list[dict], fields=None) -> bytes:
+    return render(ProteinNameEntry, fields, proteinname="protein", count=len(page), protein_structures=page).body
+
+def best_time(function, page, repeat: int, fields=None) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        function(page, fields)
+        best = min(best, time.process_time() - start)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1000, help="protein structures in the response")
+    parser.add_argument("--repeat", type=int, default=10, help="runs per path, the best is reported")
+    args = parser.parse_args()
+
+    page = documents(args.records)
+    assert json.loads(validated(page)) == json.loads(fast(page))
+
+    print(f"{args.records} records per response\n")
+    print(f"{'path':<28} {'cpu ms':>8} {'bytes':>10}")
+    for label, function, fields in [
+        ("pydantic + jsonable_encoder", validated, None),
+        ("render (orjson)", fast, None),
+        ("render, fields=summary", fast, PROTEIN_FIELD_PRESETS["summary"]),
+    ]:
+        print(f"{label:<28} {best_time(function, page, args.repeat, fields) * 1000:>8.1f} {len(function(page, fields)):>10}")
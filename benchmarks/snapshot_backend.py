@@ -0,0 +1,109 @@
+"""
+Memory footprint of the snapshot backend (DATA_BACKEND=snapshot) and the latency of the queries the routes make,
+against the snapshot and, with --mongo-uri, against the same data in MongoDB.
+
+    python benchmarks/snapshot_backend.py --snapshot-path /data/import --mongo-uri mongodb://localhost:27017
+
+Without --snapshot-path, a snapshot of --records protein structures is generated from the test data.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.snapshot import SNAPSHOT_FILES, load_collection
+
+MOCK_DATA = os.path.join(os.path.dirname(__file__), "..", "tests", "mock_data")
+
+def generate_snapshot(path: str, records: int):
+    """
+    Export files of records protein structures (and a tenth as many clusters and genome coordinates), copied from the
+    test data, with about 20 structures per virus
+    """
+    for name, file in SNAPSHOT_FILES.items():
+        with open(os.path.join(MOCK_DATA, f"test_{file}")) as f:
+            samples = json.load(f)
+        count = records if name == "proteinstructures" else max(len(samples), records // 10)
+        documents = []
+        for i in range(count):
+            document = {**samples[i % len(samples)], "_id": f"{samples[i % len(samples)]['_id']}-{i}"}
+            if name == "proteinstructures":
+                document["protein_id"] = f"{document['protein_id']}-{i}"
+                document["Virus name(s)"] = f"{document['Virus name(s)']} {i // 20}"
+            documents.append(document)
+        with open(os.path.join(path, file), "w") as f:
+            json.dump(documents, f)
+
+def load_measured(path: str) -> dict:
+    collections = {}
+    print(f"{'collection':<20} {'documents':>10} {'file MB':>10} {'memory MB':>10} {'load s':>8}")
+    for name, file in SNAPSHOT_FILES.items():
+        tracemalloc.start()
+        start = time.perf_counter()
+        collections[name] = load_collection(path, name)
+        elapsed = time.perf_counter() - start
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = os.path.getsize(os.path.join(path, file))
+        print(f"{name:<20} {len(collections[name]):>10} {size / 2**20:>10.1f} {memory / 2**20:>10.1f} {elapsed:>8.2f}")
+    return collections
+
+def queries(collections: dict) -> list:
+    """
+    (label, collection name, coroutine factory) for queries shaped like the routes', using values from the data
+    """
+    protein = collections["proteinstructures"]._documents[len(collections["proteinstructures"]) // 2]
+    cluster = collections["clusters"]._documents[0]
+    coordinates = collections["genome_coordinates"]._documents[0]
+    virus = protein["Virus name(s)"]
+    return [
+        ("find_one by _id", "proteinstructures", lambda db: db.find_one({"_id": protein["_id"]})),
+        ("protein_id", "proteinstructures", lambda db: db.find({"protein_id": protein["protein_id"]}).to_list(length=None)),
+        ("virus name, page of 25", "proteinstructures", lambda db: db.find({"Virus name(s)": virus}).sort("_id", 1).limit(26).to_list(length=26)),
+        ("count by virus name", "proteinstructures", lambda db: db.count_documents({"Virus name(s)": virus})),
+        ("name regex, page of 25", "proteinstructures", lambda db: db.find({"genbank_name_curated": {"$regex": "protein", "$options": "i"}}).sort("_id", 1).limit(26).to_list(length=26)),
+        ("genome coordinates", "genome_coordinates", lambda db: db.aggregate([{"$match": {"coordinates": {"$elemMatch": {"virus_name": coordinates["coordinates"][0]["virus_name"]}}}}]).to_list(length=None)),
+        ("cluster member", "clusters", lambda db: db.find({"cluster_members.member_record_id": cluster["cluster_members"][0]["member_record_id"]}).to_list(length=None)),
+    ]
+
+async def best_time(query, db, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await query(db)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+async def compare(collections: dict, mongo_uri: str, repeat: int):
+    mongo = None
+    if mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        mongo = AsyncIOMotorClient(mongo_uri)["viro3d"]
+
+    print(f"\n{'query':<24} {'snapshot ms':>12} {'mongo ms':>10}")
+    for label, name, query in queries(collections):
+        snapshot_ms = await best_time(query, collections[name], repeat) * 1000
+        mongo_ms = f"{await best_time(query, mongo[name], repeat) * 1000:>10.2f}" if mongo is not None else f"{'-':>10}"
+        print(f"{label:<24} {snapshot_ms:>12.2f} {mongo_ms}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshot-path", help="directory holding the JSON exports")
+    parser.add_argument("--records", type=int, default=50000, help="protein structures to generate without --snapshot-path")
+    parser.add_argument("--mongo-uri", help="MongoDB holding the same data in the viro3d database")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query, the best is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as generated:
+        path = args.snapshot_path
+        if path is None:
+            path = generated
+            generate_snapshot(path, args.records)
+        collections = load_measured(path)
+    asyncio.run(compare(collections, args.mongo_uri, args.repeat))
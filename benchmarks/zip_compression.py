@@ -0,0 +1,101 @@
+"""
+Compare zip export modes: throughput, CPU time and archive size for stored, fast deflate, max deflate and pre-deflated members,
+compressed serially and on a thread pool.
+
+    python benchmarks/zip_compression.py --models-dir <STRUCTURAL_MODELS_PATH> --limit 500 --workers 8
+
+Without --models-dir, synthetic mmCIF-like files are generated in a temporary directory.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.utils.zipstream import PREDEFLATED_SUFFIX, ZIP_DEFLATED, ZipStream, compress_file, ordered_parallel, read_chunks, read_predeflated, write_predeflated
+
+LEVELS = {"stored": 0, "fast": 1, "max": 9}
+
+def synthetic_models(directory: str, count: int) -> list[str]:
+    residues = ["ALA", "ARG", "ASN", "ASP", "CYS", "GLN", "GLU", "GLY", "HIS", "ILE", "LEU", "LYS", "MET", "PHE", "PRO", "SER", "THR", "TRP", "TYR", "VAL"]
+    paths = []
+    for i in range(count):
+        lines = []
+        for atom in range(random.randint(2000, 8000)):
+            lines.append(
+                f"ATOM {atom + 1:<6} C CA . {random.choice(residues)} A 1 {atom // 8 + 1:<5} ? "
+                f"{random.uniform(-50, 50):8.3f} {random.uniform(-50, 50):8.3f} {random.uniform(-50, 50):8.3f} 1.00 {random.uniform(30, 98):6.2f} 1 A 1\n"
+            )
+        path = os.path.join(directory, f"CF-SYNTH{i}.cif")
+        with open(path, "w") as f:
+            f.writelines(lines)
+        paths.append(path)
+    return paths
+
+def build(paths: list[str], mode: str, sidecar_dir: str, executor=None, workers: int = 1) -> int:
+    zip_stream = ZipStream()
+    size = 0
+    if executor:
+        compressed = ordered_parallel(executor, lambda path: compress_file(path, LEVELS[mode]), paths, 2 * workers)
+        for path, (method, crc, original_size, data) in zip(paths, compressed):
+            for chunk in zip_stream.add_compressed(os.path.basename(path), data, method, crc, original_size):
+                size += len(chunk)
+        for chunk in zip_stream.finish():
+            size += len(chunk)
+        return size
+    for path in paths:
+        name = os.path.basename(path)
+        if mode == "predeflated":
+            crc, original_size, data = read_predeflated(os.path.join(sidecar_dir, name + PREDEFLATED_SUFFIX))
+            chunks = zip_stream.add_compressed(name, data, ZIP_DEFLATED, crc, original_size)
+        else:
+            chunks = zip_stream.add_file(name, read_chunks(path), compress_level=LEVELS[mode])
+        for chunk in chunks:
+            size += len(chunk)
+    for chunk in zip_stream.finish():
+        size += len(chunk)
+    return size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models-dir", help="directory of CF-/EF- model files")
+    parser.add_argument("--limit", type=int, default=200, help="number of model files to archive")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode, the best is reported")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="compression threads for the parallel runs")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.models_dir:
+            names = sorted(name for name in os.listdir(args.models_dir) if name.endswith((".cif", "_relaxed.pdb")))[:args.limit]
+            paths = [os.path.join(args.models_dir, name) for name in names]
+        else:
+            paths = synthetic_models(tmp, min(args.limit, 50))
+
+        sidecar_dir = os.path.join(tmp, "predeflated")
+        os.makedirs(sidecar_dir)
+        started = time.process_time()
+        for path in paths:
+            write_predeflated(path, os.path.join(sidecar_dir, os.path.basename(path) + PREDEFLATED_SUFFIX))
+        predeflate_cpu = time.process_time() - started
+
+        input_bytes = sum(os.path.getsize(path) for path in paths)
+        print(f"{len(paths)} files, {input_bytes / 1e6:.1f} MB (one-off pre-deflate cost: {predeflate_cpu:.2f}s CPU)\n")
+        print(f"{'mode':<12} {'wall s':>8} {'cpu s':>8} {'MB/s':>8} {'archive MB':>11} {'ratio':>6}")
+        executor = ThreadPoolExecutor(max_workers=args.workers)
+        runs = [(mode, None) for mode in ["stored", "fast", "max", "predeflated"]] + [(mode, executor) for mode in ["fast", "max"]]
+        for mode, pool in runs:
+            best_wall = best_cpu = float("inf")
+            for _ in range(args.repeat):
+                wall, cpu = time.perf_counter(), time.process_time()
+                archive_bytes = build(paths, mode, sidecar_dir, pool, args.workers)
+                best_wall = min(best_wall, time.perf_counter() - wall)
+                best_cpu = min(best_cpu, time.process_time() - cpu)
+            label = f"{mode} x{args.workers}" if pool else mode
+            print(f"{label:<12} {best_wall:>8.3f} {best_cpu:>8.3f} {input_bytes / 1e6 / best_wall:>8.1f} {archive_bytes / 1e6:>11.2f} {archive_bytes / input_bytes:>6.2f}")
+
+if __name__ == "__main__":
+    main()
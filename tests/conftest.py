@@ -15,4 +15,13 @@ def mock_genome_data():
 def mock_clusters_data():
     with open("./mock_data/test_clusters.json") as f:
         return json.load(f)
-    
\ No newline at end of file
+    
+@pytest.fixture(autouse=True)
+def uncached_responses(monkeypatch):
+    """
+    Tests request the same URLs against different data, so responses are only cached by tests that opt in
+    """
+    from app.utils.response_cache import response_cache
+    if response_cache:
+        response_cache.clear()
+        monkeypatch.setattr(response_cache, "max_bytes", 0)
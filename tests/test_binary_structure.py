@@ -0,0 +1,132 @@
+from httpx import ASGITransport, AsyncClient
+import numpy as np
+import pytest
+from app.main import app
+from app.routes import structures
+from app.utils.binary_structure import decode, encode_structure_file, parse_cif, parse_pdb
+from app.utils.structure_files import SidecarCache
+
+PDB = b"""\
+MODEL        1
+ATOM      1  N   MET A   1      11.104   6.134  -6.504  1.00 80.12           N
+ATOM      2  CA  MET A   1      11.639   6.071  -5.147  1.00 82.50           C
+ATOM      3  C   MET A   1      10.674   5.365  -4.200  1.00 81.00           C
+ATOM      4  N   LYS A   2       9.424   5.809  -4.139  1.00 90.00           N
+ATOM      5  CA  LYS A   2       8.396   5.201  -3.302  1.00 91.25           C
+ATOM      6  N   GLY B  10     -12.001 105.200  33.004  1.00 45.50           N
+ATOM      7  CA  GLY B  10     -12.502 104.900  31.600  1.00 47.75           C
+TER
+ENDMDL
+END
+"""
+
+CIF = b"""\
+data_model
+#
+loop_
+_atom_site.group_PDB
+_atom_site.id
+_atom_site.type_symbol
+_atom_site.label_atom_id
+_atom_site.label_comp_id
+_atom_site.label_asym_id
+_atom_site.label_seq_id
+_atom_site.pdbx_PDB_ins_code
+_atom_site.Cartn_x
+_atom_site.Cartn_y
+_atom_site.Cartn_z
+_atom_site.occupancy
+_atom_site.B_iso_or_equiv
+_atom_site.auth_seq_id
+_atom_site.auth_asym_id
+_atom_site.pdbx_PDB_model_num
+ATOM 1 N N MET A 1 ? 11.104 6.134 -6.504 1.00 80.12 1 A 1
+ATOM 2 C CA MET A 1 ? 11.639 6.071 -5.147 1.00 82.50 1 A 1
+ATOM 3 C C MET A 1 ? 10.674 5.365 -4.200 1.00 81.00 1 A 1
+ATOM 4 N N LYS A 2 ? 9.424 5.809 -4.139 1.00 90.00 2 A 1
+ATOM 5 C CA LYS A 2 ? 8.396 5.201 -3.302 1.00 91.25 2 A 1
+ATOM 6 N N GLY B 10 ? -12.001 105.200 33.004 1.00 45.50 10 B 1
+ATOM 7 C CA GLY B 10 ? -12.502 104.900 31.600 1.00 47.75 10 B 1
+#
+"""
+
+def check_columns(columns: dict):
+    assert columns["atom_name"] == ["N", "CA", "C", "N", "CA", "N", "CA"]
+    assert columns["element"] == ["N", "C", "C", "N", "C", "N", "C"]
+    np.testing.assert_allclose(columns["x"], [11.104, 11.639, 10.674, 9.424, 8.396, -12.001, -12.502])
+    np.testing.assert_allclose(columns["y"][-2:], [105.2, 104.9])
+    np.testing.assert_allclose(columns["z"][:2], [-6.504, -5.147])
+    assert list(columns["residue_atom_count"]) == [3, 2, 2]
+    assert columns["residue_name"] == ["MET", "LYS", "GLY"]
+    assert list(columns["residue_number"]) == [1, 2, 10]
+    assert columns["chain"] == ["A", "A", "B"]
+    np.testing.assert_allclose(columns["plddt"], [82.5, 91.25, 47.75]) # CA atoms
+
+def test_pdb_round_trip():
+    check_columns(decode(encode_structure_file(PDB, "_relaxed.pdb")))
+
+def test_cif_round_trip():
+    check_columns(decode(encode_structure_file(CIF, ".cif")))
+    pdb, cif = parse_pdb(PDB), parse_cif(CIF)
+    for name in pdb:
+        np.testing.assert_array_equal(pdb[name], cif[name])
+
+def test_binary_is_smaller_than_text():
+    lines = PDB.splitlines()
+    atoms = [line for line in lines if line.startswith(b"ATOM")]
+    assert len(encode_structure_file(b"\n".join(atoms * 100), "_relaxed.pdb")) < len(PDB) * 100 / 3
+
+def test_no_atoms():
+    with pytest.raises(ValueError):
+        encode_structure_file(b"END\n", "_relaxed.pdb")
+
+@pytest.fixture
+def models(tmp_path, monkeypatch):
+    directory = tmp_path / "models"
+    directory.mkdir()
+    (directory / "CF-TEST.1_1_relaxed.pdb").write_bytes(PDB)
+    (directory / "CF-TEST.1_1.cif").write_bytes(CIF)
+    (directory / "EF-EMPTY.1_1.cif").write_bytes(b"data_model\n#\n")
+    monkeypatch.setattr(structures, "STRUCTURAL_MODELS_PATH", f"{directory}/")
+    monkeypatch.setattr(structures, "structure_sidecar_cache", SidecarCache(str(tmp_path / "cache"), max_bytes=1024 * 1024))
+    return directory
+
+@pytest.mark.asyncio
+async def test_get_binary_structure(models):
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    response = await async_client.get("/structures/binary/CF-TEST.1_1", params={"source": "_relaxed.pdb"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    check_columns(decode(response.content))
+    assert structures.structure_sidecar_cache.stats()["generated"] == 1
+
+    again = await async_client.get("/structures/binary/CF-TEST.1_1", params={"source": "_relaxed.pdb"})
+    assert again.content == response.content
+    assert structures.structure_sidecar_cache.stats()["hits"] == 1
+
+    not_modified = await async_client.get("/structures/binary/CF-TEST.1_1", params={"source": "_relaxed.pdb"}, headers={"If-None-Match": response.headers["etag"]})
+    assert not_modified.status_code == 304
+
+    cif = await async_client.get("/structures/binary/CF-TEST.1_1")
+    assert cif.status_code == 200
+    assert cif.headers["etag"] != response.headers["etag"]
+    check_columns(decode(cif.content))
+
+@pytest.mark.asyncio
+async def test_get_binary_structure_uncached(models, monkeypatch):
+    monkeypatch.setattr(structures, "structure_sidecar_cache", None)
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    response = await async_client.get("/structures/binary/CF-TEST.1_1")
+    assert response.status_code == 200
+    check_columns(decode(response.content))
+
+@pytest.mark.asyncio
+async def test_get_binary_structure_errors(models):
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    assert (await async_client.get("/structures/binary/CF-MISSING.1_1")).status_code == 404
+    assert (await async_client.get("/structures/binary/XX-TEST.1_1")).status_code == 404
+    assert (await async_client.get("/structures/binary/CF-TEST.1_1", params={"source": ".pdb"})).status_code == 422
+    assert (await async_client.get("/structures/binary/EF-EMPTY.1_1")).status_code == 422
@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from app.utils.blast import BlastRunner, BlastCancelled, BlastQueueFull, BlastTimeout
+
+class DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+class ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+@pytest.mark.asyncio
+async def test_blast_runner_returns_stdout():
+    runner = BlastRunner(command=["cat"], max_concurrency=1, max_queue=1, timeout=5)
+
+    assert await runner.run("MRMRLLA") == "MRMRLLA"
+    assert runner.stats()["completed"] == 1
+
+@pytest.mark.asyncio
+async def test_blast_runner_timeout():
+    runner = BlastRunner(command=["sleep", "5"], max_concurrency=1, max_queue=1, timeout=0.1)
+
+    with pytest.raises(BlastTimeout):
+        await runner.run("MRMRLLA")
+    assert runner.stats()["timed_out"] == 1
+    assert runner.stats()["running"] == 0
+
+@pytest.mark.asyncio
+async def test_blast_runner_rejects_when_queue_is_full():
+    runner = BlastRunner(command=["sleep", "0.5"], max_concurrency=1, max_queue=1, timeout=5)
+
+    running = asyncio.ensure_future(runner.run("A"))
+    await asyncio.sleep(0.1)
+    queued = asyncio.ensure_future(runner.run("B"))
+    await asyncio.sleep(0.1)
+
+    with pytest.raises(BlastQueueFull):
+        await runner.run("C")
+
+    await asyncio.gather(running, queued)
+    assert runner.stats()["completed"] == 2
+    assert runner.stats()["rejected"] == 1
+
+@pytest.mark.asyncio
+async def test_blast_runner_rejects_a_burst_beyond_the_queue():
+    runner = BlastRunner(command=["cat"], max_concurrency=1, max_queue=1, timeout=5)
+
+    # none of these has started before the next is checked
+    results = await asyncio.gather(*[runner.run(sequence) for sequence in ["A", "B", "C", "A"]], return_exceptions=True)
+
+    assert results[0] == results[3] == "A"
+    assert results[1] == "B"
+    assert isinstance(results[2], BlastQueueFull)
+    assert runner.stats()["completed"] == 2
+    assert runner.stats()["waiting"] == 0
+
+@pytest.mark.asyncio
+async def test_blast_runner_releases_the_slot_of_a_search_cancelled_before_it_starts():
+    runner = BlastRunner(command=["cat"], max_concurrency=1, max_queue=1, timeout=5)
+
+    for request in [None, ConnectedRequest()]:
+        search = asyncio.ensure_future(runner.run("A", request=request))
+        await asyncio.sleep(0)
+        search.cancel()
+        await asyncio.gather(search, return_exceptions=True)
+        assert runner.stats()["waiting"] == 0
+
+    assert await runner.run("B") == "B"
+
+@pytest.mark.asyncio
+async def test_blast_runner_cancels_on_client_disconnect():
+    runner = BlastRunner(command=["sleep", "5"], max_concurrency=1, max_queue=1, timeout=10, poll_interval=0.05)
+
+    with pytest.raises(BlastCancelled):
+        await runner.run("MRMRLLA", request=DisconnectedRequest())
+
+    assert runner.stats()["cancelled"] == 1
+    assert runner.stats()["running"] == 0
+
+@pytest.mark.asyncio
+async def test_blast_runner_shares_runs_of_the_same_sequence():
+    runner = BlastRunner(command=["sh", "-c", "sleep 0.2; cat"], max_concurrency=1, max_queue=1, timeout=5, poll_interval=0.05)
+
+    results = await asyncio.gather(
+        runner.run("MRMRLLA", request=ConnectedRequest()),
+        runner.run("MRMRLLA", request=DisconnectedRequest()),
+        runner.run("MRMRLLA"),
+        return_exceptions=True,
+    )
+
+    # the disconnected client gives up, the others still get the shared result
+    assert results[0] == results[2] == "MRMRLLA"
+    assert isinstance(results[1], BlastCancelled)
+    assert runner.stats()["completed"] == 1
+    assert runner.stats()["coalesced"] == 2
@@ -0,0 +1,88 @@
+import json
+import os
+import time
+import pytest
+from app.utils.blast_cache import BlastCache
+
+HITS = [{"structure_id": "CAI74981.1.4_11505", "score": 63.0, "evalue": 0.00660783, "hit_length": 13, "positives": 13, "gaps": 0}]
+
+def make_cache(tmp_path, **kwargs):
+    db_path = str(tmp_path / "viro3d_blast_db")
+    with open(f"{db_path}.psq", "w") as f:
+        f.write("v1")
+    options = {"max_entries": 2, "ttl": 60, "fingerprint_interval": 0}
+    options.update(kwargs)
+    return BlastCache(db_path=db_path, params={"program": "blastp"}, **options)
+
+@pytest.mark.asyncio
+async def test_blast_cache_normalizes_sequence(tmp_path):
+    cache = make_cache(tmp_path)
+    await cache.set("asgkplyrnmala", HITS)
+
+    assert await cache.get("ASGKPLYRNMALA") == HITS
+    assert await cache.get("ASGKPLYRNMAL") is None
+
+@pytest.mark.asyncio
+async def test_blast_cache_lru_eviction(tmp_path):
+    cache = make_cache(tmp_path)
+    await cache.set("AAA", HITS)
+    await cache.set("CCC", HITS)
+    await cache.get("AAA")
+    await cache.set("DDD", HITS)
+
+    assert await cache.get("CCC") is None
+    assert await cache.get("AAA") == HITS
+    assert await cache.get("DDD") == HITS
+
+@pytest.mark.asyncio
+async def test_blast_cache_ttl(tmp_path):
+    cache = make_cache(tmp_path, ttl=0.05)
+    await cache.set("AAA", HITS)
+    time.sleep(0.1)
+
+    assert await cache.get("AAA") is None
+
+@pytest.mark.asyncio
+async def test_blast_cache_invalidated_when_database_changes(tmp_path):
+    cache = make_cache(tmp_path)
+    await cache.set("AAA", HITS)
+
+    with open(tmp_path / "viro3d_blast_db.psq", "w") as f:
+        f.write("v2 - rebuilt database")
+
+    assert await cache.get("AAA") is None
+
+@pytest.mark.asyncio
+async def test_blast_cache_disk_tier_is_shared(tmp_path):
+    directory = str(tmp_path / "cache")
+    first_worker = make_cache(tmp_path, directory=directory, disk_max_bytes=1024 * 1024)
+    second_worker = make_cache(tmp_path, directory=directory, disk_max_bytes=1024 * 1024)
+    await first_worker.set("AAA", HITS)
+
+    assert await second_worker.get("AAA") == HITS
+    assert second_worker.stats()["disk_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_blast_cache_disk_tier_is_size_bounded(tmp_path):
+    directory = str(tmp_path / "cache")
+    cache = make_cache(tmp_path, directory=directory, disk_max_bytes=300)
+    for sequence in ["AAA", "CCC", "DDD", "EEE"]:
+        await cache.set(sequence, HITS)
+
+    assert sum(entry.stat().st_size for entry in os.scandir(directory)) <= 300
+
+@pytest.mark.asyncio
+async def test_blast_cache_disk_tier_is_only_scanned_when_over_budget(tmp_path, monkeypatch):
+    directory = str(tmp_path / "cache")
+    cache = make_cache(tmp_path, directory=directory, disk_max_bytes=len(json.dumps(HITS)) * 3)
+    scans = []
+    evict_disk = cache._evict_disk
+    monkeypatch.setattr(cache, "_evict_disk", lambda: scans.append(1) or evict_disk())
+
+    for sequence in ["AAA", "CCC", "DDD"]:
+        await cache.set(sequence, HITS)
+    assert len(scans) == 1 # the first write measures the directory
+
+    await cache.set("EEE", HITS)
+    assert len(scans) == 2
+    assert len(os.listdir(directory)) == 3
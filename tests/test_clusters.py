@@ -39,4 +39,30 @@ async def test_get_cluster_by_genbank_id_no_match(mock_clusters_data):
     )
     assert response.status_code == 404, f'404 was expected, but {response.status_code} was returned'
     assert response.json() == {"detail": "No Similar Structures Found"}
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query, expected", [
+    ("qualifier=AFU076", ["CF-AFU07689.1_4668_relaxed", "CF-AFU07674.1_4625_relaxed", "CF-AFU07681.1_4667_relaxed"]),
+    ("qualifier=aeo16194.1_&match=prefix", ["CF-AFU07674.1_4625_relaxed"]),
+    ("qualifier=ADV03081.1&match=exact", ["CF-AFU07689.1_4668_relaxed"]),
+    ("qualifier=AEP82745.1_4624&match=exact", ["CF-AFU07674.1_4625_relaxed"]),
+    ("qualifier=AEP82745&match=exact", []),
+    ("qualifier=_46(25|67)&match=substring", ["CF-AFU07674.1_4625_relaxed", "CF-AFU07681.1_4667_relaxed"]),
+    ("qualifier=_46&match=prefix", []),
+])
+async def test_get_cluster_by_genbank_id_match(mock_clusters_data, query, expected):
+
+    mock_collection = AsyncMongoMockClient()["test_database"]["clusters"]
+    await mock_collection.insert_many(mock_clusters_data)
+
+    app.dependency_overrides[get_clusters_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    response: Response = await async_client.get(url=f"/clusters/genbank_id/?{query}")
+
+    if expected:
+        assert response.status_code == 200
+        assert [cluster["cluster_representative"] for cluster in response.json()["clusters"]] == expected
+    else:
+        assert response.status_code == 404
+    app.dependency_overrides.clear()
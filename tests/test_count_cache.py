@@ -0,0 +1,61 @@
+from fastapi import Response
+from httpx import ASGITransport, AsyncClient
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.db import get_protein_structures_collection
+from app.main import app
+from app.utils import count_cache as count_cache_module
+from app.utils.count_cache import CountCache, normalize_query
+
+def test_normalize_query():
+    assert normalize_query({"a": 1, "b": {"$regex": "GyV", "$options": "i"}}) == normalize_query({"b": {"$options": "i", "$regex": "gyv"}, "a": 1})
+    assert normalize_query({"b": {"$regex": "GyV"}}) != normalize_query({"b": {"$regex": "gyv"}})
+    assert normalize_query({"b": {"$regex": "\\D", "$options": "i"}}) != normalize_query({"b": {"$regex": "\\d", "$options": "i"}})
+
+@pytest.mark.asyncio
+async def test_count_cache(mock_protein_data):
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+    cache = CountCache(max_entries=10, ttl=60)
+
+    assert await cache.count(mock_collection, {"Virus name(s)": {"$regex": "Gyrovirus", "$options": "i"}}) == 6
+    await mock_collection.delete_many({})
+    assert await cache.count(mock_collection, {"Virus name(s)": {"$options": "i", "$regex": "gyrovirus"}}) == 6
+    assert cache.stats()["hits"] == 1
+
+    cache.ttl = 0
+    cache.clear()
+    assert await cache.count(mock_collection, {"Virus name(s)": {"$regex": "gyrovirus", "$options": "i"}}) == 0
+
+@pytest.mark.asyncio
+async def test_optional_and_estimated_counts(mock_protein_data, monkeypatch):
+    monkeypatch.setattr(count_cache_module, "COUNT_ESTIMATE_LIMIT", 3)
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    response: Response = await async_client.get(url=f"/proteins/genbank_id/?qualifier=CAI7498&page_size=2&include_count=false")
+    assert response.status_code == 200
+    assert response.json()["count"] is None
+
+    response = await async_client.get(url=f"/proteins/genbank_id/?qualifier=CAI7498&page_size=2&estimate_count=true")
+    assert (response.json()["count"], response.json()["count_is_estimate"]) == (3, True)
+
+    response = await async_client.get(url=f"/proteins/genbank_id/?qualifier=CAI7498&page_size=2")
+    assert (response.json()["count"], response.json()["count_is_estimate"]) == (8, False)
+
+    response = await async_client.get(url=f"/proteins/virus_name/?qualifier=tellina&page_size=2&include_count=false")
+    assert response.json()["count"] is None
+
+    # routes answered from the in-memory name index report their counts the same way
+    for url in ["/proteins/virus_name/?qualifier=gyrovirus&page_size=2", "/proteins/protein_name/?qualifier=vp&page_size=2"]:
+        response = await async_client.get(url=f"{url}&estimate_count=true")
+        assert (response.json()["count"], response.json()["count_is_estimate"]) == (3, True)
+        response = await async_client.get(url=url)
+        assert response.json()["count"] > 3 and not response.json()["count_is_estimate"]
+
+    response = await async_client.get(url=f"/proteins/protein_name/?qualifier=pep13&estimate_count=true")
+    assert (response.json()["count"], response.json()["count_is_estimate"]) == (1, False)
+    app.dependency_overrides.clear()
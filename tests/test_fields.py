@@ -0,0 +1,71 @@
+from fastapi import Response
+from httpx import ASGITransport, AsyncClient
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.db import get_protein_structures_collection
+from app.main import app
+from app.utils.fields import PROTEIN_FIELD_PRESETS, mongo_projection
+
+def test_mongo_projection():
+    assert mongo_projection(["record_id", "genbank_id", "protlen"]) == {"_id": 1, "record_id": 1, "protein_id": 1, "genbank_id": 1, "protlen": 1}
+    assert mongo_projection(None) is None
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url", [
+    "/proteins/protein_name/?qualifier=protein",
+    "/proteins/genbank_id/?qualifier=CAI7498",
+    "/proteins/virus_name/?qualifier=tellina",
+    "/proteins/virus_name/?qualifier=tell.na",
+    "/proteins/virus_name_exact/?qualifier=Tellina virus 1",
+    "/proteins/protein_name/?qualifier=protein&cursor=",
+])
+async def test_fields_limit_protein_structures(mock_protein_data, url):
+
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    full: Response = await async_client.get(url=url)
+    response: Response = await async_client.get(url=url, params={"fields": "summary,protein_seq"})
+
+    assert response.status_code == 200, f'200 was expected, but {response.status_code} was returned'
+    assert response.json().keys() == full.json().keys()
+    expected_fields = PROTEIN_FIELD_PRESETS["summary"] + ["protein_seq"]
+    assert [set(structure) for structure in response.json()["protein_structures"]] == [set(expected_fields)] * len(full.json()["protein_structures"])
+    assert response.json()["protein_structures"] == [
+        {field: structure[field] for field in expected_fields} for structure in full.json()["protein_structures"]
+    ]
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_fields_limit_sequence_matches(mock_protein_data):
+
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    response: Response = await async_client.get(
+        url=f"/proteins/sequence_match/?qualifier=ASGKPLYRNMALA&exact_only=true&fields=record_id,genbank_name_curated"
+    )
+
+    assert response.status_code == 200, f'200 was expected, but {response.status_code} was returned'
+    assert response.json()["matches"][0]["protein_structure"] == {"record_id": "CAI74981.1.4_11505", "genbank_name_curated": "Pep13 protein"}
+    assert response.json()["matches"][0]["evalue"] == 0.0
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_unknown_field(mock_protein_data):
+
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    response: Response = await async_client.get(
+        url=f"/proteins/genbank_id/?qualifier=CAI7498&fields=record_id,password"
+    )
+
+    assert response.status_code == 400, f'400 was expected, but {response.status_code} was returned'
+    app.dependency_overrides.clear()
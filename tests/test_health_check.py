@@ -1,6 +1,7 @@
 from fastapi import Response
 from httpx import ASGITransport, AsyncClient
 import pytest
+from app.db import PoolStats
 from app.main import app
 
 @pytest.mark.asyncio
@@ -11,4 +12,26 @@ async def test_health_check():
         url=f"/health_check/"
     )
     
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_pool_stats():
+
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    response: Response = await async_client.get(
+        url=f"/health_check/pool"
+    )
+
+    assert response.status_code == 200
+    assert {"max_pool_size", "connections_open", "checked_out", "avg_wait_ms", "max_wait_ms"} <= response.json().keys()
+
+def test_pool_stats_counts_pool_clears():
+    stats = PoolStats()
+    stats.pool_cleared(None)
+    stats.pool_cleared(None)
+    assert stats.snapshot()["pools_cleared"] == 2
+
+    stats.reset()
+    assert stats.snapshot()["pools_cleared"] == 0
+    stats.pool_cleared(None)
+    assert stats.snapshot()["pools_cleared"] == 1
@@ -1,4 +1,6 @@
-from app.utils.helpers import calculate_match_score, validate_regex
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.utils.helpers import calculate_match_score, calculate_match_scores, find_by_ids, rank_page, validate_regex
 
 def test_validate_regex():
     assert validate_regex("simian adenovirus 27 (chimpanzee)") == "simian adenovirus 27 \\(chimpanzee\\)"
@@ -9,4 +11,26 @@ def test_validate_regex():
 def test_calculate_match_score():
     assert calculate_match_score("ABCDEFG", "ABCDEFG") == 3.00
     assert calculate_match_score("AAAA", "AABB") == 0.50 
-    assert calculate_match_score("1234567", "ABCDEFG") == 0.00
\ No newline at end of file
+    assert calculate_match_score("1234567", "ABCDEFG") == 0.00
+
+def test_calculate_match_scores(mock_protein_data):
+    names = [row["genbank_name_curated"] for row in mock_protein_data] + ["ABCDEFG", "AAAA", "1234567", "VP2 protein"]
+    for query in ["vp2", "Protein", "ABCDEFG", "AABB", "product: vp", "zz"]:
+        assert calculate_match_scores(names, query) == [calculate_match_score(name, query) for name in names]
+
+def test_rank_page():
+    items = [("a", 1), ("b", 3), ("c", 2), ("d", 3), ("e", 1), ("f", 2)]
+    ranked = sorted(items, key=lambda item: item[1], reverse=True)
+    for page_size, skips in [(2, 0), (2, 2), (4, 4), (10, 0), (None, 0)]:
+        expected = ranked[skips:skips + page_size] if page_size else ranked
+        assert rank_page(items, key=lambda item: item[1], skips=skips, page_size=page_size) == expected
+
+@pytest.mark.asyncio
+async def test_find_by_ids(mock_protein_data):
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    documents = await find_by_ids(mock_collection, ["AFO67214.1_12633", "CAI74981.1.4_11505", "AFO67214.1_12633", "no_match"], chunk_size=1)
+
+    assert set(documents.keys()) == {"AFO67214.1_12633", "CAI74981.1.4_11505"}
+    assert documents["CAI74981.1.4_11505"]["uniprot_id"] == "Q2PBR5"
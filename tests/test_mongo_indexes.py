@@ -0,0 +1,55 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.utils import mongo_indexes
+from app.utils.mongo_indexes import REQUIRED_INDEXES, ensure_indexes, is_full_scan, plan_stages, provision
+
+def test_plan_stages():
+    classic = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "protein_id"}}
+    assert plan_stages(classic) == ["FETCH", "IXSCAN"]
+
+    merged = {"stage": "SUBPLAN", "inputStage": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}}
+    assert "COLLSCAN" in plan_stages(merged)
+
+    slot_based = {"queryPlan": {"stage": "COLLSCAN", "planNodeId": 1}, "slotBasedPlan": {"slots": "", "stages": "[1] scan"}}
+    assert plan_stages(slot_based) == ["COLLSCAN"]
+
+def test_is_full_scan():
+    point = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "keyPattern": {"Virus name(s)": 1}, "indexBounds": {"Virus name(s)": ['["Tellina virus 1", "Tellina virus 1"]']}}}
+    assert not is_full_scan(point)
+
+    unanchored_regex = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "keyPattern": {"protein_id": 1}, "indexBounds": {"protein_id": ['["", {})', "[/AFO67214/i, /AFO67214/i]"]}}}
+    assert is_full_scan(unanchored_regex)
+
+    compound = {"stage": "IXSCAN", "keyPattern": {"a": 1, "b": 1}, "indexBounds": {"a": ["[1, 1]"], "b": ["[MinKey, MaxKey]"]}}
+    assert not is_full_scan(compound)
+
+    assert is_full_scan({"stage": "COLLSCAN"})
+
+@pytest.mark.asyncio
+async def test_ensure_indexes():
+    database = AsyncMongoMockClient()["test_database"]
+    await database["proteinstructures"].create_index("protein_id", name="existing")
+
+    created = await ensure_indexes(database.get_collection)
+    assert "proteinstructures.protein_id" not in created
+    assert sorted(created) == sorted(
+        f"{name}.{index.document['name']}" for name, indexes in REQUIRED_INDEXES.items() for index in indexes
+        if index.document["name"] != "protein_id"
+    )
+    assert await ensure_indexes(database.get_collection) == []
+
+    names = await database["clusters"].index_information()
+    assert "cluster_member_record_id" in names
+
+@pytest.mark.asyncio
+async def test_provision_fails_on_full_scans(monkeypatch):
+    database = AsyncMongoMockClient()["test_database"]
+
+    async def scans(get_collection):
+        return ["/proteins/genbank_id/ (proteinstructures: {})"]
+    monkeypatch.setattr(mongo_indexes, "full_scans", scans)
+
+    await provision(database.get_collection, create=True, check="warn")
+    with pytest.raises(RuntimeError):
+        await provision(database.get_collection, create=False, check="fail")
+    await provision(database.get_collection, create=False, check="off")
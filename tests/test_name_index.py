@@ -0,0 +1,89 @@
+import re
+from fastapi import Response
+from httpx import ASGITransport, AsyncClient
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.db import get_protein_structures_collection
+from app.main import app
+from app.routes import admin
+from app.utils.helpers import validate_regex
+from app.utils.indexes import CollectionIndex, REGISTERED_INDEXES
+from app.utils.name_index import NAME_FIELDS, NameIndex, literal_term
+
+def test_index_without_build_cannot_be_created():
+    class Incomplete(CollectionIndex):
+        pass
+
+    registered = len(REGISTERED_INDEXES)
+    with pytest.raises(TypeError):
+        Incomplete()
+    assert len(REGISTERED_INDEXES) == registered
+
+def test_literal_term():
+    assert literal_term("gyrovirus 4") == "gyrovirus 4"
+    assert literal_term(validate_regex("VP1 (capsid) [x+]")) == "VP1 (capsid) [x+]"
+    assert literal_term("gyro.*4") is None
+    assert literal_term("^gyro") is None
+    assert literal_term("\\d") is None
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("term", ["", "v", "VP", "vp3", "gyrovirus", "GYROVIRUS 1", "protein", "Product: VP", "no_match", "rna-dependant"])
+async def test_name_index_matches_regex_search(mock_protein_data, term):
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+    index = NameIndex()
+    await index.load(mock_collection)
+
+    for fields in [["genbank_name_curated"], NAME_FIELDS[1:]]:
+        expected = [row["_id"] for row in mock_protein_data if any(re.search(re.escape(term), row[field], re.IGNORECASE) for field in fields)]
+        assert index.record_ids(index.search((fields, term))) == expected
+
+@pytest.mark.asyncio
+async def test_name_index_combines_criteria(mock_protein_data):
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+    index = NameIndex()
+    await index.load(mock_collection)
+
+    ordinals = index.search((["genbank_name_curated"], "vp3"), (["Virus name(s)", "Virus name abbreviation(s)"], "gyrovirus"))
+    assert index.record_ids(ordinals) == ["QBM01055.1_12636", "AEB00703.1_12629"]
+
+@pytest.mark.asyncio
+async def test_get_protein_structures_by_protein_name_with_regex_syntax(mock_protein_data):
+
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    response: Response = await async_client.get(
+        url=f"/proteins/protein_name/?qualifier=^VP. protein"
+    )
+
+    assert response.status_code == 200, f'200 was expected, but {response.status_code} was returned'
+    assert response.json()["count"] == 3
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_reload_indexes(mock_protein_data, monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "secret")
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    response: Response = await async_client.get(url=f"/viruses/?qualifier=new virus")
+    assert response.status_code == 404
+
+    await mock_collection.insert_one({**mock_protein_data[0], "_id": "NEW1", "Virus name(s)": "new virus"})
+
+    response = await async_client.post(url=f"/admin/reload_indexes")
+    assert response.status_code == 403
+    response = await async_client.post(url=f"/admin/reload_indexes", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert "NameIndex" in response.json()["reloaded"]
+
+    response = await async_client.get(url=f"/viruses/?qualifier=new virus")
+    assert response.status_code == 200
+    assert response.json()["viruses"] == [{"_id": "new virus"}]
+    app.dependency_overrides.clear()
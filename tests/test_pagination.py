@@ -0,0 +1,84 @@
+from fastapi import Response
+from httpx import ASGITransport, AsyncClient
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.db import get_protein_structures_collection
+from app.main import app
+from app.utils.pagination import encode_cursor, keyset_page
+
+async def walk_pages(async_client, url, page_size, results_key="protein_structures"):
+    pages = []
+    cursor = ""
+    while cursor is not None:
+        response: Response = await async_client.get(url=url, params={"page_size": page_size, "cursor": cursor})
+        assert response.status_code == 200, f'200 was expected, but {response.status_code} was returned'
+        assert len(response.json()[results_key]) <= page_size
+        pages.append(response.json()[results_key])
+        cursor = response.json()["next_cursor"]
+    return pages
+
+def test_keyset_page():
+    items = [("a", 2), ("b", 1), ("c", 2), ("d", 3), ("e", 1)]
+    key = lambda item: (item[1], item[0])
+
+    page, next_cursor = keyset_page(items, key, [], 2)
+    assert page == [("b", 1), ("e", 1)]
+    page, next_cursor = keyset_page(items, key, [1, "e"], 2)
+    assert page == [("a", 2), ("c", 2)]
+    page, next_cursor = keyset_page(items, key, [2, "c"], 2)
+    assert page == [("d", 3)] and next_cursor is None
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url, count", [
+    ("/proteins/genbank_id/?qualifier=CAI7498", 8),
+    ("/proteins/virus_name/?qualifier=virus", 15),
+    ("/proteins/virus_name/?qualifier=gyro.*", 6),
+    ("/proteins/virus_name_exact/?qualifier=Tellina virus 1", 8),
+])
+async def test_cursor_pages_follow_record_ids(mock_protein_data, url, count):
+
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    pages = await walk_pages(async_client, url, page_size=3)
+
+    record_ids = [structure["record_id"] for page in pages for structure in page]
+    assert record_ids == sorted(record_ids)
+    assert len(record_ids) == count
+    assert [len(page) for page in pages[:-1]] == [3] * (len(pages) - 1)
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_cursor_pages_follow_protein_name_ranking(mock_protein_data):
+
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    response: Response = await async_client.get(url=f"/proteins/protein_name/?qualifier=protein")
+    ranked = response.json()["protein_structures"]
+
+    pages = await walk_pages(async_client, "/proteins/protein_name/?qualifier=protein", page_size=2)
+
+    assert sorted(structure["record_id"] for page in pages for structure in page) == sorted(structure["record_id"] for structure in ranked)
+    assert [structure["genbank_name_curated"] for page in pages for structure in page][0] == ranked[0]["genbank_name_curated"]
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_invalid_cursor(mock_protein_data):
+
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    for cursor in ["not a cursor", encode_cursor({"_id": 1}), encode_cursor(["AEB00703.1_12629"])]:
+        response: Response = await async_client.get(
+            url=f"/proteins/protein_name/?qualifier=protein&page_size=2", params={"cursor": cursor}
+        )
+        assert response.status_code == 400, f'400 was expected, but {response.status_code} was returned'
+    app.dependency_overrides.clear()
@@ -0,0 +1,101 @@
+from httpx import ASGITransport, AsyncClient
+import numpy as np
+import pytest
+from app.main import app
+from app.routes import structures
+from app.utils.plddt_store import PlddtStore, build, model_sources
+from .test_binary_structure import CIF, PDB
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    models = tmp_path / "models"
+    models.mkdir()
+    (models / "CF-TEST.1_1_relaxed.pdb").write_bytes(PDB)
+    (models / "CF-TEST.1_1.cif").write_bytes(CIF)
+    (models / "EF-TEST.1_1.cif").write_bytes(CIF.replace(b" 80.12 ", b" 10.00 ").replace(b" 82.50 ", b" 20.00 "))
+    (models / "EF-BROKEN.1_1.cif").write_bytes(b"data_model\n#\n")
+    (models / "notes.txt").write_bytes(b"")
+    assert build(str(models), str(tmp_path / "store"), workers=1) == 2
+
+    store = PlddtStore(str(tmp_path / "store"))
+    monkeypatch.setattr(structures, "plddt_store", store)
+    return store
+
+def test_model_sources(tmp_path):
+    (tmp_path / "CF-A_relaxed.pdb").write_bytes(b"")
+    (tmp_path / "CF-A.cif").write_bytes(b"")
+    (tmp_path / "EF-B.cif").write_bytes(b"")
+    (tmp_path / "other.cif").write_bytes(b"")
+    sources = model_sources(str(tmp_path))
+    assert {name: format for name, (_, format) in sources.items()} == {"CF-A": "_relaxed.pdb", "EF-B": ".cif"}
+
+def test_store(store):
+    np.testing.assert_allclose(store.get("CF-TEST.1_1"), [82.5, 91.25, 47.75])
+    np.testing.assert_allclose(store.get("EF-TEST.1_1"), [20.0, 91.25, 47.75])
+    assert store.get("EF-BROKEN.1_1") is None
+    assert store.stats()["models"] == 2
+    assert store.stats()["residues"] == 6
+
+def test_rebuild_replaces_build(store, tmp_path):
+    first = store.stats()["build"]
+    (tmp_path / "models" / "CF-TEST.1_1_relaxed.pdb").unlink()
+    (tmp_path / "models" / "CF-TEST.1_1.cif").unlink()
+    assert build(str(tmp_path / "models"), store.path, workers=1) == 1
+
+    assert store.get("CF-TEST.1_1") is not None # still mapping the first build
+    assert store.reload()
+    assert store.stats()["build"] != first
+    assert store.get("CF-TEST.1_1") is None
+    assert len(list((tmp_path / "store").glob("*.npy"))) == 2
+
+def test_missing_store(tmp_path):
+    store = PlddtStore(str(tmp_path / "missing"))
+    assert not store.available
+    assert store.get("CF-TEST.1_1") is None
+    assert store.stats() == {"loaded": False}
+
+@pytest.mark.asyncio
+async def test_get_plddt(store):
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    response = await async_client.get("/structures/plddt/TEST.1_1")
+    assert response.status_code == 200
+    assert response.json() == {
+        "record_id": "TEST.1_1",
+        "colabfold": {"residues": 3, "mean_plddt": 73.83, "plddt": [82.5, 91.25, 47.75]},
+        "esmfold": {"residues": 3, "mean_plddt": 53.0, "plddt": [20.0, 91.25, 47.75]},
+    }
+
+    response = await async_client.get("/structures/plddt/TEST.1_1", params={"per_residue": False})
+    assert "plddt" not in response.json()["colabfold"]
+
+    response = await async_client.get("/structures/plddt/MISSING.1_1")
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_get_plddt_batch(store, monkeypatch):
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    response = await async_client.get("/structures/plddt/", params={"record_ids": "TEST.1_1, MISSING.1_1,TEST.1_1"})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["record_id"] for result in results] == ["TEST.1_1", "MISSING.1_1"]
+    assert results[0]["colabfold"] == {"residues": 3, "mean_plddt": 73.83}
+    assert results[1]["colabfold"] is None and results[1]["esmfold"] is None
+
+    response = await async_client.get("/structures/plddt/", params={"record_ids": "TEST.1_1", "per_residue": True})
+    assert response.json()["results"][0]["esmfold"]["plddt"] == [20.0, 91.25, 47.75]
+
+    response = await async_client.get("/structures/plddt/", params={"record_ids": ","})
+    assert response.status_code == 400
+    monkeypatch.setattr(structures, "PLDDT_BATCH_MAX", 1)
+    response = await async_client.get("/structures/plddt/", params={"record_ids": "A,B"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_get_plddt_without_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(structures, "plddt_store", PlddtStore(str(tmp_path / "missing")))
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    response = await async_client.get("/structures/plddt/TEST.1_1")
+    assert response.status_code == 503
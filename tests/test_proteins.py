@@ -4,6 +4,7 @@ import pytest
 from mongomock_motor import AsyncMongoMockClient
 from app.db import get_protein_structures_collection
 from app.main import app
+from app.utils.blast_cache import blast_cache
 from app.models.proteins import *
 
 @pytest.mark.asyncio
@@ -151,6 +152,31 @@ async def test_get_protein_structures_by_genbank_id_no_matches(mock_protein_data
     assert response.json() == {"detail": "No Structures Found"}
     app.dependency_overrides.clear()
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query, expected", [
+    ("qualifier=AFO6721", ["AFO67213.1_12633", "AFO67214.1_12633"]),
+    ("qualifier=afo67214.1&match=prefix", ["AFO67214.1_12633"]),
+    ("qualifier=CAI74982.1&match=exact", ["CAI74982.1_11505"]),
+    ("qualifier=CAI7498&match=exact", []),
+    ("qualifier=67213&match=prefix", []),
+    ("qualifier=o6721(3)&match=substring", ["AFO67213.1_12633"]),
+])
+async def test_get_protein_structures_by_genbank_id_match(mock_protein_data, query, expected):
+
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    response: Response = await async_client.get(url=f"/proteins/genbank_id/?{query}&fields=record_id")
+
+    if expected:
+        assert response.status_code == 200
+        assert sorted(structure["record_id"] for structure in response.json()["protein_structures"]) == expected
+    else:
+        assert response.status_code == 404
+    app.dependency_overrides.clear()
+
 @pytest.mark.asyncio
 async def test_get_protein_structures_by_virus_name(mock_protein_data):
     mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
@@ -338,4 +364,83 @@ async def test_get_protein_structures_by_sequence_including_spaces_and_non_alpha
     )
     assert response2.status_code == 400, f'404 was expected, but {response2.status_code} was returned'
     assert response2.json() == {"detail": "Search term contains non-alphabetic characters and/or spaces. Please re-enter your sequence"}
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_get_protein_structures_by_sequence_exact_only(mock_protein_data):
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    response: Response = await async_client.get(
+        url=f"/proteins/sequence_match/?qualifier=asgkplyrnmala&exact_only=true"
+    )
+
+    protein_fetched: BlastEntry = BlastEntry(**response.json())
+
+    assert response.status_code == 200, f'200 was expected, but {response.status_code} was returned'
+    assert [match.structure_id for match in protein_fetched.matches] == ['CAI74981.1.4_11505']
+    assert protein_fetched.matches[0].evalue == 0.0
+    assert protein_fetched.matches[0].score == 65.0
+    assert protein_fetched.matches[0].protein_structure.protein_seq == 'ASGKPLYRNMALA'
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_get_protein_structures_by_sequence_adds_exact_matches_blastp_missed(mock_protein_data, monkeypatch):
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+    async def no_hits(sequence):
+        return [] # blastp found nothing
+    monkeypatch.setattr(blast_cache, "get", no_hits)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    response: Response = await async_client.get(
+        url=f"/proteins/sequence_match/?qualifier=ASGKPLYRNMALA"
+    )
+    assert response.status_code == 200, f'200 was expected, but {response.status_code} was returned'
+    assert [match["structure_id"] for match in response.json()["matches"]] == ['CAI74981.1.4_11505']
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_get_protein_structures_by_sequence_exact_only_no_match(mock_protein_data):
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    response: Response = await async_client.get(
+        url=f"/proteins/sequence_match/?qualifier=ASGKPLYRNMAL&exact_only=true"
+    )
+    assert response.status_code == 404, f'404 was expected, but {response.status_code} was returned'
+    assert response.json() == {"detail": "No Matches Found"}
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_get_protein_structures_by_protein_name_pages(mock_protein_data):
+
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    response: Response = await async_client.get(
+        url=f"/proteins/protein_name/?qualifier=protein"
+    )
+    all_results = response.json()["protein_structures"]
+    assert response.json()["count"] == 7
+
+    pages = []
+    for page_num in range(1, 5):
+        response = await async_client.get(
+            url=f"/proteins/protein_name/?qualifier=protein&page_size=2&page_num={page_num}"
+        )
+        assert response.json()["count"] == 7
+        pages += response.json()["protein_structures"]
+
+    assert pages == all_results
+    app.dependency_overrides.clear()
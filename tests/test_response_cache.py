@@ -0,0 +1,81 @@
+from httpx import ASGITransport, AsyncClient
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.db import get_protein_structures_collection
+from app.main import app
+from app.utils.response_cache import ResponseCache, response_cache
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(response_cache, "max_bytes", 64 * 1024 * 1024)
+    return response_cache
+
+@pytest.mark.asyncio
+async def test_cached_response(mock_protein_data, cache):
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    first = await async_client.get(url="/proteins/virus_name_exact/?qualifier=Tellina virus 1&page_size=3")
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "public, max-age=3600"
+    assert first.headers["content-encoding"] == "gzip"
+    etag = first.headers["etag"]
+
+    # served from the cache, whatever the order of the query parameters, without querying the (now empty) collection
+    app.dependency_overrides[get_protein_structures_collection] = lambda: AsyncMongoMockClient()["test_database"]["empty"]
+    second = await async_client.get(url="/proteins/virus_name_exact/?page_size=3&qualifier=Tellina virus 1", headers={"Accept-Encoding": "identity"})
+    assert second.status_code == 200
+    assert second.headers["etag"] == etag
+    assert "content-encoding" not in second.headers
+    assert second.content == first.content
+
+    not_modified = await async_client.get(url="/proteins/virus_name_exact/?qualifier=Tellina virus 1&page_size=3", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    changed = await async_client.get(url="/proteins/virus_name_exact/?qualifier=Tellina virus 1&page_size=3", headers={"If-None-Match": '"0-stale"'})
+    assert changed.status_code == 200
+
+    # errors aren't cached
+    assert (await async_client.get(url="/proteins/virus_name_exact/?qualifier=Tellina virus 1&page_size=4")).status_code == 404
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    assert (await async_client.get(url="/proteins/virus_name_exact/?qualifier=Tellina virus 1&page_size=4")).status_code == 200
+
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["not_modified"] == 1
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_response_cache_eviction():
+    cache = ResponseCache(max_bytes=3000, data_version="7")
+    keys = [cache.key("/viruses/", f"qualifier={i}".encode()) for i in range(3)]
+    for key in keys:
+        await cache.put(key, b"x" * 1000, b"application/json")
+    cache.get(keys[0])
+    await cache.put(cache.key("/viruses/", b"qualifier=3"), b"y" * 1000, b"application/json")
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.stats()["bytes"] <= 3000
+    assert cache.key("/viruses/", b"b=1&a=&c=2") == cache.key("/viruses/", b"a=&c=2&b=1")
+    assert cache.get(keys[0]).etag.startswith(b'"7-')
+
+@pytest.mark.asyncio
+async def test_large_responses_are_not_cached(mock_protein_data, cache, monkeypatch):
+    monkeypatch.setattr(cache, "max_entry_bytes", 1000)
+    too_large = cache.stats()["too_large"]
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    response = await async_client.get(url="/proteins/virus_name_exact/?qualifier=Tellina virus 1&page_size=5")
+    assert response.status_code == 200
+    assert len(response.content) > 1000
+    assert "etag" not in response.headers and "content-encoding" not in response.headers
+    assert cache.stats()["too_large"] == too_large + 1
+    assert cache.get(cache.key("/proteins/virus_name_exact/", b"qualifier=Tellina virus 1&page_size=5")) is None
+    app.dependency_overrides.clear()
@@ -0,0 +1,55 @@
+from fastapi import Response
+from httpx import ASGITransport, AsyncClient
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.db import get_protein_structures_collection
+from app.main import app
+from app.models.proteins import ProteinStructure
+from app.utils import serialization
+from app.utils.blast import blast_runner
+from app.utils.blast_cache import blast_cache
+from app.utils.serialization import structure_output
+
+def test_structure_output(mock_protein_data):
+    for document in mock_protein_data:
+        assert structure_output(document) == ProteinStructure(**document).model_dump(by_alias=False)
+        assert structure_output(document, ["genbank_id", "record_id"]) == {"record_id": document["_id"], "genbank_id": document["protein_id"]}
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url", [
+    "/proteins/recordid/CAI74981.1.4_11505",
+    "/proteins/protein_name/?qualifier=protein&page_size=3",
+    "/proteins/genbank_id/?qualifier=CAI7498&page_size=3&cursor=",
+    "/proteins/virus_name/?qualifier=gyrovirus&fields=summary",
+    "/proteins/virus_name_exact/?qualifier=Tellina virus 1&include_count=false",
+    "/proteins/sequence_match/?qualifier=ASGKPLYRNMALA&exact_only=true",
+    "/proteins/sequence_match/?qualifier=ASGKPLYRNMALA&fields=structure",
+])
+async def test_fast_path_matches_validated_responses(mock_protein_data, monkeypatch, url):
+    # sequence searches get blastp's hits from the cache, so the test doesn't need blastp
+    hits = [
+        {"structure_id": "CAI74981.1.4_11505", "score": 63.0, "evalue": 0.00660783, "hit_length": 13, "positives": 13, "gaps": 0},
+        {"structure_id": "CAI74981.1_11505", "score": 66.0, "evalue": 0.0124377, "hit_length": 1114, "positives": 13, "gaps": 0},
+    ]
+    async def cached_hits(sequence):
+        return hits
+    monkeypatch.setattr(blast_cache, "get", cached_hits)
+
+    async def no_blastp(*args, **kwargs):
+        raise AssertionError("blastp should not run")
+    monkeypatch.setattr(blast_runner, "run", no_blastp)
+
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    monkeypatch.setattr(serialization, "VALIDATE_RESPONSES", True)
+    validated: Response = await async_client.get(url=url)
+    monkeypatch.setattr(serialization, "VALIDATE_RESPONSES", False)
+    fast: Response = await async_client.get(url=url)
+
+    assert fast.status_code == validated.status_code == 200
+    assert fast.content == validated.content
+    app.dependency_overrides.clear()
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from httpx import ASGITransport, AsyncClient
+from app.utils.response_cache import ResponseCacheMiddleware
+from app.utils.single_flight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_computation():
+    flights = SingleFlight()
+    calls = []
+
+    async def compute(key):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return key.upper()
+
+    results = await asyncio.gather(*[flights.do(key, lambda key=key: compute(key)) for key in ["a", "a", "b", "a"]])
+
+    assert results == ["A", "A", "B", "A"]
+    assert calls == ["a", "b"]
+    assert flights.stats() == {"in_flight": 0, "executed": 2, "coalesced": 2}
+
+    # a later call runs again
+    assert await flights.do("a", lambda: compute("a")) == "A"
+    assert calls == ["a", "b", "a"]
+
+@pytest.mark.asyncio
+async def test_exceptions_are_shared():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("no")
+
+    results = await asyncio.gather(flights.do("k", fail), flights.do("k", fail), return_exceptions=True)
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert flights.stats()["executed"] == 1
+
+@pytest.mark.asyncio
+async def test_computation_is_cancelled_once_abandoned():
+    flights = SingleFlight()
+    finished = []
+
+    async def compute():
+        await asyncio.sleep(0.2)
+        finished.append(True)
+        return "done"
+
+    first = asyncio.ensure_future(flights.do("k", compute))
+    second = asyncio.ensure_future(flights.do("k", compute))
+    await asyncio.sleep(0.01)
+
+    first.cancel()
+    assert await second == "done"
+    assert finished == [True]
+
+    third = asyncio.ensure_future(flights.do("k", compute))
+    await asyncio.sleep(0.01)
+    third.cancel()
+    await asyncio.gather(third, return_exceptions=True)
+    assert finished == [True]
+    assert not flights.in_flight("k")
+
+@pytest.mark.asyncio
+async def test_middleware_coalesces_identical_requests():
+    runs = []
+
+    async def route(scope, receive, send):
+        runs.append(scope["query_string"])
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": 404, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"detail":"Not Found"}'})
+
+    flights = SingleFlight()
+    app = ResponseCacheMiddleware(route, cache=None, flights=flights)
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    responses = await asyncio.gather(
+        async_client.get("/proteins/virus_name_exact/?qualifier=a&page_size=2"),
+        async_client.get("/proteins/virus_name_exact/?page_size=2&qualifier=a"),
+        async_client.get("/proteins/virus_name_exact/?qualifier=b"),
+        async_client.get("/proteins/sequence_match/?qualifier=MRM"),
+        async_client.get("/proteins/sequence_match/?qualifier=MRM"),
+    )
+
+    assert [response.status_code for response in responses] == [404] * 5
+    assert responses[1].json() == {"detail": "Not Found"}
+    assert len(runs) == 4
+    assert flights.stats()["coalesced"] == 1
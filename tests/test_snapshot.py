@@ -0,0 +1,102 @@
+import json
+import threading
+from httpx import ASGITransport, AsyncClient
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.db import get_clusters_collection, get_genome_coordinates_collection, get_protein_structures_collection
+from app.main import app
+from app import snapshot as snapshot_module
+from app.snapshot import SNAPSHOT_FILES, Snapshot, SnapshotCollection
+
+@pytest.fixture
+def snapshot(tmp_path, mock_protein_data, mock_genome_data, mock_clusters_data):
+    for name, data in [("proteinstructures", mock_protein_data), ("genome_coordinates", mock_genome_data), ("clusters", mock_clusters_data)]:
+        with open(tmp_path / SNAPSHOT_FILES[name], "w") as f:
+            json.dump(data, f)
+    return Snapshot(str(tmp_path))
+
+@pytest.mark.asyncio
+async def test_queries_match_mongo(mock_protein_data):
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many([dict(document) for document in mock_protein_data])
+    snapshot_collection = SnapshotCollection("proteinstructures", mock_protein_data, ["protein_id", "Virus name(s)"])
+
+    for query, projection in [
+        ({}, None),
+        ({"_id": "AFO67214.1_12633"}, {"protein_id": 1}),
+        ({"_id": {"$in": ["AFO67214.1_12633", "missing", "QBM01055.1_12636"]}}, None),
+        ({"protein_id": {"$regex": "^CAI7498", "$options": "i"}}, {"Virus name(s)": 1, "_id": 0}),
+        ({"$and": [{"Virus name(s)": "Tellina virus 1"}, {"_id": {"$gt": "B"}}]}, None),
+        ({"$or": [{"Species": {"$regex": "gyrovirus", "$options": "i"}}, {"Virus name abbreviation(s)": "GyV4"}]}, None),
+    ]:
+        expected = await mock_collection.find(query, projection).sort("_id", 1).to_list(length=None)
+        assert await snapshot_collection.find(query, projection).sort("_id", 1).to_list(length=None) == expected
+        assert await snapshot_collection.find(query, projection).sort("_id", 1).skip(1).limit(2).to_list(length=2) == expected[1:3]
+        assert await snapshot_collection.count_documents(query) == len(expected)
+
+    pipeline = [{"$group": {"_id": "$Virus name(s)", "count": {"$sum": 1}}}, {"$sort": {"count": -1}}, {"$limit": 2}]
+    expected = await mock_collection.aggregate(pipeline).to_list(length=None)
+    assert await snapshot_collection.aggregate(pipeline).to_list(length=None) == expected
+
+@pytest.mark.asyncio
+async def test_scans_run_off_the_event_loop(mock_protein_data, monkeypatch):
+    snapshot_collection = SnapshotCollection("proteinstructures", mock_protein_data, ["protein_id", "Virus name(s)"])
+    threads = set()
+    matches = snapshot_module.matches
+
+    def recording_matches(document, query):
+        threads.add(threading.current_thread())
+        return matches(document, query)
+    monkeypatch.setattr(snapshot_module, "matches", recording_matches)
+
+    query = {"protein_id": {"$regex": "AFO", "$options": "i"}}
+    assert await snapshot_collection.find(query).to_list(length=None)
+    assert await snapshot_collection.count_documents(query)
+    assert [document async for document in snapshot_collection.find(query)]
+    assert threads and threading.current_thread() not in threads
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url", [
+    "/proteins/recordid/CAI74981.1.4_11505",
+    "/proteins/protein_name/?qualifier=protein&page_size=3",
+    "/proteins/protein_name/?qualifier=prot.in",
+    "/proteins/genbank_id/?qualifier=CAI7498&page_size=3&cursor=",
+    "/proteins/virus_name/?qualifier=gyrovirus&fields=summary",
+    "/proteins/virus_name_exact/?qualifier=Tellina virus 1&page_size=3&page_num=2",
+    "/proteins/sequence_match/?qualifier=ASGKPLYRNMALA",
+    "/viruses/?qualifier=gyrovirus",
+    "/viruses/?qualifier=gyro.irus",
+    "/genome_coordinates/virus_name/?qualifier=ovine adenovirus 3",
+    "/clusters/genbank_id/?qualifier=AFU07689.1",
+    "/clusters/genbank_id/?qualifier=no_match",
+])
+async def test_routes_match_mongo(mock_protein_data, mock_genome_data, mock_clusters_data, snapshot, url):
+    mongo = AsyncMongoMockClient()["test_database"]
+    for name, data in [("proteinstructures", mock_protein_data), ("genome_coordinates", mock_genome_data), ("clusters", mock_clusters_data)]:
+        await mongo[name].insert_many([dict(document) for document in data])
+
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    responses = []
+    for get_collection in [mongo.get_collection, snapshot.get_collection]:
+        app.dependency_overrides[get_protein_structures_collection] = lambda: get_collection("proteinstructures")
+        app.dependency_overrides[get_genome_coordinates_collection] = lambda: get_collection("genome_coordinates")
+        app.dependency_overrides[get_clusters_collection] = lambda: get_collection("clusters")
+        responses.append(await async_client.get(url=url))
+    app.dependency_overrides.clear()
+
+    from_mongo, from_snapshot = responses
+    assert from_snapshot.status_code == from_mongo.status_code
+    assert from_snapshot.json() == from_mongo.json()
+
+@pytest.mark.asyncio
+async def test_reload(snapshot, tmp_path, mock_clusters_data):
+    clusters = snapshot.get_collection("clusters")
+    assert await clusters.count_documents({}) == len(mock_clusters_data)
+
+    with open(tmp_path / SNAPSHOT_FILES["clusters"], "w") as f:
+        json.dump(mock_clusters_data[:1], f)
+    assert snapshot.reload() == ["clusters"]
+
+    assert snapshot.get_collection("clusters") is clusters
+    assert await clusters.count_documents({}) == 1
+    assert await clusters.find_one({"cluster_members.member_record_id": mock_clusters_data[1]["cluster_members"][0]["member_record_id"]}) is None
@@ -0,0 +1,86 @@
+import gzip
+import os
+from httpx import ASGITransport, AsyncClient
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from app.utils.structure_files import SidecarCache, StructureFiles, accepted_encodings
+
+MODEL = "CF-TEST.1_1.cif"
+
+@pytest.fixture
+def models(tmp_path):
+    directory = tmp_path / "models"
+    directory.mkdir()
+    (directory / MODEL).write_bytes(b"ATOM      1  N   MET A   1      11.104   6.134  -6.504  1.00 80.00           N\n" * 200)
+    (directory / "small.pdb").write_bytes(b"END\n")
+    return directory
+
+def client(models, sidecar_cache) -> AsyncClient:
+    app = Starlette(routes=[Mount("/pdb", StructureFiles(directory=str(models), sidecar_cache=sidecar_cache))])
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br;q=0.8") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("gzip;q=0, identity") == {"identity"}
+    assert accepted_encodings("") == set()
+
+@pytest.mark.asyncio
+async def test_compressed_copy_is_generated_and_reused(models, tmp_path):
+    cache = SidecarCache(str(tmp_path / "cache"), max_bytes=1024 * 1024)
+    async_client = client(models, cache)
+    original = (models / MODEL).read_bytes()
+
+    response = await async_client.get(f"/pdb/{MODEL}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == original # decoded by httpx
+    assert int(response.headers["content-length"]) < len(original)
+    etag = response.headers["etag"]
+
+    again = await async_client.get(f"/pdb/{MODEL}", headers={"Accept-Encoding": "gzip"})
+    assert again.headers["etag"] == etag
+    assert cache.stats()["generated"] == 1
+    assert cache.stats()["hits"] == 1
+
+    not_modified = await async_client.get(f"/pdb/{MODEL}", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+    identity = await async_client.get(f"/pdb/{MODEL}", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.content == original
+    assert identity.headers["etag"] != etag
+
+    small = await async_client.get("/pdb/small.pdb", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+@pytest.mark.asyncio
+async def test_sidecar_and_range(models):
+    async_client = client(models, None)
+    original = (models / MODEL).read_bytes()
+
+    assert "content-encoding" not in (await async_client.get(f"/pdb/{MODEL}", headers={"Accept-Encoding": "gzip"})).headers
+
+    (models / (MODEL + ".gz")).write_bytes(gzip.compress(original))
+    response = await async_client.get(f"/pdb/{MODEL}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == original
+
+    # a sidecar older than the model is ignored
+    os.utime(models / (MODEL + ".gz"), (0, 0))
+    assert "content-encoding" not in (await async_client.get(f"/pdb/{MODEL}", headers={"Accept-Encoding": "gzip"})).headers
+
+    partial = await async_client.get(f"/pdb/{MODEL}", headers={"Accept-Encoding": "identity", "Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.content == original[10:20]
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(original)}"
+
+    assert (await async_client.get("/pdb/missing.cif")).status_code == 404
+
+def test_sidecar_cache_eviction(models, tmp_path):
+    cache = SidecarCache(str(tmp_path / "cache"), max_bytes=1)
+    path = cache._generate(str(models / MODEL), cache.path(str(models / MODEL), os.stat(models / MODEL), ".gz"), gzip.compress)
+    other = cache._generate(str(models / "small.pdb"), cache.path(str(models / "small.pdb"), os.stat(models / "small.pdb"), ".gz"), gzip.compress)
+    assert os.path.exists(other)
+    assert not os.path.exists(path)
@@ -5,6 +5,7 @@ from mongomock_motor import AsyncMongoMockClient
 from app.db import get_protein_structures_collection
 from app.main import app
 from app.models.viruses import *
+from app.utils.virus_catalogue import VirusCatalogue
 
 @pytest.mark.asyncio
 async def test_get_viruses_by_virus_name(mock_protein_data):
@@ -104,4 +105,18 @@ async def test_get_viruses_no_matches(mock_protein_data):
     
     assert response.status_code == 404, f'404 was expected, but {response.status_code} was returned'
     assert response.json() == {"detail": "No Matches Found"}
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_virus_catalogue(mock_protein_data):
+
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+    catalogue = VirusCatalogue()
+    await catalogue.load(mock_collection)
+
+    assert len(catalogue) == 5
+    assert catalogue.search("tv1") == [{"name": "Tellina virus 1", "abbreviations": ["TV1"], "species": ["Telnavirus tellinae"], "count": 8}]
+    assert [virus["name"] for virus in catalogue.search("gyrovirus")] == ["gyrovirus 4", "gyrovirus 11", "avian gyrovirus 2"]
+    assert [virus["name"] for virus in catalogue.search("MASTADENO")] == ["ovine adenovirus 5"]
+    assert catalogue.search("no_match") == []
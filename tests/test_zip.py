@@ -261,4 +261,28 @@ async def test_get_structural_models_Zip_by_cluster_ID_no_matches(mock_protein_d
     assert response.status_code == 400
     assert response.json() == {"detail": "The file extension provided is not available"}
 
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+@pytest.mark.parametrize("compression", ["stored", "fast", "max", "predeflated"])
+def test_stream_zip_compression_modes(compression, tmp_path, monkeypatch):
+    from app.routes import zip as zip_routes
+    from app.utils import predeflate
+    from app.utils.zipstream import write_predeflated
+
+    models_path = tmp_path / "models"
+    models_path.mkdir()
+    monkeypatch.setattr(zip_routes, "STRUCTURAL_MODELS_PATH", f"{models_path}/")
+    monkeypatch.setattr(predeflate, "ZIP_PREDEFLATED_PATH", str(models_path))
+    cif = b"ATOM      1  N   MET A   1      11.104   6.134  -6.504  1.00 84.90           N\n" * 200
+    for filename in ["CF-AFO67214.1_12633.cif", "EF-AFO67214.1_12633.cif", "CF-AFO67213.1_12633.cif"]:
+        (models_path / filename).write_bytes(cif)
+    write_predeflated(str(models_path / "CF-AFO67214.1_12633.cif"), predeflate.predeflated_path("CF-AFO67214.1_12633.cif"))
+
+    archive = b"".join(zip_routes.stream_zip("gyrovirus 4", ".cif", "record_id\n", ["AFO67214.1_12633", "AFO67213.1_12633"], compression))
+
+    with zipfile.ZipFile(BytesIO(archive), 'r') as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.namelist() == ["gyrovirus 4_metadata.csv", "EF-AFO67214.1_12633.cif", "CF-AFO67214.1_12633.cif", "CF-AFO67213.1_12633.cif"]
+        assert zip_file.read("CF-AFO67214.1_12633.cif") == cif
+        expected_type = zipfile.ZIP_STORED if compression == "stored" else zipfile.ZIP_DEFLATED
+        assert zip_file.getinfo("CF-AFO67213.1_12633.cif").compress_type == expected_type
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import threading
+import time
+from io import BytesIO
+import zipfile
+from fastapi import Response
+from httpx import ASGITransport, AsyncClient
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.db import get_protein_structures_collection
+from app.main import app
+from app.routes import zip as zip_routes
+from app.utils.zip_cache import ArchiveCache
+
+def slow_build(calls):
+    def build():
+        calls.append(1)
+        time.sleep(0.1)
+        yield b"PK"
+        yield b"archive"
+    return build
+
+@pytest.mark.asyncio
+async def test_archive_cache_coalesces_concurrent_builds(tmp_path):
+    cache = ArchiveCache(str(tmp_path), max_bytes=1024, data_version="1")
+    calls = []
+
+    paths = await asyncio.gather(*[cache.get_or_build("virus", "gyrovirus 4", ".cif", slow_build(calls)) for _ in range(10)])
+
+    assert len(calls) == 1
+    assert len(set(paths)) == 1
+    with open(paths[0], "rb") as f:
+        assert f.read() == b"PKarchive"
+    assert cache.stats()["coalesced"] == 9
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+@pytest.mark.asyncio
+async def test_archive_cache_is_shared_and_versioned(tmp_path):
+    first_worker = ArchiveCache(str(tmp_path), max_bytes=1024, data_version="1")
+    second_worker = ArchiveCache(str(tmp_path), max_bytes=1024, data_version="1")
+    next_release = ArchiveCache(str(tmp_path), max_bytes=1024, data_version="2")
+    calls = []
+
+    await first_worker.get_or_build("virus", "gyrovirus 4", ".cif", slow_build(calls))
+
+    assert second_worker.lookup("virus", "gyrovirus 4", ".cif")
+    assert next_release.lookup("virus", "gyrovirus 4", ".cif") is None
+
+@pytest.mark.asyncio
+async def test_archive_cache_evicts_least_recently_used(tmp_path):
+    cache = ArchiveCache(str(tmp_path), max_bytes=20, data_version="1")
+    calls = []
+
+    await cache.get_or_build("virus", "a", ".cif", slow_build(calls))
+    os.utime(cache.lookup("virus", "a", ".cif"), (0, 0))
+    await cache.get_or_build("virus", "b", ".cif", slow_build(calls))
+    await cache.get_or_build("virus", "c", ".cif", slow_build(calls))
+
+    assert cache.lookup("virus", "a", ".cif") is None
+    assert cache.lookup("virus", "c", ".cif")
+    assert os.listdir(tmp_path / "locks") == []
+
+@pytest.mark.asyncio
+async def test_archive_cache_builds_of_different_archives_dont_wait_for_each_other(tmp_path):
+    cache = ArchiveCache(str(tmp_path), max_bytes=1024, data_version="1")
+    release = threading.Event()
+
+    def blocked_build():
+        yield b"PK"
+        assert release.wait(5)
+
+    # even when their keys start alike
+    other = next(f"b{i}" for i in range(100000) if cache.key("virus", f"b{i}", ".cif")[:4] == cache.key("virus", "a", ".cif")[:4])
+
+    blocked = asyncio.ensure_future(cache.get_or_build("virus", "a", ".cif", blocked_build))
+    await asyncio.sleep(0.1)
+    # a leftover lock of a dead worker is reused, then removed
+    open(cache.lock_path(cache.key("virus", other, ".cif")), "w").close()
+    path = await asyncio.wait_for(cache.get_or_build("virus", other, ".cif", slow_build([])), 2)
+    release.set()
+    await blocked
+
+    with open(path, "rb") as f:
+        assert f.read() == b"PKarchive"
+    assert os.listdir(tmp_path / "locks") == []
+
+@pytest.mark.asyncio
+async def test_archive_cache_workers_share_one_build(tmp_path):
+    workers = [ArchiveCache(str(tmp_path), max_bytes=1024, data_version="1") for _ in range(3)]
+    calls = []
+
+    paths = await asyncio.gather(*[worker.get_or_build("virus", "gyrovirus 4", ".cif", slow_build(calls)) for worker in workers])
+
+    assert len(calls) == 1
+    assert len(set(paths)) == 1
+    assert sum(worker.stats()["coalesced"] for worker in workers) == 2
+
+@pytest.mark.asyncio
+async def test_archive_cache_streams_while_building(tmp_path):
+    cache = ArchiveCache(str(tmp_path), max_bytes=1024, data_version="1")
+    first_chunk_read = threading.Event()
+    calls = []
+
+    def build():
+        calls.append(1)
+        yield b"PK"
+        assert first_chunk_read.wait(5)
+        yield b"archive"
+
+    first = cache.stream("virus", "gyrovirus 4", ".cif", build)
+    assert await asyncio.to_thread(next, first) == b"PK" # sent before the build has finished
+    second = cache.stream("virus", "gyrovirus 4", ".cif", build)
+    first_chunk_read.set()
+
+    assert b"PK" + b"".join(await asyncio.to_thread(list, first)) == b"PKarchive"
+    assert b"".join(await asyncio.to_thread(list, second)) == b"PKarchive"
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 1
+    assert b"".join(await asyncio.to_thread(list, cache.stream("virus", "gyrovirus 4", ".cif", build))) == b"PKarchive"
+    assert cache.stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_archive_cache_stream_reports_failed_build(tmp_path):
+    cache = ArchiveCache(str(tmp_path), max_bytes=1024, data_version="1")
+
+    def build():
+        yield b"PK"
+        raise OSError("model file missing")
+
+    with pytest.raises(RuntimeError):
+        await asyncio.to_thread(list, cache.stream("virus", "gyrovirus 4", ".cif", build))
+    await asyncio.sleep(0)
+    assert cache.lookup("virus", "gyrovirus 4", ".cif") is None
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+@pytest.mark.asyncio
+async def test_get_structural_models_Zip_by_strucure_IDs_from_cache(mock_protein_data, tmp_path, monkeypatch):
+    models = tmp_path / "models"
+    models.mkdir()
+    for record_id in ["AFO67214.1_12633", "AFO67213.1_12633"]:
+        (models / f"CF-{record_id}.cif").write_bytes(b"data_model\n" * 100)
+    monkeypatch.setattr(zip_routes, "STRUCTURAL_MODELS_PATH", f"{models}/")
+    monkeypatch.setattr(zip_routes, "zip_cache", ArchiveCache(str(tmp_path / "cache"), max_bytes=1024 * 1024, data_version="1"))
+    mock_collection = AsyncMongoMockClient()["test_database"]["protein_structures"]
+    await mock_collection.insert_many(mock_protein_data)
+
+    app.dependency_overrides[get_protein_structures_collection] = lambda: mock_collection
+    async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    responses = []
+    for _ in range(2):
+        response: Response = await async_client.get(
+            url=f"/zip/virus/gyrovirus 4/.cif"
+        )
+        assert response.status_code == 200, f'200 was expected, but {response.status_code} was returned'
+        responses.append(response.content)
+
+    assert responses[0] == responses[1]
+    assert zip_routes.zip_cache.stats()["builds"] == 1
+    assert zip_routes.zip_cache.stats()["hits"] == 1
+    with zipfile.ZipFile(BytesIO(responses[0]), 'r') as zip_file:
+        assert "CF-AFO67214.1_12633.cif" in zip_file.namelist()
+        assert zip_file.read("CF-AFO67213.1_12633.cif") == b"data_model\n" * 100
+
+    app.dependency_overrides.clear()
@@ -0,0 +1,84 @@
+from io import BytesIO
+import os
+import zipfile
+import zlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.zipstream import ZipStream, ZIP_DEFLATED, ZIP_STORED, coalesce, compress_file, ordered_parallel, read_predeflated, write_predeflated
+
+def build(members):
+    zip_stream = ZipStream()
+    chunks = []
+    for member in members:
+        chunks.extend(member(zip_stream))
+    chunks.extend(zip_stream.finish())
+    return b"".join(chunks)
+
+def test_zipstream_round_trip():
+    cif = b"ATOM      1  N   MET A   1      11.104   6.134  -6.504  1.00 84.90           N\n" * 500
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    predeflated = compressor.compress(cif) + compressor.flush()
+
+    archive = build([
+        lambda zs: zs.add_file("metadata.csv", [b"record_id\n", b"AFU07689.1_4668\n"], compress_level=9),
+        lambda zs: zs.add_file("CF-AFU07689.1_4668.cif", [cif[:1000], cif[1000:]], compress_level=0),
+        lambda zs: zs.add_compressed("EF-AFU07689.1_4668.cif", predeflated, ZIP_DEFLATED, zlib.crc32(cif), len(cif)),
+        lambda zs: zs.add_compressed("empty.txt", b"", ZIP_STORED, 0, 0),
+    ])
+
+    with zipfile.ZipFile(BytesIO(archive)) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.namelist() == ["metadata.csv", "CF-AFU07689.1_4668.cif", "EF-AFU07689.1_4668.cif", "empty.txt"]
+        assert zip_file.read("metadata.csv") == b"record_id\nAFU07689.1_4668\n"
+        assert zip_file.read("CF-AFU07689.1_4668.cif") == cif
+        assert zip_file.read("EF-AFU07689.1_4668.cif") == cif
+        assert zip_file.getinfo("CF-AFU07689.1_4668.cif").compress_type == zipfile.ZIP_STORED
+
+def test_zipstream_zip64_entry_count():
+    archive = build([lambda zs, i=i: zs.add_compressed(f"{i}.txt", b"x", ZIP_STORED, zlib.crc32(b"x"), 1) for i in range(70000)])
+
+    with zipfile.ZipFile(BytesIO(archive)) as zip_file:
+        assert len(zip_file.namelist()) == 70000
+        assert zip_file.read("69999.txt") == b"x"
+
+def test_coalesce():
+    assert list(coalesce([b"ab", b"c", b"defg", b"h"], size=3)) == [b"abc", b"defg", b"h"]
+
+def test_predeflated_round_trip(tmp_path):
+    source = tmp_path / "CF-AFU07689.1_4668.cif"
+    source.write_bytes(b"HETATM" * 10000)
+    write_predeflated(str(source), str(tmp_path / "CF-AFU07689.1_4668.cif.deflate"))
+
+    crc, size, data = read_predeflated(str(tmp_path / "CF-AFU07689.1_4668.cif.deflate"))
+
+    assert size == 60000
+    assert crc == zlib.crc32(b"HETATM" * 10000)
+    assert zlib.decompress(data, -15) == b"HETATM" * 10000
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+def test_ordered_parallel_keeps_order_and_bounds_in_flight_work():
+    in_flight = []
+    peak = []
+
+    def work(item):
+        in_flight.append(item)
+        peak.append(len(in_flight))
+        time.sleep(0.01 * (5 - item % 5))
+        in_flight.remove(item)
+        return item * 2
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(ordered_parallel(executor, work, range(20), window=3))
+
+    assert results == [item * 2 for item in range(20)]
+    assert max(peak) <= 3
+
+def test_compress_file(tmp_path):
+    source = tmp_path / "CF-AFU07689.1_4668.cif"
+    source.write_bytes(b"ATOM" * 1000)
+
+    method, crc, size, data = compress_file(str(source), 1)
+    assert (method, crc, size) == (ZIP_DEFLATED, zlib.crc32(b"ATOM" * 1000), 4000)
+    assert zlib.decompress(data, -15) == b"ATOM" * 1000
+
+    assert compress_file(str(source), 0) == (ZIP_STORED, crc, 4000, b"ATOM" * 1000)